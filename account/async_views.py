@@ -0,0 +1,38 @@
+"""
+Base class of the async API views served under ASGI.
+
+DRF's `APIView` is synchronous, so these are plain Django views with `async`
+handlers. They accept `Authorization: Bearer <jwt>` only: the user and their
+roles are read from the token (`JWTStatelessUserAuthentication`), so neither
+authentication nor the role check awaits the database. Bodies are rendered
+with DRF's `JSONRenderer`, exactly like the synchronous endpoints.
+"""
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from .roles import has_role
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+class RoleAsyncView(View):
+    role = None
+    authentication = JWTStatelessUserAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            authenticated = self.authentication.authenticate(request)
+        except exceptions.AuthenticationFailed as error:
+            return json_response(error.detail, status.HTTP_401_UNAUTHORIZED)
+        if authenticated is None:
+            return json_response({'detail': exceptions.NotAuthenticated.default_detail},
+                                 status.HTTP_401_UNAUTHORIZED)
+        request.user = authenticated[0]
+        if not has_role(request.user, self.role):
+            return json_response({'detail': exceptions.PermissionDenied.default_detail}, status.HTTP_403_FORBIDDEN)
+        return await super().dispatch(request, *args, **kwargs)
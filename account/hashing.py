@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+# Below this many passwords the cost of starting worker processes outweighs the gain.
+PARALLEL_THRESHOLD = 32
+
+
+def _setup_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # Workers started with the "spawn" method begin with an unconfigured Django.
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+        django.setup()
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_workers():
+    workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', None)
+    return workers or os.cpu_count() or 1
+
+
+def hash_passwords(passwords, workers=1):
+    """
+    Returns `make_password(password)` for each of `passwords`, in order.
+
+    Hashing is CPU bound on purpose, so with `workers` above 1 large batches
+    are split across a pool of that many processes instead of threads; pass
+    `hash_workers()` for the configured size. Small batches hash serially.
+    The pool forks the calling process, so only offline code such as
+    management commands should ask for it, never a web request.
+    """
+    passwords = list(passwords)
+    if workers == 1 or len(passwords) < PARALLEL_THRESHOLD:
+        return _hash_chunk(passwords)
+
+    # A few chunks per worker keeps every core busy until the end.
+    chunk_size = max(1, len(passwords) // (workers * 4))
+    chunks = [passwords[start:start + chunk_size] for start in range(0, len(passwords), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+        return list(chain.from_iterable(pool.map(_hash_chunk, chunks)))
@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from account.models import User
+from account.roles import DOCTOR
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from doctor.models import Doctor
+
+
+class Command(BaseCommand):
+    help = "Compares requests/sec of DRF Token authentication against stateless JWT authentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per authentication mode.")
+        parser.add_argument('--path', default='/api/doctor/profile/', help="Doctor endpoint to call.")
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        # Everything created here is rolled back once the benchmark is done.
+        with transaction.atomic():
+            user = User.objects.create(username='bench-auth-doctor', first_name='Bench', status=True)
+            user.set_password('bench-auth-password')
+            user.save()
+            Group.objects.get_or_create(name=DOCTOR)[0].user_set.add(user)
+            Doctor.objects.create(user=user, address='Bench', mobile='0')
+
+            token = Token.objects.create(user=user)
+            access = DoctorTokenObtainPairSerializer.get_token(user).access_token
+            modes = [
+                ('token', 'Token {}'.format(token.key)),
+                ('jwt', 'Bearer {}'.format(access)),
+            ]
+            for name, header in modes:
+                self.run_mode(name, header, options['path'], options['requests'])
+            transaction.set_rollback(True)
+
+    def run_mode(self, name, header, path, count):
+        client = Client(HTTP_AUTHORIZATION=header)
+        response = client.get(path)
+        if response.status_code != 200:
+            self.stderr.write("{}: {} returned {}".format(name, path, response.status_code))
+            return
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            client.get(path)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+        self.stdout.write("{:<6} {:>9.1f} req/s  {} queries/request".format(name, count / elapsed, len(queries)))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from account.hashing import hash_passwords, hash_workers
+
+
+class Command(BaseCommand):
+    help = "Compares serial and process-pool password hashing throughput for a bulk import."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help="Number of passwords to hash.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes for the parallel run (defaults to PASSWORD_HASHING_WORKERS).")
+
+    def handle(self, *args, **options):
+        passwords = ['bench-password-{}'.format(number) for number in range(options['users'])]
+        workers = options['workers'] or hash_workers()
+        for name, run_workers in (('serial', 1), ('parallel x{}'.format(workers), workers)):
+            started = time.perf_counter()
+            hash_passwords(passwords, workers=run_workers)
+            elapsed = time.perf_counter() - started
+            self.stdout.write("{:<13} {:>9.1f} users/s  ({:.1f}s for {} users)".format(
+                name, len(passwords) / elapsed, elapsed, len(passwords)))
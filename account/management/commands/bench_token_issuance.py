@@ -0,0 +1,43 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from account.models import User
+from account.token_issuer import get_token_issuer
+
+
+class Command(BaseCommand):
+    help = "Measures tokens/sec of User.token issuance: plain jwt.encode vs the cached issuer vs bulk issuance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help="Number of tokens to mint per run.")
+
+    def handle(self, *args, **options):
+        # Unsaved users are enough, issuing a token never touches the database.
+        users = [User() for _ in range(options['users'])]
+        issuer = get_token_issuer()
+
+        def encode_each():
+            for user in users:
+                expires = datetime.now(timezone.utc) + timedelta(days=60)
+                jwt.encode({'id': str(user.pk), 'exp': int(expires.timestamp())},
+                           settings.SECRET_KEY, algorithm='HS256')
+
+        def issue_each():
+            for user in users:
+                issuer.issue(user)
+
+        def issue_many():
+            issuer.issue_many(users)
+
+        sample = issuer.issue(users[0])
+        jwt.decode(sample, settings.SECRET_KEY, algorithms=['HS256'])
+
+        for name, run in (('jwt.encode', encode_each), ('issue', issue_each), ('issue_many', issue_many)):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write("{:<11} {:>12.0f} tokens/s".format(name, len(users) / elapsed))
@@ -2,12 +2,12 @@ import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
-from datetime import datetime, timedelta
-import jwt
-from django.conf import settings
 
+from .token_issuer import get_token_issuer
+from .tracking import LoadedValuesMixin
 
-class User(AbstractUser):
+
+class User(LoadedValuesMixin, AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     first_name = models.CharField(_('first name'), max_length=150)
     status = models.BooleanField(default=False)
@@ -28,9 +28,4 @@ class User(AbstractUser):
         Generates a JSON Web Token that stores this user's ID and has an expiry
         date set to 60 days into the future.
         """
-        dt = datetime.now() + timedelta(days=60)
-
-        token = jwt.encode({
-            'id': self.pk,
-            'exp': int(dt.strftime('%s'))
-        }, settings.SECRET_KEY, algorithm='HS256')
+        return get_token_issuer().issue(self)
@@ -0,0 +1,140 @@
+"""
+Per-user cache of rendered GET responses, with conditional GETs.
+
+Every user has a version stamp in the cache. A view decorated with
+`cached_response` derives an ETag from the stamp and the request (view, URL,
+Accept header and today's date, since some responses default to "today"),
+answers `304 Not Modified` when the client's `If-None-Match` matches it and
+otherwise serves the body cached under that ETag, so a repeated poll reads
+two cache keys and no database rows. Signal receivers call
+`invalidate_on_commit()` with the users whose responses a change affects;
+dropping the stamp gives those users a new one, and new ETags, on their next
+request. Code that writes with `QuerySet.update()` or `bulk_create()`, which
+send no signals, invalidates explicitly.
+
+The stamp is read before the view queries anything, so a response computed
+from rows that change meanwhile is cached under the old stamp and never
+served again. With a read replica (see main.db_routers) the users whose
+stamps were dropped are also pinned to the primary for a few seconds, as the
+replica may not have the change yet when their next response is cached.
+"""
+import hashlib
+import uuid
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+from main import db_routers
+
+
+VERSION_KEY = 'response:version:{}'
+RESPONSE_KEY = 'response:{}:{}'
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 10 * 60)
+
+
+def user_version(user_id):
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # Another request may have set one first; keep whichever is stored.
+        if not cache.add(key, version, _timeout()):
+            version = cache.get(key, version)
+    return version
+
+
+async def auser_version(user_id):
+    key = VERSION_KEY.format(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, _timeout()):
+            version = await cache.aget(key, version)
+    return version
+
+
+def invalidate(user_ids):
+    user_ids = set(user_ids)
+    cache.delete_many([VERSION_KEY.format(user_id) for user_id in user_ids if user_id is not None])
+    db_routers.pin_users(user_ids)
+
+
+def invalidate_on_commit(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: invalidate(user_ids))
+
+
+def _etag_and_key(view, request, version):
+    digest = hashlib.md5('|'.join((
+        type(view).__name__, request.get_host(), request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+        timezone.localdate().isoformat(), version,
+    )).encode()).hexdigest()
+    return '"{}"'.format(digest), RESPONSE_KEY.format(request.user.pk, digest)
+
+
+def _not_modified(request, etag):
+    return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+
+def _finish(response, etag):
+    response['ETag'] = etag
+    # Clients and proxies must revalidate, and keep one copy per user.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization', 'Accept'))
+    return response
+
+
+def cached_response(get):
+    """
+    Decorates the `get` method of a view whose response depends only on the requesting user's
+    data: a DRF `APIView`, or an async view returning a rendered response.
+    """
+    if iscoroutinefunction(get):
+        @wraps(get)
+        async def async_wrapper(view, request, *args, **kwargs):
+            etag, key = _etag_and_key(view, request, await auser_version(request.user.pk))
+            if _not_modified(request, etag):
+                return _finish(HttpResponseNotModified(), etag)
+            cached = await cache.aget(key)
+            if cached is not None:
+                content, content_type = cached
+                return _finish(HttpResponse(content, content_type=content_type), etag)
+
+            with db_routers.use_primary(await db_routers.auser_pinned(request.user.pk)):
+                response = await get(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(key, (response.content, response['Content-Type']), _timeout())
+                _finish(response, etag)
+            return response
+        return async_wrapper
+
+    @wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        etag, key = _etag_and_key(view, request, user_version(request.user.pk))
+        if _not_modified(request, etag):
+            return _finish(HttpResponseNotModified(), etag)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return _finish(HttpResponse(content, content_type=content_type), etag)
+
+        with db_routers.use_primary(db_routers.user_pinned(request.user.pk)):
+            response = get(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            # DRF renders the response after the view returns.
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, (rendered.content, rendered['Content-Type']), _timeout()))
+            _finish(response, etag)
+        return response
+    return wrapper
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.models import TokenUser
+
+
+DOCTOR = 'doctor'
+PATIENT = 'Patient'
+ADMIN = 'admin'
+
+ROLE_CACHE_KEY = 'account:roles:{}'
+ROLES_CLAIM = 'roles'
+
+
+def _cache_key(user_id):
+    return ROLE_CACHE_KEY.format(user_id)
+
+
+def get_user_roles(user):
+    """
+    Returns the names of the groups `user` belongs to as a frozenset.
+
+    The result is memoised on the user object for the rest of the request
+    and in the configured cache across requests, so a permission check only
+    touches the database the first time a user is seen after a group change.
+    Users authenticated from a JWT carry their roles in the token itself.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    if isinstance(user, TokenUser):
+        return frozenset(user.token.get(ROLES_CLAIM, ()))
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = cache.get(_cache_key(user.pk))
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(_cache_key(user.pk), roles, getattr(settings, 'ROLE_CACHE_TIMEOUT', 60 * 60))
+        user._roles = roles
+    return roles
+
+
+def has_role(user, role):
+    return role in get_user_roles(user)
+
+
+def invalidate_roles(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_roles_on_commit(user_ids):
+    """
+    Invalidates once the current transaction commits: until then a concurrent
+    request still reads the old groups and would cache them again.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_roles(user_ids))
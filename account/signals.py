@@ -0,0 +1,32 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import User
+from .roles import invalidate_roles_on_commit
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) / user.groups.clear()
+        instance.__dict__.pop('_roles', None)
+        invalidate_roles_on_commit([instance.pk])
+    elif action == 'pre_clear':
+        # group.user_set.clear() reports no pk_set, collect the members first.
+        invalidate_roles_on_commit(instance.user_set.values_list('pk', flat=True))
+    elif pk_set:
+        invalidate_roles_on_commit(pk_set)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_roles_on_commit(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_roles_on_commit(instance.user_set.values_list('pk', flat=True))
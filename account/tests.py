@@ -1,3 +1,281 @@
-from django.test import TestCase
+import base64
+import json
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import jwt
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from account import response_cache
+from account.hashing import PARALLEL_THRESHOLD, hash_passwords
+from account.models import User
+from account.roles import DOCTOR, get_user_roles
+from account.token_issuer import TOKEN_LIFETIME, get_token_issuer
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from hospitalAdmin.api.serializers import AdminTokenObtainPairSerializer
+from hospitalAdmin.seeding import seed
+from main import db_routers
+from main.query_counts import Dataset
+from patient.api.serializers import PatientTokenObtainPairSerializer
+from patient.models import Appointment, Patient
+
+
+@override_settings(DATABASE_REPLICA='replica', REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.read_from = []
+        self.middleware = db_routers.ReplicaMiddleware(self.view)
+
+    def view(self, request):
+        self.read_from.append(Patient.objects.all().db)
+        return HttpResponse()
+
+    def login_view(self, request):
+        self.read_from.extend([Token.objects.all().db, Session.objects.all().db])
+        return HttpResponse()
+
+    def test_safe_requests_read_from_the_replica(self):
+        response = self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Bearer a'))
+        self.assertEqual(self.read_from, ['replica'])
+        self.assertNotIn(db_routers.PIN_COOKIE, response.cookies)
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(Patient.objects.all().db, 'default')
+
+    def test_writers_are_pinned_to_the_primary(self):
+        response = self.middleware(self.factory.post('/', HTTP_AUTHORIZATION='Bearer a'))
+        self.assertIn(db_routers.PIN_COOKIE, response.cookies)
+        # By cookie, by the same Authorization header, but not another client.
+        self.factory.cookies[db_routers.PIN_COOKIE] = '1'
+        self.middleware(self.factory.get('/'))
+        del self.factory.cookies[db_routers.PIN_COOKIE]
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Bearer a'))
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Bearer b'))
+        self.assertEqual(self.read_from, ['default', 'default', 'default', 'replica'])
+
+    def test_credentials_are_read_from_the_primary(self):
+        # Not pinned: a client that just logged in with POST login/ sends its new token, or session, for the first time.
+        db_routers.ReplicaMiddleware(self.login_view)(self.factory.get('/', HTTP_AUTHORIZATION='Token new'))
+        self.assertEqual(self.read_from, ['default', 'default'])
+
+    def test_invalidated_users_are_pinned_to_the_primary(self):
+        response_cache.invalidate(['user'])
+        self.assertTrue(db_routers.user_pinned('user'))
+        self.assertFalse(db_routers.user_pinned('other'))
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_a_replica(self):
+        response = self.middleware(self.factory.post('/'))
+        self.middleware(self.factory.get('/'))
+        self.assertEqual(self.read_from, ['default', 'default'])
+        self.assertNotIn(db_routers.PIN_COOKIE, response.cookies)
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='roles', password='password')
+        self.group = Group.objects.create(name=DOCTOR)
+
+    def cached_roles(self):
+        return get_user_roles(User.objects.get(pk=self.user.pk))
+
+    def test_group_changes_invalidate_on_commit(self):
+        self.assertEqual(self.cached_roles(), frozenset())
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.groups.add(self.group)
+            # A request before the commit still gets the roles it cached.
+            self.assertEqual(self.cached_roles(), frozenset())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.cached_roles(), frozenset([DOCTOR]))
+
+    def test_group_deletion_invalidates_its_members(self):
+        self.user.groups.add(self.group)
+        self.assertEqual(self.cached_roles(), frozenset([DOCTOR]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.delete()
+        self.assertEqual(self.cached_roles(), frozenset())
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = seed(patients=2, doctors=1, histories_per_patient=1).admin
+        cls.patient = Patient.objects.select_related('user').get(user__username='seed-patient-0')
+        cls.appointment = Appointment.objects.filter(patient_history__patient=cls.patient).order_by('pk').first()
+        Appointment.objects.filter(pk=cls.appointment.pk).update(status=False)
+
+    def setUp(self):
+        cache.clear()
+        self.patient_headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(PatientTokenObtainPairSerializer, self.patient.user))}
+
+    def history(self, etag=None):
+        headers = dict(self.patient_headers, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+        return self.client.get('/api/Patient/history/', **headers)
+
+    def appointment_status(self, response):
+        return next(appointment['status'] for history in response.json()
+                    for appointment in history['patient_appointments'] if appointment['id'] == self.appointment.pk)
+
+    def test_not_modified(self):
+        response = self.history()
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            cached = self.history(response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.history().content, response.content)
+
+    def test_saves_invalidate(self):
+        etag = self.history()['ETag']
+        self.appointment.refresh_from_db()
+        self.appointment.status = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment.save()
+        response = self.history(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIs(self.appointment_status(response), True)
+
+    def test_bulk_approval_invalidates(self):
+        response = self.history()
+        self.assertIs(self.appointment_status(response), False)
+        with self.captureOnCommitCallbacks(execute=True):
+            approved = self.client.post('/api/admin/approve/appointments/bulk/', {
+                'action': 'approve', 'ids': [self.appointment.pk]}, content_type='application/json',
+                HTTP_AUTHORIZATION='Bearer {}'.format(Dataset.access(AdminTokenObtainPairSerializer, self.admin)))
+        self.assertEqual(approved.json()['succeeded'], 1)
+        response = self.history(response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(self.appointment_status(response), True)
+
+
+class TokenIssuerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = int(time.time())
+        self.users = [User(pk=uuid.uuid4()) for _ in range(3)]
+
+    def decode(self, token):
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+
+    def test_tokens_are_standard_jwts(self):
+        with mock.patch('time.time', return_value=self.now + 0.5):
+            token = self.users[0].token
+            tokens = get_token_issuer().issue_many(iter(self.users))
+        # The claims of the jwt.encode() implementation, with exp a UTC epoch 60 days ahead.
+        claims = {'id': str(self.users[0].pk), 'exp': self.now + 60 * 24 * 3600}
+        self.assertEqual(self.decode(token), claims)
+        self.assertEqual(self.decode(token), self.decode(jwt.encode(claims, settings.SECRET_KEY, algorithm='HS256')))
+        self.assertEqual(jwt.get_unverified_header(token), {'alg': 'HS256', 'typ': 'JWT'})
+        self.assertEqual(list(tokens), [user.pk for user in self.users])
+        for user in self.users:
+            self.assertEqual(self.decode(tokens[user.pk]), {'id': str(user.pk), 'exp': claims['exp']})
+
+    def test_expired_tokens_are_rejected(self):
+        with mock.patch('time.time', return_value=time.time() - TOKEN_LIFETIME.total_seconds() - 1):
+            token = get_token_issuer().issue(self.users[0])
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            self.decode(token)
+
+    def test_tampered_tokens_are_rejected(self):
+        token = get_token_issuer().issue(self.users[0])
+        header, payload, signature = token.split('.')
+        forged = json.dumps({'id': str(self.users[1].pk), 'exp': self.decode(token)['exp']}).encode()
+        for tampered in ('.'.join((header, payload, signature[:10] + ('B' if signature[10] == 'A' else 'A') +
+                                   signature[11:])),
+                         '.'.join((header, base64.urlsafe_b64encode(forged).rstrip(b'=').decode(), signature))):
+            with self.assertRaises(jwt.InvalidSignatureError):
+                self.decode(tampered)
+        with self.assertRaises(jwt.InvalidSignatureError):
+            jwt.decode(token, 'another key', algorithms=['HS256'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class HashPasswordsTests(SimpleTestCase):
+    def check(self, passwords, hashes):
+        self.assertEqual(len(hashes), len(passwords))
+        for password, hashed in zip(passwords, hashes):
+            self.assertTrue(check_password(password, hashed))
+            self.assertFalse(check_password(password + '!', hashed))
+
+    def test_serial(self):
+        passwords = ['password-{}'.format(number) for number in range(PARALLEL_THRESHOLD + 8)]
+        with mock.patch('account.hashing.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            hashes = hash_passwords(iter(passwords))
+        pool.assert_not_called()
+        self.check(passwords, hashes)
+
+    def test_pooled(self):
+        passwords = ['password-{}'.format(number) for number in range(PARALLEL_THRESHOLD * 3 + 5)]
+        with mock.patch('account.hashing.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            hashes = hash_passwords(passwords, workers=2)
+        pool.assert_called_once()
+        self.check(passwords, hashes)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=3, doctors=1, histories_per_patient=2)
+        cls.doctor = result.doctors[0].user
+        patient = Patient.objects.first()
+        cls.patient = patient.user
+        Appointment.objects.filter(patient_history=patient.patienthistory_set.latest('admit_date')).update(
+            status=True, doctor=result.doctors[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, path, user=None, serializer_class=None, **params):
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = 'Bearer {}'.format(Dataset.access(serializer_class, user))
+        return self.client.get(path, params, **headers)
+
+    def test_same_bodies_as_the_sync_views(self):
+        first = Appointment.objects.filter(doctor__user=self.doctor, status=True).earliest('appointment_date')
+        feed = {'start': first.appointment_date.isoformat(), 'days': 31}
+        endpoints = [('/api/Patient/{}profile/', self.patient, PatientTokenObtainPairSerializer, {}),
+                     ('/api/Patient/{}history/', self.patient, PatientTokenObtainPairSerializer, {}),
+                     ('/api/Patient/{}appointment/', self.patient, PatientTokenObtainPairSerializer, {}),
+                     ('/api/doctor/{}profile/', self.doctor, DoctorTokenObtainPairSerializer, {}),
+                     ('/api/doctor/{}appointments/', self.doctor, DoctorTokenObtainPairSerializer, feed)]
+        for path, user, serializer_class, params in endpoints:
+            sync = self.get(path.format(''), user, serializer_class, **params)
+            response = self.get(path.format('async/'), user, serializer_class, **params)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertTrue(sync.json(), path)
+            # The doctor feed links to the next window of the same endpoint.
+            self.assertEqual(response.content.decode().replace('/async/', '/'), sync.content.decode(), path)
+        self.assertTrue(response.json()['appointments'])
+
+    def test_authentication(self):
+        self.assertEqual(self.get('/api/Patient/async/profile/').status_code, 401)
+        response = self.client.get('/api/Patient/async/profile/', HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.get('/api/doctor/async/profile/', self.patient,
+                                  PatientTokenObtainPairSerializer).status_code, 403)
+        self.assertEqual(self.get('/api/Patient/async/history/', self.doctor,
+                                  DoctorTokenObtainPairSerializer).status_code, 403)
+
+    def test_doctor_feed_validation(self):
+        for params in ({'start': '2026-02-30'}, {'days': 'week'}, {'days': 0}):
+            response = self.get('/api/doctor/async/appointments/', self.doctor, DoctorTokenObtainPairSerializer,
+                                **params)
+            self.assertEqual(response.status_code, 400, params)
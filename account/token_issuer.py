@@ -0,0 +1,60 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.encoding import force_bytes
+
+
+TOKEN_LIFETIME = timedelta(days=60)
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+class TokenIssuer:
+    """
+    Mints the HS256 tokens returned by `User.token`.
+
+    The HMAC key is prepared once per issuer and copied for every signature,
+    and the constant JWT header is encoded once, so issuing a token is a
+    JSON dump plus a single HMAC update. Tokens are regular JWTs that
+    `jwt.decode(token, SECRET_KEY, algorithms=['HS256'])` accepts.
+    """
+    header = _b64encode(b'{"alg":"HS256","typ":"JWT"}')
+
+    def __init__(self, key, lifetime=TOKEN_LIFETIME):
+        self._mac = hmac.new(force_bytes(key), digestmod=hashlib.sha256)
+        self.lifetime = int(lifetime.total_seconds())
+
+    def _sign(self, user_id, expires):
+        payload = json.dumps({'id': str(user_id), 'exp': expires}, separators=(',', ':'))
+        signing_input = self.header + b'.' + _b64encode(payload.encode())
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return (signing_input + b'.' + _b64encode(mac.digest())).decode()
+
+    def issue(self, user):
+        return self._sign(user.pk, int(time.time()) + self.lifetime)
+
+    def issue_many(self, users):
+        """
+        Returns `{user.pk: token}` for every user in `users`, all sharing one
+        expiry. Accepts any iterable, e.g. `User.objects.only('pk').iterator()`.
+        """
+        expires = int(time.time()) + self.lifetime
+        return {user.pk: self._sign(user.pk, expires) for user in users}
+
+
+@lru_cache(maxsize=4)
+def _issuer_for_key(key):
+    return TokenIssuer(key)
+
+
+def get_token_issuer():
+    return _issuer_for_key(settings.SECRET_KEY)
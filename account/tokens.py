@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer, TokenObtainSerializer, TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from .roles import ROLES_CLAIM, get_user_roles
+
+
+STATUS_CLAIM = 'status'
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Issues a refresh/access pair for one role (doctor, Patient or admin).
+
+    The user's roles and approval status are written into the token so that
+    `JWTStatelessUserAuthentication` and the role permissions can authorise a
+    request from the token alone, without reading the user or group tables.
+    Role or status changes take effect when the access token is renewed, see
+    `RoleTokenRefreshSerializer`.
+    """
+    role = None
+    require_approval = True
+
+    default_error_messages = {
+        'not_approved': _("Your account is not approved by admin yet!"),
+        'wrong_role': _("You are not authorised to login as {role}"),
+    }
+
+    def validate(self, attrs):
+        data = TokenObtainSerializer.validate(self, attrs)
+
+        if self.require_approval and not self.user.status:
+            raise exceptions.PermissionDenied(self.error_messages['not_approved'])
+        if self.role not in get_user_roles(self.user):
+            raise exceptions.PermissionDenied(self.error_messages['wrong_role'].format(role=self.role))
+
+        refresh = self.get_token(self.user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return data
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token[ROLES_CLAIM] = sorted(get_user_roles(user))
+        token[STATUS_CLAIM] = user.status
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Renews the access token of a refresh token issued for `role`.
+
+    The user is read again and must still be active, approved (unless
+    `require_approval` is off) and hold the role; the renewed token carries
+    their current roles and status, not those of the refresh token.
+    """
+    role = None
+    require_approval = True
+
+    default_error_messages = {
+        'no_active_account': _("No active account found with the given credentials"),
+        **RoleTokenObtainPairSerializer.default_error_messages,
+    }
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        User = get_user_model()
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]})
+        except (KeyError, User.DoesNotExist):
+            user = None
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        if self.require_approval and not user.status:
+            raise exceptions.PermissionDenied(self.error_messages['not_approved'])
+        roles = get_user_roles(user)
+        if self.role not in roles:
+            raise exceptions.PermissionDenied(self.error_messages['wrong_role'].format(role=self.role))
+
+        refresh['username'] = user.username
+        refresh[ROLES_CLAIM] = sorted(roles)
+        refresh[STATUS_CLAIM] = user.status
+        # The access token, and the rotated refresh token if any, are derived from the updated claims.
+        return super().validate({**attrs, 'refresh': str(refresh)})
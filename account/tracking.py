@@ -0,0 +1,25 @@
+class LoadedValuesMixin:
+    """
+    Model mixin remembering the field values an instance had when it was last
+    loaded from or saved to the database, so that post_save receivers can tell
+    what a save changed without querying the old row again.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        loaded = getattr(self, '_loaded_values', {}) if update_fields is not None else {}
+        for field in self._meta.concrete_fields:
+            if update_fields is None or field.name in update_fields or field.attname in update_fields:
+                loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+    def loaded_value(self, attname, default=None):
+        """The value of `attname` before the current save; `default` for new instances and deferred fields."""
+        return getattr(self, '_loaded_values', {}).get(attname, default)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from . models import Doctor
+from . models import Doctor, WorkingHours
 from patient.models import Appointment
 
 
@@ -7,9 +7,13 @@ class DoctorAppointment(admin.TabularInline):
     model = Appointment
 
 
+class DoctorWorkingHours(admin.TabularInline):
+    model = WorkingHours
+
+
 class DoctorAdmin(admin.ModelAdmin):
     list_display = ['get_name', 'department', 'address', 'mobile', 'user']
-    inlines = [DoctorAppointment]
+    inlines = [DoctorWorkingHours, DoctorAppointment]
 
 
 admin.site.register(Doctor, DoctorAdmin)
@@ -0,0 +1,42 @@
+"""Async variants of the doctor read endpoints, for ASGI deployments (see account.async_views)."""
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+
+from account.async_views import RoleAsyncView, json_response
+from account.response_cache import cached_response
+from account.roles import DOCTOR
+
+from doctor.models import Doctor
+
+from .pagination import AppointmentDatePagination
+from .serializers import DoctorRegistrationSerializer, DoctorProfileSerializer, DoctorAppointmentSerializer
+from .views import DoctorAppointmentView
+
+
+class AsyncDoctorProfileView(RoleAsyncView):
+    role = DOCTOR
+
+    @cached_response
+    async def get(self, request):
+        profile = await Doctor.objects.select_related('user').aget(user_id=request.user.pk)
+        return json_response({
+            'user_data': DoctorRegistrationSerializer(profile.user).data,
+            'profile_data': DoctorProfileSerializer(profile).data
+        })
+
+
+class AsyncDoctorAppointmentView(RoleAsyncView):
+    role = DOCTOR
+
+    @cached_response
+    async def get(self, request):
+        paginator = AppointmentDatePagination()
+        try:
+            # The paginator reads DRF's `query_params` and builds its links from the request.
+            appointments = paginator.window_queryset(DoctorAppointmentView().get_queryset(request.user),
+                                                     Request(request))
+        except ValidationError as error:
+            return json_response(error.detail, status.HTTP_400_BAD_REQUEST)
+        appointments = [appointment async for appointment in appointments]
+        return json_response(paginator.get_paginated_data(DoctorAppointmentSerializer(appointments, many=True).data))
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class AppointmentDatePagination(BasePagination):
+    """
+    Pages an appointment feed by date windows instead of row offsets.
+
+    `?start=YYYY-MM-DD` (default: today) and `?days=N` select the window
+    `start <= appointment_date < start + days`, which is a range scan on the
+    doctor's appointments; `next`/`previous` point at the adjacent windows.
+    """
+    start_query_param = 'start'
+    days_query_param = 'days'
+    default_days = 7
+    max_days = 31
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return list(self.window_queryset(queryset, request))
+
+    def window_queryset(self, queryset, request):
+        """`queryset` narrowed to the requested window, unevaluated."""
+        self.request = request
+        start = request.query_params.get(self.start_query_param)
+        try:
+            self.start = parse_date(start) if start else timezone.localdate()
+        except ValueError:
+            self.start = None
+        if self.start is None:
+            raise ValidationError({self.start_query_param: "Expected a date formatted as YYYY-MM-DD"})
+        try:
+            self.days = int(request.query_params.get(self.days_query_param, self.default_days))
+        except ValueError:
+            raise ValidationError({self.days_query_param: "Expected a number of days"})
+        if not 1 <= self.days <= self.max_days:
+            raise ValidationError({self.days_query_param: "Must be between 1 and {}".format(self.max_days)})
+        self.end = self.start + timedelta(days=self.days)
+        return queryset.filter(appointment_date__gte=self.start, appointment_date__lt=self.end)
+
+    def get_link(self, start):
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.start_query_param, start.isoformat())
+        return replace_query_param(url, self.days_query_param, self.days)
+
+    def get_paginated_data(self, data):
+        return {
+            'start': self.start,
+            'end': self.end - timedelta(days=1),
+            'next': self.get_link(self.end),
+            'previous': self.get_link(self.start - timedelta(days=self.days)),
+            'appointments': data
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
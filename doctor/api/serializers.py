@@ -1,4 +1,7 @@
 from rest_framework import serializers
+
+from account.roles import DOCTOR
+from account.tokens import RoleTokenObtainPairSerializer, RoleTokenRefreshSerializer
 from account.models import User
 from doctor.models import Doctor
 
@@ -101,14 +104,20 @@ class PatientHistorySerializerDoctorView(serializers.Serializer):
     
 
 class DoctorAppointmentSerializer(serializers.Serializer):
-    patient_name = serializers.SerializerMethodField('related_patient_name')
-    patient_age = serializers.SerializerMethodField('related_patient_age')
+    """
+    Expects appointments from `DoctorAppointmentView.get_queryset`, which annotates
+    `patient_full_name`/`patient_age` and joins the patient history and its doctor.
+    """
+    patient_name = serializers.CharField(label="Patient Name:", source='patient_full_name', read_only=True)
+    patient_age = serializers.DecimalField(label="Patient Age:", max_digits=4, decimal_places=1, read_only=True)
     appointment_date = serializers.DateField(label="Appointment Date:",)
     appointment_time = serializers.TimeField(label="Appointment Time:")
     patient_history = PatientHistorySerializerDoctorView(label='Patient History:')
 
-    def related_patient_name(self, obj):
-        return obj.patient_history.Patient.get_name
-    
-    def related_patient_age(self, obj):
-        return obj.patient_history.Patient.age
+
+class DoctorTokenObtainPairSerializer(RoleTokenObtainPairSerializer):
+    role = DOCTOR
+
+
+class DoctorTokenRefreshSerializer(RoleTokenRefreshSerializer):
+    role = DOCTOR
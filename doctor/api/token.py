@@ -3,10 +3,12 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from .serializers import DoctorTokenObtainPairSerializer, DoctorTokenRefreshSerializer
+
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    pass
+    serializer_class = DoctorTokenObtainPairSerializer
 
 
 class CustomTokenRefreshView(TokenRefreshView):
-    pass
+    serializer_class = DoctorTokenRefreshSerializer
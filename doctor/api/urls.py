@@ -1,5 +1,7 @@
-from .views import RegistrationView, CustomAuthToken, DoctorProfileView, DoctorAppointmentView
+from .views import RegistrationView, CustomAuthToken, DoctorProfileView, DoctorAppointmentView, DoctorSlotsView, \
+    DepartmentSlotsView, DoctorHistorySearchView
 from django.urls import path
+from .async_views import AsyncDoctorProfileView, AsyncDoctorAppointmentView
 from .token import CustomTokenObtainPairView, CustomTokenRefreshView
 
 
@@ -9,6 +11,11 @@ urlpatterns = [
     path('login/', CustomAuthToken.as_view(), name='api_doctor_login'),
     path('profile/', DoctorProfileView.as_view(), name='api_doctor_profile'),
     path('appointments/', DoctorAppointmentView.as_view(), name='api_doctor_profile'),
+    path('async/profile/', AsyncDoctorProfileView.as_view(), name='api_doctor_profile_async'),
+    path('async/appointments/', AsyncDoctorAppointmentView.as_view(), name='api_doctor_appointments_async'),
+    path('<int:pk>/slots/', DoctorSlotsView.as_view(), name='api_doctor_slots'),
+    path('department/<str:department>/slots/', DepartmentSlotsView.as_view(), name='api_department_slots'),
+    path('histories/search/', DoctorHistorySearchView.as_view(), name='api_doctor_history_search'),
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
 ]
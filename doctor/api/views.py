@@ -1,20 +1,34 @@
+from datetime import datetime, timedelta
+
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import BasePermission, IsAuthenticated
 
+from account.response_cache import cached_response
+from account.roles import DOCTOR, has_role
+
+from .pagination import AppointmentDatePagination
 from .serializers import DoctorRegistrationSerializer, DoctorProfileSerializer, DoctorAppointmentSerializer
 
 from doctor.models import Doctor
+from doctor.scheduling import DEPARTMENT_HORIZON_DAYS, AvailabilityIndex, department_availability, format_minutes
 
+from patient.api.search_views import HistorySearchView
 from patient.models import Appointment
 
 
 class IsDoctor(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.groups.filter(name='doctor').exists())
+        return has_role(request.user, DOCTOR)
 
 
 class CustomAuthToken(ObtainAuthToken):
@@ -23,7 +37,7 @@ class CustomAuthToken(ObtainAuthToken):
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        account_approval = user.groups.filter(name='doctor').exists()
+        account_approval = has_role(user, DOCTOR)
 
         if not user.status:
             return Response(
@@ -71,10 +85,11 @@ class RegistrationView(APIView):
 class DoctorProfileView(APIView):
     permission_classes = [IsDoctor]
 
+    @cached_response
     def get(self, request):
         user = request.user
-        profile = Doctor.objects.filter(user=user).get()
-        user_serializer = DoctorRegistrationSerializer(user)
+        profile = Doctor.objects.select_related('user').filter(user_id=user.pk).get()
+        user_serializer = DoctorRegistrationSerializer(profile.user)
         profile_serializer = DoctorProfileSerializer(profile)
         return Response({
             'user_data': user_serializer.data,
@@ -83,7 +98,7 @@ class DoctorProfileView(APIView):
 
     def put(self, request):
         user = request.user
-        profile = Doctor.objects.filter(user=user).get()
+        profile = Doctor.objects.filter(user_id=user.pk).get()
         profile_serializer = DoctorProfileSerializer(
             instance=profile, data=request.data.get('profile_data'), partial=True)
         if profile_serializer.is_valid():
@@ -99,10 +114,100 @@ class DoctorProfileView(APIView):
 class DoctorAppointmentView(APIView):
     permission_classes = [IsDoctor]
 
+    def get_queryset(self, user):
+        return Appointment.objects.filter(doctor__user_id=user.pk, status=True).select_related(
+            'patient_history__assigned_doctor__user'
+        ).annotate(
+            patient_full_name=Concat('patient_history__patient__user__first_name', Value(' '),
+                                'patient_history__patient__user__last_name'),
+            patient_age=F('patient_history__patient__age'),
+        ).order_by('appointment_date', 'appointment_time')
+
+    @cached_response
     def get(self, request):
-        user = request.user
-        user_doctor = Doctor.objects.filter(user=user).get()
-        appointments = Appointment.objects.filter(doctor=user_doctor, status=True).order_by('appointment_date',
-                                                                                            'appointment_time')
+        paginator = AppointmentDatePagination()
+        appointments = paginator.paginate_queryset(self.get_queryset(request.user), request, view=self)
         appointment_serializer = DoctorAppointmentSerializer(appointments, many=True)
-        return Response(appointment_serializer.data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(appointment_serializer.data)
+
+
+class DoctorSlotsView(APIView):
+    """
+    Free appointment slots of a doctor between `start` and `end` (inclusive, YYYY-MM-DD).
+    Defaults to the next 7 days; a request covers at most 62 days.
+    """
+    permission_classes = [IsAuthenticated]
+    max_days = 62
+
+    def get(self, request, pk):
+        doctor = get_object_or_404(Doctor.objects.only('id', 'slot_minutes'), pk=pk)
+        try:
+            start = parse_date(request.query_params.get('start', '')) or timezone.localdate()
+            end = parse_date(request.query_params.get('end', '')) or start + timedelta(days=6)
+        except ValueError:
+            return Response({'message': "start and end must be dates formatted as YYYY-MM-DD"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not start <= end < start + timedelta(days=self.max_days):
+            return Response({'message': "end must be on or after start and at most {} days later".format(
+                self.max_days - 1)}, status=status.HTTP_400_BAD_REQUEST)
+        slots = AvailabilityIndex([doctor.pk], start, end).free_slots(doctor.pk)
+        return Response({
+            'doctor': doctor.pk,
+            'slot_minutes': doctor.slot_minutes,
+            'slots': {day.isoformat(): [format_minutes(minutes) for minutes in free] for day, free in slots.items()}
+        }, status=status.HTTP_200_OK)
+
+
+class DepartmentSlotsView(APIView):
+    """
+    Earliest free slots across all approved doctors of a department, between `start` and `end`
+    (inclusive, YYYY-MM-DD, defaulting to today and the last day searched). `limit` slots are
+    returned, 10 by default and 50 at most. Slots already past today are skipped.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, department):
+        if department not in dict(Doctor.department_choices):
+            return Response({'message': "Unknown department {}".format(department)}, status=status.HTTP_404_NOT_FOUND)
+        now = timezone.localtime()
+        today = now.date()
+        last_day = today + timedelta(days=DEPARTMENT_HORIZON_DAYS - 1)
+        try:
+            start = parse_date(request.query_params.get('start', '')) or today
+            end = parse_date(request.query_params.get('end', '')) or last_day
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({'message': "start and end must be dates formatted as YYYY-MM-DD and limit a number"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not today <= start <= end <= last_day:
+            return Response({'message': "start and end must lie between {} and {}".format(today, last_day)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < limit <= self.max_limit:
+            return Response({'message': "limit must be between 1 and {}".format(self.max_limit)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        after = now.replace(tzinfo=None) if start == today else datetime.combine(start, datetime.min.time())
+        slots = department_availability(department, today).earliest(after, end, limit)
+        names = {
+            doctor_id: "{} {}".format(first_name, last_name)
+            for doctor_id, first_name, last_name in Doctor.objects.filter(
+                pk__in={doctor_id for _, _, doctor_id in slots}).values_list('id', 'user__first_name', 'user__last_name')
+        }
+        return Response({
+            'department': department,
+            'slots': [
+                {'doctor': doctor_id, 'doctor_name': names.get(doctor_id), 'appointment_date': day.isoformat(),
+                 'appointment_time': format_minutes(minutes)}
+                for day, minutes, doctor_id in slots
+            ]
+        }, status=status.HTTP_200_OK)
+
+
+class DoctorHistorySearchView(HistorySearchView):
+    """Full-text search over the symptoms of the histories assigned to the requesting doctor."""
+    permission_classes = [IsDoctor]
+
+    def get_doctor(self, request):
+        return get_object_or_404(Doctor.objects.only('id'), user_id=request.user.pk).pk
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class DoctorConfig(AppConfig):
     name = 'doctor'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,74 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from account.models import User
+from doctor.models import Doctor, WorkingHours
+from doctor.scheduling import AvailabilityIndex, DepartmentAvailability, to_time
+from patient.models import Patient, PatientHistory, Appointment
+
+
+class Command(BaseCommand):
+    help = "Times free-slot computation for many doctors over a month on synthetic, rolled-back data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=300)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--booked', type=float, default=0.3, help="Fraction of working slots already booked.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = datetime.date.today()
+        end = start + datetime.timedelta(days=options['days'] - 1)
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username='bench-slots-{}'.format(number), first_name='Bench', status=True)
+                for number in range(options['doctors'] + 1)
+            ])
+            doctors = Doctor.objects.bulk_create([Doctor(user=user, address='Bench', mobile='0') for user in users[1:]])
+            WorkingHours.objects.bulk_create([
+                WorkingHours(doctor=doctor, weekday=weekday, start_time=datetime.time(9), end_time=datetime.time(17))
+                for doctor in doctors for weekday in range(5)
+            ])
+            patient = Patient.objects.create(user=users[0], age=30, address='Bench', mobile='0')
+            history = PatientHistory.objects.create(patient=patient, assigned_doctor=doctors[0], symptomps='Bench')
+            appointments = [
+                Appointment(doctor=doctor, patient_history=history, appointment_date=day, appointment_time=to_time(slot))
+                for doctor in doctors
+                for day in (start + datetime.timedelta(days=offset) for offset in range(options['days']))
+                if day.weekday() < 5
+                for slot in range(9 * 60, 17 * 60, 30)
+                if rng.random() < options['booked']
+            ]
+            Appointment.objects.bulk_create(appointments, batch_size=2000)
+
+            started = time.perf_counter()
+            index = AvailabilityIndex([doctor.pk for doctor in doctors], start, end)
+            built = time.perf_counter()
+            free = sum(len(times) for doctor in doctors for times in index.free_slots(doctor.pk).values())
+            finished = time.perf_counter()
+
+            # All bench doctors share the default department.
+            department = DepartmentAvailability(Doctor.Cardiologist, start, options['days'])
+            department_built = time.perf_counter()
+            after = datetime.datetime.combine(start, datetime.time.min)
+            for _ in range(100):
+                department.earliest(after, end, 10)
+            searched = time.perf_counter()
+            for doctor in doctors[:100]:
+                department.refresh(doctor.pk, start)
+            refreshed = time.perf_counter()
+            transaction.set_rollback(True)
+
+        self.stdout.write("{} doctors x {} days, {} appointments: index built in {:.1f} ms, {} free slots "
+                          "listed in {:.1f} ms ({:.1f} ms total)".format(
+                              len(doctors), options['days'], len(appointments), (built - started) * 1000, free,
+                              (finished - built) * 1000, (finished - started) * 1000))
+        self.stdout.write("department structure built in {:.1f} ms, earliest 10 slots in {:.3f} ms, "
+                          "one doctor-day refreshed in {:.3f} ms".format(
+                              (department_built - finished) * 1000, (searched - department_built) * 10,
+                              (refreshed - searched) * 10))
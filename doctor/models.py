@@ -22,6 +22,7 @@ class Doctor(models.Model):
     address = models.TextField()
     mobile = models.CharField(max_length=20)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    slot_minutes = models.PositiveSmallIntegerField(verbose_name="Appointment length (minutes)", default=30)
 
     @property
     def get_name(self):
@@ -33,3 +34,37 @@ class Doctor(models.Model):
 
     def __str__(self):
         return "{} ({})".format(self.user.first_name, self.department)
+
+
+class WorkingHours(models.Model):
+    Monday = 0
+    Tuesday = 1
+    Wednesday = 2
+    Thursday = 3
+    Friday = 4
+    Saturday = 5
+    Sunday = 6
+
+    weekday_choices = [(Monday, 'Monday'),
+                       (Tuesday, 'Tuesday'),
+                       (Wednesday, 'Wednesday'),
+                       (Thursday, 'Thursday'),
+                       (Friday, 'Friday'),
+                       (Saturday, 'Saturday'),
+                       (Sunday, 'Sunday')
+    ]
+    doctor = models.ForeignKey(Doctor, related_name='working_hours', on_delete=models.CASCADE)
+    weekday = models.PositiveSmallIntegerField(choices=weekday_choices)
+    start_time = models.TimeField(verbose_name="Start time")
+    end_time = models.TimeField(verbose_name="End time")
+
+    class Meta:
+        verbose_name_plural = "working hours"
+        ordering = ['weekday', 'start_time']
+        constraints = [
+            models.CheckConstraint(check=models.Q(start_time__lt=models.F('end_time')),
+                                   name='working_hours_start_before_end'),
+        ]
+
+    def __str__(self):
+        return "{} {}-{}".format(self.get_weekday_display(), self.start_time, self.end_time)
@@ -0,0 +1,278 @@
+"""
+Doctor availability: working hours, free slots and double-booking checks.
+
+Times are handled as minutes since midnight. A doctor's day is cut into
+`slot_minutes` long slots starting at each working-hours block, and an
+appointment occupies `[appointment_time, appointment_time + slot_minutes)`.
+"""
+import datetime
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import islice, takewhile
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, IntegerField
+from django.db.models.functions import Cast, Substr
+
+from doctor.models import Doctor, WorkingHours
+
+MINUTES_PER_DAY = 24 * 60
+
+# Days ahead (today included) covered by the per-department availability structures.
+DEPARTMENT_HORIZON_DAYS = 62
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def format_minutes(minutes):
+    return '{:02d}:{:02d}'.format(minutes // 60, minutes % 60)
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def booked_minutes(appointments):
+    """
+    `(doctor_id, 'YYYY-MM-DD', start minute)` rows of `appointments`, in order. The database hands back the date as
+    ISO text and the time as minutes: building date/time objects for every row would cost more than the query itself.
+    """
+    time_text = Cast('appointment_time', CharField())
+    return appointments.values_list(
+        'doctor_id',
+        Cast('appointment_date', CharField()),
+        Cast(Substr(time_text, 1, 2), IntegerField()) * 60 + Cast(Substr(time_text, 4, 2), IntegerField()),
+    ).order_by('doctor_id', 'appointment_date', 'appointment_time')
+
+
+class AvailabilityIndex:
+    """
+    Free slots of a set of doctors over the days `start..end` (inclusive).
+
+    Building the index costs three queries whatever the number of doctors:
+    slot lengths, working hours, and the booked appointment times read from
+    the `(doctor, appointment_date, appointment_time)` index. Booked times
+    are kept as sorted per-doctor-per-day lists, so checking a slot is a
+    binary search and a day without bookings reuses the precomputed
+    weekday grid as is.
+    """
+
+    def __init__(self, doctor_ids, start, end):
+        from patient.models import Appointment
+
+        self.start = start
+        self.end = end
+        self.slot_minutes = dict(Doctor.objects.filter(id__in=doctor_ids).values_list('id', 'slot_minutes'))
+
+        # grids[doctor_id][weekday] -> slot start minutes, in order
+        self.grids = defaultdict(lambda: defaultdict(list))
+        hours = WorkingHours.objects.filter(doctor_id__in=self.slot_minutes).values_list(
+            'doctor_id', 'weekday', 'start_time', 'end_time').order_by('doctor_id', 'weekday', 'start_time')
+        for doctor_id, weekday, start_time, end_time in hours:
+            length = self.slot_minutes[doctor_id]
+            self.grids[doctor_id][weekday].extend(
+                range(to_minutes(start_time), to_minutes(end_time) - length + 1, length))
+
+        # booked[(doctor_id, 'YYYY-MM-DD')] -> sorted appointment start minutes
+        self.booked = defaultdict(list)
+        appointments = Appointment.objects.filter(doctor_id__in=self.slot_minutes, appointment_date__range=(start, end))
+        for doctor_id, day, minutes in booked_minutes(appointments):
+            self.booked[doctor_id, day].append(minutes)
+
+    def reload_day(self, doctor_id, day):
+        """Re-reads the bookings of one doctor on one day, after an appointment was added, moved or removed."""
+        from patient.models import Appointment
+
+        appointments = Appointment.objects.filter(doctor_id=doctor_id, appointment_date=day)
+        self.booked[doctor_id, day.isoformat()] = [minutes for _, _, minutes in booked_minutes(appointments)]
+
+    def free_minutes(self, doctor_id, day):
+        grid = self.grids[doctor_id][day.weekday()] if doctor_id in self.grids else ()
+        booked = self.booked.get((doctor_id, day.isoformat()))
+        if not booked:
+            return grid
+        length = self.slot_minutes[doctor_id]
+        free = []
+        for slot in grid:
+            # First booking that starts after slot - length; it overlaps unless it starts after the slot ends.
+            position = bisect_right(booked, slot - length)
+            if position == len(booked) or booked[position] >= slot + length:
+                free.append(slot)
+        return free
+
+    def free_slots(self, doctor_id):
+        """Returns `{date: [slot start minutes, ...]}` for the days on which the doctor has free slots."""
+        slots = {}
+        for day in date_range(self.start, self.end):
+            free = self.free_minutes(doctor_id, day)
+            if free:
+                slots[day] = free
+        return slots
+
+
+def free_slots(doctor, start, end):
+    return AvailabilityIndex([doctor.pk], start, end).free_slots(doctor.pk)
+
+
+def reserve_slot(doctor, appointment_date, appointment_time, exclude=None):
+    """
+    Raises `SlotUnavailable` if the requested appointment does not fit in one of
+    the doctor's working-hours blocks of that weekday, or if the doctor already
+    has an appointment overlapping it. A doctor without any working hours set
+    (none are set at registration) can be booked at any time, though no free
+    slots are listed for them. Must be called inside
+    `transaction.atomic()`, before the appointment is saved: the doctor row is
+    locked so concurrent bookings for the same doctor are checked one after the
+    other.
+    """
+    from patient.models import Appointment
+
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("reserve_slot() must be called inside transaction.atomic()")
+    slot_minutes = Doctor.objects.select_for_update().values_list('slot_minutes', flat=True).get(pk=doctor.pk)
+    start = to_minutes(appointment_time)
+    # A TimeField cannot hold 24:00, so a slot ending at midnight needs hours ending at 23:59.
+    if start + slot_minutes > MINUTES_PER_DAY or (not WorkingHours.objects.filter(
+            doctor_id=doctor.pk, weekday=appointment_date.weekday(), start_time__lte=to_time(start),
+            end_time__gte=to_time(min(start + slot_minutes, MINUTES_PER_DAY - 1))).exists()
+            and WorkingHours.objects.filter(doctor_id=doctor.pk).exists()):
+        raise SlotUnavailable("{} {} is outside of the doctor's working hours".format(
+            appointment_date, appointment_time.strftime('%H:%M')))
+    conflicts = Appointment.objects.filter(doctor_id=doctor.pk, appointment_date=appointment_date)
+    if start - slot_minutes >= 0:
+        conflicts = conflicts.filter(appointment_time__gt=to_time(start - slot_minutes))
+    if start + slot_minutes < MINUTES_PER_DAY:
+        conflicts = conflicts.filter(appointment_time__lt=to_time(start + slot_minutes))
+    if exclude is not None:
+        conflicts = conflicts.exclude(pk=exclude.pk)
+    if conflicts.exists():
+        raise SlotUnavailable("Doctor already has an appointment overlapping {} {}".format(
+            appointment_date, appointment_time.strftime('%H:%M')))
+
+
+class DepartmentAvailability:
+    """
+    Free slots of the approved doctors of a department over `DEPARTMENT_HORIZON_DAYS` days from `start`.
+
+    Each doctor's free slots are kept as one sorted list of `day.toordinal() * MINUTES_PER_DAY + minute` keys, so
+    the earliest slots of the whole department are the head of a heap merge of those lists, and a booking change
+    only rewrites the slice of one doctor's list covering the day it touched.
+    """
+
+    def __init__(self, department, start, days=DEPARTMENT_HORIZON_DAYS):
+        self.department = department
+        self.start = start
+        self.end = start + datetime.timedelta(days=days - 1)
+        self.version = 0
+        doctor_ids = Doctor.objects.filter(department=department, user__status=True).values_list('id', flat=True)
+        self.index = AvailabilityIndex(list(doctor_ids), self.start, self.end)
+        self.free = {}
+        for doctor_id in self.index.slot_minutes:
+            self.free[doctor_id] = [
+                day.toordinal() * MINUTES_PER_DAY + minutes
+                for day in date_range(self.start, self.end) for minutes in self.index.free_minutes(doctor_id, day)
+            ]
+
+    def refresh(self, doctor_id, day):
+        if doctor_id not in self.free or not self.start <= day <= self.end:
+            return
+        self.index.reload_day(doctor_id, day)
+        base = day.toordinal() * MINUTES_PER_DAY
+        free = self.free[doctor_id]
+        free[bisect_left(free, base):bisect_left(free, base + MINUTES_PER_DAY)] = [
+            base + minutes for minutes in self.index.free_minutes(doctor_id, day)]
+
+    @staticmethod
+    def _stream(doctor_id, free, first, last):
+        for key in takewhile(lambda key: key < last, islice(free, bisect_left(free, first), None)):
+            yield key, doctor_id
+
+    def earliest(self, after, end, limit):
+        """
+        The first `limit` free slots starting at or after the datetime `after` and on or before the date `end`,
+        as `(date, start minute, doctor_id)` tuples ordered by date, time and doctor.
+        """
+        first = after.toordinal() * MINUTES_PER_DAY + after.hour * 60 + after.minute
+        last = (end.toordinal() + 1) * MINUTES_PER_DAY
+        streams = [self._stream(doctor_id, free, first, last) for doctor_id, free in self.free.items()]
+        return [
+            (datetime.date.fromordinal(key // MINUTES_PER_DAY), key % MINUTES_PER_DAY, doctor_id)
+            for key, doctor_id in islice(heapq.merge(*streams), limit)
+        ]
+
+
+# Process-local DepartmentAvailability per department code. Each one remembers the version of the department it was
+# built or last refreshed at; the version lives in the shared cache so that a change made by one process makes the
+# others rebuild instead of serving stale slots.
+_departments = {}
+_departments_lock = threading.Lock()
+
+
+def _version_key(department):
+    return 'doctor:availability:{}'.format(department)
+
+
+def _bump_version(department):
+    key = _version_key(department)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def department_availability(department, today):
+    """The availability structure of `department` covering `today` onwards, built on first use."""
+    version = cache.get(_version_key(department), 0)
+    with _departments_lock:
+        availability = _departments.get(department)
+        if availability is None or availability.start != today or availability.version != version:
+            availability = DepartmentAvailability(department, today)
+            availability.version = version
+            _departments[department] = availability
+        return availability
+
+
+def doctor_bookings_changed(doctor_id, days):
+    """Applies added, moved or removed appointments of a doctor on `days` to its department's structure."""
+    department = Doctor.objects.filter(pk=doctor_id).values_list('department', flat=True).first()
+    if department is None:
+        return
+    with _departments_lock:
+        version = _bump_version(department)
+        availability = _departments.get(department)
+        if availability is None:
+            return
+        if availability.version != version - 1:
+            # Another process changed the department in between, the next search rebuilds it.
+            del _departments[department]
+            return
+        for day in days:
+            availability.refresh(doctor_id, day)
+        availability.version = version
+
+
+def departments_changed(departments):
+    """Drops the structures of `departments` after doctors, slot lengths or working hours changed."""
+    with _departments_lock:
+        for department in set(departments):
+            _bump_version(department)
+            _departments.pop(department, None)
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from account.models import User
+from patient.models import Appointment
+
+from .models import Doctor, WorkingHours
+from .scheduling import departments_changed, doctor_bookings_changed
+
+
+def _bookings_changed(slots):
+    """`slots` are `(doctor_id, date)` pairs; applied once the transaction commits."""
+    by_doctor = {}
+    for doctor_id, day in slots:
+        if doctor_id is not None and day is not None:
+            by_doctor.setdefault(doctor_id, set()).add(day)
+
+    def apply():
+        for doctor_id, days in by_doctor.items():
+            doctor_bookings_changed(doctor_id, days)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, **kwargs):
+    slots = [(instance.doctor_id, instance.appointment_date),
+             (instance.loaded_value('doctor_id'), instance.loaded_value('appointment_date'))]
+    _bookings_changed(slots)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    _bookings_changed([(instance.doctor_id, instance.appointment_date)])
+
+
+@receiver(pre_save, sender=Doctor)
+def doctor_saving(sender, instance, **kwargs):
+    instance._previous_department = None
+    if instance.pk is not None:
+        instance._previous_department = sender.objects.filter(pk=instance.pk).values_list(
+            'department', flat=True).first()
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, **kwargs):
+    departments = [instance.department]
+    if getattr(instance, '_previous_department', None):
+        departments.append(instance._previous_department)
+    transaction.on_commit(lambda: departments_changed(departments))
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: departments_changed([instance.department]))
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+def working_hours_changed(sender, instance, **kwargs):
+    departments = list(Doctor.objects.filter(pk=instance.doctor_id).values_list('department', flat=True))
+    transaction.on_commit(lambda: departments_changed(departments))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Only approved doctors are offered.
+    if created or instance.status == instance.loaded_value('status', instance.status):
+        return
+    departments = list(Doctor.objects.filter(user_id=instance.pk).values_list('department', flat=True))
+    if departments:
+        transaction.on_commit(lambda: departments_changed(departments))
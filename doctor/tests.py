@@ -1,3 +1,149 @@
+import datetime
+from itertools import count
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import User
+from account.roles import DOCTOR, PATIENT, ROLES_CLAIM
+from account.tokens import STATUS_CLAIM
+from doctor.api import urls
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from doctor import scheduling
+from doctor.models import Doctor, WorkingHours
+from hospitalAdmin.seeding import PASSWORD
+from main.query_counts import QueryScalingTests, Request
+from patient.models import Appointment, Patient, PatientHistory
+
+
+class DoctorQueryCountTests(QueryScalingTests, TestCase):
+    urlconf = urls
+    prefix = 'api/doctor/'
+
+    def requests(self, data):
+        token = data.doctor_token
+        usernames = count()
+
+        def registration():
+            return {'user_data': {'username': 'new-doctor-{}'.format(next(usernames)), 'first_name': 'New',
+                                  'last_name': 'Doctor', 'password': 'new-password', 'password2': 'new-password'},
+                    'profile_data': {'department': 'CL', 'address': 'Dhaka', 'mobile': '01700000000'}}
+
+        credentials = {'username': data.doctor.user.username, 'password': PASSWORD}
+        return {
+            'registration': Request('post', '/api/doctor/registration/', data=registration),
+            'login': Request('post', '/api/doctor/login/', data=credentials),
+            'token': Request('post', '/api/doctor/token/', data=credentials),
+            'token refresh': Request('post', '/api/doctor/token/refresh/', data={
+                'refresh': data.refresh(DoctorTokenObtainPairSerializer, data.doctor.user)}),
+            'profile': Request('get', '/api/doctor/profile/', token),
+            'profile update': Request('put', '/api/doctor/profile/', token,
+                                      data={'profile_data': {'address': 'Chittagong'}}),
+            'appointments': Request('get', '/api/doctor/appointments/', token),
+            'async profile': Request('get', '/api/doctor/async/profile/', token),
+            'async appointments': Request('get', '/api/doctor/async/appointments/', token),
+            'history search': Request('get', '/api/doctor/histories/search/', token, data={'q': 'pain'}),
+            'slots': Request('get', '/api/doctor/{}/slots/'.format(data.doctor.pk), token),
+            'department slots': Request('get', '/api/doctor/department/{}/slots/'.format(data.doctor.department),
+                                        token),
+        }
+
+
+class DoctorTokenRefreshTests(TestCase):
+    """A refresh reads the user again, so revoked or unapproved doctors cannot renew their access token."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='doctor', password=PASSWORD, first_name='Doctor', status=True)
+        Doctor.objects.create(user=self.user, address='Dhaka', mobile='1')
+        self.group = Group.objects.get_or_create(name=DOCTOR)[0]
+        self.user.groups.add(self.group)
+        response = self.client.post('/api/doctor/token/', {'username': 'doctor', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+        self.refresh = response.json()['refresh']
+
+    def refresh_token(self):
+        return self.client.post('/api/doctor/token/refresh/', {'refresh': self.refresh})
+
+    def test_refresh_writes_current_claims(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(Group.objects.create(name=PATIENT))
+        response = self.refresh_token()
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.json()['access'])
+        self.assertEqual(access[ROLES_CLAIM], sorted([DOCTOR, PATIENT]))
+        self.assertIs(access[STATUS_CLAIM], True)
+
+    def test_revoked_role(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.group)
+        self.assertEqual(self.refresh_token().status_code, 403)
+
+    def test_unapproved(self):
+        User.objects.filter(pk=self.user.pk).update(status=False)
+        self.assertEqual(self.refresh_token().status_code, 403)
+
+    def test_inactive_or_deleted(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.refresh_token().status_code, 401)
+        self.user.delete()
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+
+class DepartmentAvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        day = timezone.localdate() + datetime.timedelta(days=7)
+        cls.monday = day - datetime.timedelta(days=day.weekday())
+        cls.first, cls.second = [
+            Doctor.objects.create(user=User.objects.create(username=username, status=True), address='Dhaka',
+                                  mobile='1', department='CL', slot_minutes=slot_minutes)
+            for username, slot_minutes in (('first', 30), ('second', 60))]
+        WorkingHours.objects.create(doctor=cls.first, weekday=WorkingHours.Monday, start_time=datetime.time(10),
+                                    end_time=datetime.time(12))
+        WorkingHours.objects.create(doctor=cls.second, weekday=WorkingHours.Monday, start_time=datetime.time(9),
+                                    end_time=datetime.time(11))
+        patient = Patient.objects.create(user=User.objects.create(username='patient'), age=30, address='Dhaka',
+                                         mobile='1')
+        cls.history = PatientHistory.objects.create(patient=patient, assigned_doctor=cls.first, department='CL',
+                                                    symptomps='Cough')
+
+    def setUp(self):
+        cache.clear()
+        scheduling._departments.clear()
+
+    def availability(self):
+        return scheduling.department_availability('CL', self.monday)
+
+    def earliest(self, limit=10):
+        return [(minutes, doctor_id) for day, minutes, doctor_id in self.availability().earliest(
+            datetime.datetime.combine(self.monday, datetime.time()), self.monday, limit)]
+
+    def test_earliest_slots_across_doctors(self):
+        self.assertEqual(self.earliest(), [(540, self.second.pk), (600, self.first.pk), (600, self.second.pk),
+                                           (630, self.first.pk), (660, self.first.pk), (690, self.first.pk)])
+        self.assertEqual(self.earliest(limit=2), [(540, self.second.pk), (600, self.first.pk)])
+
+    def test_bookings_update_the_slots_in_place(self):
+        availability = self.availability()
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.create(appointment_date=self.monday, appointment_time=datetime.time(10),
+                                                     patient_history=self.history, doctor=self.second)
+        self.assertIs(self.availability(), availability)
+        self.assertEqual(self.earliest(), [(540, self.second.pk), (600, self.first.pk), (630, self.first.pk),
+                                           (660, self.first.pk), (690, self.first.pk)])
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertIs(self.availability(), availability)
+        self.assertEqual(self.earliest(limit=3), [(540, self.second.pk), (600, self.first.pk),
+                                                  (600, self.second.pk)])
 
-# Create your tests here.
+    def test_working_hours_changes_rebuild_the_doctor_slots(self):
+        availability = self.availability()
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkingHours.objects.create(doctor=self.second, weekday=WorkingHours.Monday,
+                                        start_time=datetime.time(7), end_time=datetime.time(8))
+        self.assertIsNot(self.availability(), availability)
+        self.assertEqual(self.earliest(limit=2), [(420, self.second.pk), (540, self.second.pk)])
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DailyDepartmentStats
+
+
+class DailyDepartmentStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'department', 'admissions', 'releases', 'average_stay', 'appointments')
+    list_filter = ('department',)
+    date_hierarchy = 'date'
+
+
+admin.site.register(DailyDepartmentStats, DailyDepartmentStatsAdmin)
@@ -0,0 +1,182 @@
+"""
+Occupancy, length-of-stay and readmission analytics over PatientHistory.
+
+Admit/release dates are read with `values_list` in chunks straight into
+NumPy arrays (days since the epoch, `NaT` for patients not released yet).
+They are fetched as ISO text, which NumPy parses in C: going through
+`datetime.date` objects costs far more than the query itself. Then
+every metric is computed for all departments at once with array
+operations instead of a Python loop per history.
+
+A history occupies a bed from its admit date up to, but not including, its
+release date. A release counts as readmitted when the same patient is
+admitted again within `READMISSION_DAYS` days.
+"""
+import datetime
+from itertools import islice
+
+import numpy as np
+
+from django.db.models import CharField, Q
+from django.db.models.functions import Cast
+
+from patient.models import PatientHistory
+
+
+CHUNK_SIZE = 50000
+READMISSION_DAYS = 30
+PERCENTILES = (50, 90, 99)
+
+OCCUPANCY = 'occupancy'
+LENGTH_OF_STAY = 'length-of-stay'
+READMISSIONS = 'readmissions'
+METRICS = (OCCUPANCY, LENGTH_OF_STAY, READMISSIONS)
+
+
+class Stays:
+    """Column arrays of the histories relevant to a `start..end` report, one element per history."""
+
+    def __init__(self, patients, departments, admits, releases, start, end):
+        self.patients = patients
+        self.departments = departments
+        self.admits = admits
+        self.releases = releases
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return len(self.admits)
+
+    @staticmethod
+    def _day(value):
+        return np.datetime64(value, 'D').astype(np.int64)
+
+    @classmethod
+    def load(cls, start, end, department=None, chunk_size=CHUNK_SIZE):
+        """
+        Histories still in hospital at some point of `start..end`, plus those admitted up to
+        `READMISSION_DAYS` after `end` (the readmissions of patients released near the end).
+        """
+        histories = PatientHistory.objects.filter(
+            Q(release_date__isnull=True) | Q(release_date__gte=start),
+            admit_date__lte=end + datetime.timedelta(days=READMISSION_DAYS),
+        )
+        if department:
+            histories = histories.filter(department=department)
+        rows = histories.values_list(
+            'patient_id', 'department', Cast('admit_date', CharField()), Cast('release_date', CharField())
+        ).iterator(chunk_size=chunk_size)
+        columns = ([], [], [], [])
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            patients, departments, admits, releases = zip(*chunk)
+            columns[0].append(np.fromiter(patients, dtype=np.int64, count=len(chunk)))
+            columns[1].append(np.array(departments, dtype='U3'))
+            columns[2].append(np.array(admits, dtype='datetime64[D]').astype(np.int64))
+            columns[3].append(np.array(releases, dtype='datetime64[D]'))
+        if not columns[0]:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(empty, np.empty(0, dtype='U3'), empty, np.empty(0, dtype='datetime64[D]'), start, end)
+        return cls(np.concatenate(columns[0]), np.concatenate(columns[1]), np.concatenate(columns[2]),
+                   np.concatenate(columns[3]), start, end)
+
+    def department_codes(self):
+        """Sorted department codes and, per history, the index of its department among them."""
+        return np.unique(self.departments, return_inverse=True)
+
+
+def occupancy(stays):
+    """
+    Occupied beds per department per day of the report range, as
+    `{department: {'days': [...], 'peak': n, 'mean': x}}`.
+    """
+    start, end = Stays._day(stays.start), Stays._day(stays.end)
+    days = int(end - start + 1)
+    codes, index = stays.department_codes()
+    # NaT (not released) stays occupied past the end of the range.
+    releases = np.where(np.isnat(stays.releases), end + 1, stays.releases.astype(np.int64))
+    first = np.clip(stays.admits, start, end + 1) - start
+    last = np.clip(releases, start, end + 1) - start
+    present = first < last
+    # +1 on the first occupied day, -1 on the release day, then a running sum per department.
+    changes = np.zeros((len(codes), days + 1), dtype=np.int64)
+    np.add.at(changes, (index[present], first[present]), 1)
+    np.add.at(changes, (index[present], last[present]), -1)
+    occupied = np.cumsum(changes[:, :days], axis=1)
+    return {
+        code: {'days': occupied[position].tolist(), 'peak': int(occupied[position].max(initial=0)),
+               'mean': float(occupied[position].mean()) if days else 0.0}
+        for position, code in enumerate(codes)
+    }
+
+
+def _released_in_range(stays):
+    """Mask of the stays released during the report range, and the release days (0 where not released)."""
+    released = ~np.isnat(stays.releases)
+    releases = np.where(released, stays.releases.astype(np.int64), 0)
+    return released & (releases >= Stays._day(stays.start)) & (releases <= Stays._day(stays.end)), releases
+
+
+def length_of_stay(stays):
+    """
+    Length of stay (days) of the patients released during the report range, per department:
+    `{department: {'releases': n, 'mean': x, 'p50': x, 'p90': x, 'p99': x}}`.
+    """
+    mask, releases = _released_in_range(stays)
+    codes, index = stays.department_codes()
+    lengths = releases[mask] - stays.admits[mask]
+    index = index[mask]
+    order = np.argsort(index, kind='stable')
+    groups = np.split(lengths[order], np.searchsorted(index[order], np.arange(1, len(codes))))
+    result = {}
+    for code, group in zip(codes, groups):
+        if not len(group):
+            continue
+        values = np.percentile(group, PERCENTILES)
+        result[code] = dict({'releases': int(len(group)), 'mean': float(group.mean())},
+                            **{'p{}'.format(percentile): float(value)
+                               for percentile, value in zip(PERCENTILES, values)})
+    return result
+
+
+def readmissions(stays, days=READMISSION_DAYS):
+    """
+    Share of the releases during the report range followed by another admission of the same
+    patient within `days` days, per department of the released stay:
+    `{department: {'releases': n, 'readmissions': n, 'rate': x}}`.
+    """
+    mask, releases = _released_in_range(stays)
+    codes, index = stays.department_codes()
+    # Each stay's next admission is the following row once sorted by patient then admit date.
+    order = np.lexsort((stays.admits, stays.patients))
+    patients, admits = stays.patients[order], stays.admits[order]
+    next_admit = np.full(len(order), np.iinfo(np.int64).max // 2)
+    same_patient = patients[1:] == patients[:-1]
+    next_admit[:-1][same_patient] = admits[1:][same_patient]
+    gap = np.empty(len(order), dtype=np.int64)
+    gap[order] = next_admit - releases[order]
+    readmitted = mask & (gap >= 0) & (gap <= days)
+
+    release_counts = np.bincount(index[mask], minlength=len(codes))
+    readmission_counts = np.bincount(index[readmitted], minlength=len(codes))
+    return {
+        code: {'releases': int(released), 'readmissions': int(readmitted_count),
+               'rate': float(readmitted_count / released)}
+        for code, released, readmitted_count in zip(codes, release_counts, readmission_counts) if released
+    }
+
+
+def report(metric, start, end, department=None):
+    """`{department: figures}` for one of `METRICS`, optionally for a single department."""
+    if metric not in METRICS:
+        raise ValueError("Unknown metric {!r}, expected one of {}".format(metric, ', '.join(METRICS)))
+    if metric == READMISSIONS:
+        # A patient may come back through any department, so every department is loaded.
+        result = readmissions(Stays.load(start, end))
+        if department:
+            result = {code: figures for code, figures in result.items() if code == department}
+        return result
+    stays = Stays.load(start, end, department)
+    return occupancy(stays) if metric == OCCUPANCY else length_of_stay(stays)
@@ -0,0 +1,86 @@
+from django.db import transaction
+
+from account import response_cache
+from account.models import User
+from doctor.models import Doctor
+from doctor.scheduling import departments_changed
+from hospitalAdmin import approval_queue
+from hospitalAdmin.approval_queue import ACCOUNT_QUEUES, APPOINTMENTS, appointment_timestamp
+from patient.models import Appointment
+
+
+APPROVE = 'approve'
+REJECT = 'reject'
+ACTIONS = (APPROVE, REJECT)
+
+
+def _apply(model, pending_ids, action):
+    """Approves (one UPDATE) or rejects (deletes) the pending rows `pending_ids`, returns how many were changed."""
+    rows = model.objects.filter(pk__in=pending_ids, status=False)
+    if action == APPROVE:
+        return rows.update(status=True)
+    _, deleted = rows.delete()
+    return deleted.get(model._meta.label, 0)
+
+
+def _result(action, requested_ids, pending_ids, changed):
+    pending_ids = set(pending_ids)
+    return {
+        'action': action,
+        'succeeded': changed,
+        # Unknown ids and rows that were no longer waiting for approval when locked, e.g. approved concurrently.
+        'failed': [pk for pk in requested_ids if pk not in pending_ids],
+    }
+
+
+def bulk_approve_accounts(ids, group_name, action):
+    """
+    Approves or rejects the pending accounts `ids` of the `group_name` role.
+
+    Approval sets `status` with a single `UPDATE ... WHERE id IN (...)`; rejection
+    deletes the accounts, like rejecting them one by one does. The pending rows
+    are locked as they are read, so a concurrent approval either lands before
+    (and they are reported as failed) or waits for this one.
+    """
+    with transaction.atomic():
+        pending = dict(User.objects.select_for_update(of=('self',))
+                       .filter(pk__in=ids, groups__name=group_name, status=False)
+                       .values_list('pk', 'date_joined'))
+        pending_ids = list(pending)
+        changed = _apply(User, pending_ids, action)
+        if action == APPROVE:
+            # `update()` sends no post_save: update the approval queue and the availability of the
+            # newly approved doctors here.
+            timestamps = list(pending.values())
+            transaction.on_commit(lambda: approval_queue.left(ACCOUNT_QUEUES[group_name], timestamps))
+            departments = list(Doctor.objects.filter(user_id__in=pending_ids).values_list('department', flat=True))
+            if departments:
+                transaction.on_commit(lambda: departments_changed(departments))
+    return _result(action, ids, pending_ids, changed)
+
+
+def bulk_approve_appointments(action, ids=None, appointment_date=None, doctor_id=None):
+    """
+    Approves or rejects pending appointments, given either their `ids` or an
+    `appointment_date` (optionally narrowed to one doctor).
+    """
+    pending = Appointment.objects.filter(status=False)
+    if ids is not None:
+        pending = pending.filter(pk__in=ids)
+    else:
+        pending = pending.filter(appointment_date=appointment_date)
+        if doctor_id is not None:
+            pending = pending.filter(doctor_id=doctor_id)
+    with transaction.atomic():
+        pending = {pk: appointment_timestamp(day, time) for pk, day, time in pending.select_for_update().values_list(
+            'pk', 'appointment_date', 'appointment_time')}
+        pending_ids = list(pending)
+        changed = _apply(Appointment, pending_ids, action)
+        if action == APPROVE:
+            timestamps = list(pending.values())
+            transaction.on_commit(lambda: approval_queue.left(APPOINTMENTS, timestamps))
+            # Approved appointments join the doctors' feeds, and change their status in the patients' histories.
+            users = Appointment.objects.filter(pk__in=pending_ids).values_list(
+                'doctor__user_id', 'patient_history__patient__user_id')
+            response_cache.invalidate_on_commit({user_id for pair in users for user_id in pair})
+    return _result(action, ids or (), pending_ids, changed)
@@ -0,0 +1,84 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from account.hashing import hash_passwords
+from account.models import User
+
+
+BATCH_SIZE = 500
+
+
+def _taken_usernames(usernames):
+    """Returns which of the lower-cased `usernames` already exist, one query per batch."""
+    usernames = list(usernames)
+    taken = set()
+    for start in range(0, len(usernames), BATCH_SIZE):
+        taken.update(User.objects.annotate(username_lower=Lower('username'))
+                     .filter(username_lower__in=usernames[start:start + BATCH_SIZE])
+                     .values_list('username_lower', flat=True))
+    return taken
+
+
+def bulk_register(rows, registration_serializer_class, profile_serializer_class, profile_model, group_name):
+    """
+    Validates and creates one account per `{'user_data': ..., 'profile_data': ...}` row.
+
+    Every row goes through the same serializers as the single registration
+    endpoints, except that username uniqueness is checked for the whole batch
+    at once. If any row is invalid nothing is written and the per-row errors
+    are returned. Otherwise the passwords are hashed in this process, and the
+    users, profiles and group memberships are inserted with `bulk_create` in
+    a single transaction.
+
+    Returns a `(users, errors)` tuple.
+    """
+    errors = []
+    accounts = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'message': "Expected an object with user_data and profile_data"})
+            continue
+        registration_serializer = registration_serializer_class(data=row.get('user_data'), context={'bulk': True})
+        profile_serializer = profile_serializer_class(data=row.get('profile_data'))
+        check_registration = registration_serializer.is_valid()
+        check_profile = profile_serializer.is_valid()
+        if check_registration and check_profile:
+            accounts.append((index, registration_serializer.validated_data, profile_serializer.validated_data))
+        else:
+            errors.append({'index': index,
+                           'user_data': registration_serializer.errors,
+                           'profile_data': profile_serializer.errors})
+
+    rows_by_username = {}
+    for index, user_data, profile_data in accounts:
+        rows_by_username.setdefault(user_data['username'].lower(), []).append(index)
+    taken = _taken_usernames(rows_by_username)
+    for username, indexes in rows_by_username.items():
+        duplicates = indexes if username in taken else indexes[1:]
+        for index in duplicates:
+            errors.append({'index': index, 'user_data': {'username': ['This username already exists']}})
+
+    if errors:
+        return [], sorted(errors, key=lambda error: error['index'])
+
+    passwords = hash_passwords([user_data['password'] for index, user_data, profile_data in accounts])
+    users = [
+        User(username=user_data['username'],
+             first_name=user_data['first_name'],
+             last_name=user_data.get('last_name', ''),
+             password=password,
+             status=True)
+        for (index, user_data, profile_data), password in zip(accounts, passwords)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        profile_model.objects.bulk_create(
+            [profile_model(user=user, **profile_data) for user, (index, user_data, profile_data)
+             in zip(users, accounts)],
+            batch_size=BATCH_SIZE)
+        group, created = Group.objects.get_or_create(name=group_name)
+        membership = User.groups.through
+        membership.objects.bulk_create(
+            [membership(user_id=user.pk, group_id=group.pk) for user in users], batch_size=BATCH_SIZE)
+    return users, []
@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class AccountCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the admin account listings.
+
+    Pages are located with `WHERE date_joined > <cursor>` instead of an OFFSET,
+    so every page costs the same no matter how deep the client scrolls.
+    The page size comes from `REST_FRAMEWORK['PAGE_SIZE']`.
+    """
+    ordering = ('date_joined', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, results_key='results'):
+        self.results_key = results_key
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            self.results_key: data
+        })
+
+
+class PendingAppointmentPagination(AccountCursorPagination):
+    """Keyset pagination of the appointment approval queue, earliest appointment first."""
+    ordering = ('appointment_date', 'appointment_time', 'id')
@@ -1,13 +1,23 @@
 from patient.models import (Appointment, PatientHistory, Patient)
 
+from django.db import transaction
+
 from rest_framework import serializers
 
+from account.roles import ADMIN
+from account.tokens import RoleTokenObtainPairSerializer, RoleTokenRefreshSerializer
+
 from account.models import User
 
 from doctor.models import Doctor
+from doctor.scheduling import SlotUnavailable, reserve_slot
 
 from django.contrib.auth.models import Group
 
+from .approval import ACTIONS
+
+MAX_BULK_APPROVALS = 1000
+
 
 class DoctorRegistrationSerializerAdmin(serializers.Serializer):
     username = serializers.CharField(label='Username:')
@@ -19,6 +29,9 @@ class DoctorRegistrationSerializerAdmin(serializers.Serializer):
     password2 = serializers.CharField(label='Confirm password:', style={'input_type': 'password'},  write_only=True)
 
     def validate_username(self, username):
+        if self.context.get('bulk'):
+            # bulk_register checks the whole batch with one query
+            return username
         username_exists = User.objects.filter(username__iexact=username)
         if username_exists:
             raise serializers.ValidationError({'username': 'This username already exists'})
@@ -144,26 +157,62 @@ class AppointmentSerializerAdmin(serializers.Serializer):
     doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all())
 
     def create(self, validated_data):
-        new_appointment = Appointment.objects.create(
-            appointment_date=validated_data['appointment_date'],
-            appointment_time=validated_data['appointment_time'],
-            status=True,
-            patient_history=validated_data['patient_history'],
-            doctor=validated_data['doctor']
-        )
+        with transaction.atomic():
+            try:
+                reserve_slot(validated_data['doctor'], validated_data['appointment_date'],
+                             validated_data['appointment_time'])
+            except SlotUnavailable as error:
+                raise serializers.ValidationError({'appointment_time': str(error)})
+            new_appointment = Appointment.objects.create(
+                appointment_date=validated_data['appointment_date'],
+                appointment_time=validated_data['appointment_time'],
+                status=True,
+                patient_history=validated_data['patient_history'],
+                doctor=validated_data['doctor']
+            )
         return new_appointment
 
     def update(self, instance, validated_data):
+        slot = (instance.doctor_id, instance.appointment_date, instance.appointment_time)
         instance.appointment_date = validated_data.get('appointment_date', instance.appointment_date)
         instance.appointment_time = validated_data.get('appointment_time', instance.appointment_time)
         instance.status = validated_data.get('status', instance.status)
         instance.patient_history = validated_data.get('patient_history', instance.patient_history)
         instance.doctor = validated_data.get('doctor', instance.doctor)
-        instance.save()
+        with transaction.atomic():
+            # Approving an appointment, or moving it to another history, keeps the slot it already holds.
+            if instance.doctor is not None and slot != (instance.doctor_id, instance.appointment_date,
+                                                        instance.appointment_time):
+                try:
+                    reserve_slot(instance.doctor, instance.appointment_date, instance.appointment_time,
+                                 exclude=instance)
+                except SlotUnavailable as error:
+                    raise serializers.ValidationError({'appointment_time': str(error)})
+            instance.save()
 
         return instance
 
 
+class AccountBulkApprovalSerializerAdmin(serializers.Serializer):
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_BULK_APPROVALS)
+
+
+class AppointmentBulkApprovalSerializerAdmin(serializers.Serializer):
+    action = serializers.ChoiceField(choices=ACTIONS)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False,
+                                max_length=MAX_BULK_APPROVALS)
+    appointment_date = serializers.DateField(label='Appointment date', required=False)
+    doctor = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('appointment_date' in data):
+            raise serializers.ValidationError("Send either `ids` or an `appointment_date`, optionally with a `doctor`")
+        if 'doctor' in data and 'appointment_date' not in data:
+            raise serializers.ValidationError("`doctor` can only narrow down an `appointment_date`")
+        return data
+
+
 class PatientRegistrationSerializerAdmin(serializers.Serializer):
     username = serializers.CharField(label='Username:')
     first_name = serializers.CharField(label='First name:')
@@ -174,6 +223,9 @@ class PatientRegistrationSerializerAdmin(serializers.Serializer):
     password2 = serializers.CharField(label='Confirm password:', style={'input_type': 'password'},  write_only=True)
 
     def validate_username(self, username):
+        if self.context.get('bulk'):
+            # bulk_register checks the whole batch with one query
+            return username
         username_exists = User.objects.filter(username__iexact=username)
         if username_exists:
             raise serializers.ValidationError({'username': 'This username already exists'})
@@ -317,4 +369,14 @@ class PatientHistorySerializerAdmin(serializers.Serializer):
         saved_cost.save()
 
         return instance
-    
\ No newline at end of file
+    
+
+
+class AdminTokenObtainPairSerializer(RoleTokenObtainPairSerializer):
+    role = ADMIN
+    require_approval = False
+
+
+class AdminTokenRefreshSerializer(RoleTokenRefreshSerializer):
+    role = ADMIN
+    require_approval = False
@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView,
+    TokenRefreshView,
+)
+
+from .serializers import AdminTokenObtainPairSerializer, AdminTokenRefreshSerializer
+
+
+class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = AdminTokenObtainPairSerializer
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = AdminTokenRefreshSerializer
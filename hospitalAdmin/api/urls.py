@@ -2,37 +2,62 @@ from .views import (
     CustomAuthToken,
     DoctorAccountViewAdmin,
     DocRegistrationViewAdmin,
+    DocBulkRegistrationViewAdmin,
+    ApprovalQueueViewAdmin,
     ApproveDoctorViewAdmin,
+    DocBulkApprovalViewAdmin,
     AppointmentViewAdmin,
     PatientRegistrationViewAdmin,
+    PatientBulkRegistrationViewAdmin,
     PatientAccountViewAdmin,
     PatientHistoryViewAdmin,
     ApprovePatientViewAdmin,
+    PatientBulkApprovalViewAdmin,
     ApproveAppointmentViewAdmin,
+    AppointmentBulkApprovalViewAdmin,
+    ImportViewAdmin,
+    HistoryExportViewAdmin,
+    HistorySearchViewAdmin,
+    RevenueViewAdmin,
+    DailyStatsViewAdmin,
+    AnalyticsViewAdmin,
 )
 
+from .token import CustomTokenObtainPairView, CustomTokenRefreshView
+
 from django.urls import path
 
 
 urlpatterns = [
 
     path('login/', CustomAuthToken.as_view(), name='api_admin_login'),
+    path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
 
+    path('approve/queue/', ApprovalQueueViewAdmin.as_view(), name='api_approval_queue_admin'),
     path('approve/doctors/', ApproveDoctorViewAdmin.as_view(), name='api_doctors_approve_admin'),
     path('approve/doctor/<uuid:pk>/', ApproveDoctorViewAdmin.as_view(), name='api_doctor_detail_approve_admin'),
+    path('approve/doctors/bulk/', DocBulkApprovalViewAdmin.as_view(), name='api_doctors_bulk_approve_admin'),
 
     path('approve/patients/', ApprovePatientViewAdmin.as_view(), name='api_patients_approve_admin'),
     path('approve/Patient/<uuid:pk>/', ApprovePatientViewAdmin.as_view(), name='api_patient_detail_approve_admin'),
+    path('approve/patients/bulk/', PatientBulkApprovalViewAdmin.as_view(), name='api_patients_bulk_approve_admin'),
 
     path('approve/appointments/', ApproveAppointmentViewAdmin.as_view(), name='api_appointment_approve_admin'),
     path('approve/appointment/<int:pk>', ApproveAppointmentViewAdmin.as_view(),
          name='api_appointment_approve_detail_admin'),
+    path('approve/appointments/bulk/', AppointmentBulkApprovalViewAdmin.as_view(),
+         name='api_appointments_bulk_approve_admin'),
 
     path('doctor/registration/', DocRegistrationViewAdmin.as_view(), name='api_doctors_registration_admin'),
+    path('doctor/registration/bulk/', DocBulkRegistrationViewAdmin.as_view(),
+         name='api_doctors_bulk_registration_admin'),
     path('doctors/', DoctorAccountViewAdmin.as_view(), name='api_doctors_admin'),
     path('doctor/<uuid:pk>/', DoctorAccountViewAdmin.as_view(), name='api_doctor_detail_admin'),
 
     path('Patient/registration/', PatientRegistrationViewAdmin.as_view(), name='api_patient_registration_admin'),
+    path('Patient/registration/bulk/', PatientBulkRegistrationViewAdmin.as_view(),
+         name='api_patient_bulk_registration_admin'),
     path('patients/', PatientAccountViewAdmin.as_view(), name='api_patients_admin'),
     path('Patient/<uuid:pk>/', PatientAccountViewAdmin.as_view(), name='api_patient_detail_admin'),
     path('Patient/<uuid:pk>/history/', PatientHistoryViewAdmin.as_view(), name='api_patient_history_admin'),
@@ -40,6 +65,13 @@ urlpatterns = [
 
     path('appointments/', AppointmentViewAdmin.as_view(), name='api_appointments_admin'),
     path('appointment/<int:pk>/', AppointmentViewAdmin.as_view(), name='api_appointment_detail_admin'),
+
+    path('import/<str:kind>/', ImportViewAdmin.as_view(), name='api_import_admin'),
+    path('export/histories/', HistoryExportViewAdmin.as_view(), name='api_history_export_admin'),
+    path('histories/search/', HistorySearchViewAdmin.as_view(), name='api_history_search_admin'),
+    path('revenue/<str:grouping>/', RevenueViewAdmin.as_view(), name='api_revenue_admin'),
+    path('dashboard/daily/', DailyStatsViewAdmin.as_view(), name='api_daily_stats_admin'),
+    path('analytics/<str:metric>/', AnalyticsViewAdmin.as_view(), name='api_analytics_admin'),
 ]
 
 app_name = 'hospitalAdmin'
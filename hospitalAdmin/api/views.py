@@ -1,4 +1,9 @@
-from django.http import Http404
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.shortcuts import get_object_or_404
 
 from drf_yasg.utils import swagger_auto_schema
@@ -10,11 +15,22 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import BasePermission
 
-from patient.models import (PatientHistory, Appointment)
+from account.roles import ADMIN, DOCTOR, PATIENT, has_role
+
+from patient.models import (Patient, PatientHistory, Appointment)
+
+from hospitalAdmin import analytics
+from hospitalAdmin.approval_queue import QUEUES, queue_stats
+from hospitalAdmin.models import DailyDepartmentStats
 
 from account.models import User
 
-from . serializers import (DoctorAccountSerializerAdmin,
+from .approval import bulk_approve_accounts, bulk_approve_appointments
+from .bulk import bulk_register
+from .pagination import AccountCursorPagination, PendingAppointmentPagination
+from . serializers import (AccountBulkApprovalSerializerAdmin,
+                           AppointmentBulkApprovalSerializerAdmin,
+                           DoctorAccountSerializerAdmin,
                            DoctorRegistrationSerializerAdmin,
                            DoctorRegistrationProfileSerializerAdmin,
                            AppointmentSerializerAdmin,
@@ -25,10 +41,14 @@ from . serializers import (DoctorAccountSerializerAdmin,
 
 from doctor.models import Doctor
 
+from patient import billing, exporters
+from patient.api.search_views import HistorySearchView
+from patient.importers import IMPORTERS, detect_format, import_file
+
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.groups.filter(name='admin').exists())
+        return has_role(request.user, ADMIN)
 
 
 class CustomAuthToken(ObtainAuthToken):
@@ -38,7 +58,7 @@ class CustomAuthToken(ObtainAuthToken):
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        account_approval = user.groups.filter(name='admin').exists()
+        account_approval = has_role(user, ADMIN)
         if not account_approval:
             return Response({'message': "You are not authorised to login as an admin"},
                             status=status.HTTP_403_FORBIDDEN)
@@ -59,7 +79,7 @@ class DocRegistrationViewAdmin(APIView):
         checkprofile = profile_serializer.is_valid()
         if checkregistration and checkprofile:
             doctor = registration_serializer.save()
-            profile_serializer.save(user=Doctor)
+            profile_serializer.save(user=doctor)
             return Response({'user_data': registration_serializer.data, 'profile_data': profile_serializer.data},
                             status=status.HTTP_201_CREATED)
         else:
@@ -67,12 +87,52 @@ class DocRegistrationViewAdmin(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkRegistrationViewAdmin(APIView):
+    """
+    Registers many accounts in one request.
+
+    request body: {"accounts": [{"user_data": {...}, "profile_data": {...}}, ...]}
+    """
+    permission_classes = [IsAdmin]
+    registration_serializer_class = None
+    profile_serializer_class = None
+    profile_model = None
+    group_name = None
+
+    def post(self, request):
+        accounts = request.data.get('accounts')
+        if not isinstance(accounts, list):
+            return Response({'message': "`accounts` must be a list of user_data/profile_data objects"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        users, errors = bulk_register(accounts, self.registration_serializer_class, self.profile_serializer_class,
+                                      self.profile_model, self.group_name)
+        if errors:
+            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': len(users),
+                         'accounts': [{'id': user.pk, 'username': user.username} for user in users]},
+                        status=status.HTTP_201_CREATED)
+
+
+class DocBulkRegistrationViewAdmin(BulkRegistrationViewAdmin):
+    registration_serializer_class = DoctorRegistrationSerializerAdmin
+    profile_serializer_class = DoctorRegistrationProfileSerializerAdmin
+    profile_model = Doctor
+    group_name = DOCTOR
+
+
+class PatientBulkRegistrationViewAdmin(BulkRegistrationViewAdmin):
+    registration_serializer_class = PatientRegistrationSerializerAdmin
+    profile_serializer_class = PatientRegistrationProfileSerializerAdmin
+    profile_model = Patient
+    group_name = PATIENT
+
+
 class DoctorAccountViewAdmin(APIView):
     permission_classes = [IsAdmin]
 
     def get_object(self, pk):
         try:
-            return User.objects.get(pk=pk)
+            return User.objects.select_related('doctor').get(pk=pk)
         except User.DoesNotExist:
             raise Http404
 
@@ -83,9 +143,11 @@ class DoctorAccountViewAdmin(APIView):
             doctor_detail = self.get_object(pk)
             serializer = DoctorAccountSerializerAdmin(doctor_detail)
             return Response({'doctors': serializer.data}, status=status.HTTP_200_OK)
-        all_doctor = User.objects.filter(groups=1, status=True)
-        serializer = DoctorAccountSerializerAdmin(all_doctor, many=True)
-        return Response({'doctors': serializer.data}, status=status.HTTP_200_OK)
+        all_doctor = User.objects.filter(groups__name=DOCTOR, status=True).select_related('doctor')
+        paginator = AccountCursorPagination(results_key='doctors')
+        page = paginator.paginate_queryset(all_doctor, request, view=self)
+        serializer = DoctorAccountSerializerAdmin(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(operation_summary="Emil pidor2")
     def put(self, request, pk):
@@ -103,6 +165,17 @@ class DoctorAccountViewAdmin(APIView):
         return Response({"message": "User with id `{}` has been deleted.".format(pk)}, status=status.HTTP_204_NO_CONTENT)
 
 
+class ApprovalQueueViewAdmin(APIView):
+    """
+    Number of pending doctors, patients and appointments, with the registration time of the oldest pending
+    account and the earliest date and time among the pending appointments (see hospitalAdmin.approval_queue).
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({queue: queue_stats(queue) for queue in QUEUES}, status=status.HTTP_200_OK)
+
+
 class ApproveDoctorViewAdmin(APIView):
     permission_classes = [IsAdmin]
 
@@ -118,9 +191,11 @@ class ApproveDoctorViewAdmin(APIView):
             doctor_detail = self.get_object(pk)
             serializer = DoctorAccountSerializerAdmin(doctor_detail)
             return Response({'doctors': serializer.data}, status=status.HTTP_200_OK)
-        all_doctor = User.objects.filter(groups=1, status=False)
-        serializer = DoctorAccountSerializerAdmin(all_doctor, many=True)
-        return Response({'doctors': serializer.data}, status=status.HTTP_200_OK)
+        all_doctor = User.objects.filter(groups__name=DOCTOR, status=False).select_related('doctor')
+        paginator = AccountCursorPagination(results_key='doctors')
+        page = paginator.paginate_queryset(all_doctor, request, view=self)
+        serializer = DoctorAccountSerializerAdmin(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def put(self, request, pk):
         saved_user = self.get_object(pk)
@@ -138,6 +213,28 @@ class ApproveDoctorViewAdmin(APIView):
                         status=status.HTTP_204_NO_CONTENT)
 
 
+class BulkApprovalViewAdmin(APIView):
+    """
+    Approves or rejects many pending accounts in one request.
+
+    request body: {"action": "approve" | "reject", "ids": ["<user id>", ...]}
+    """
+    permission_classes = [IsAdmin]
+    group_name = None
+
+    def post(self, request):
+        serializer = AccountBulkApprovalSerializerAdmin(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        result = bulk_approve_accounts(serializer.validated_data['ids'], self.group_name,
+                                       serializer.validated_data['action'])
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class DocBulkApprovalViewAdmin(BulkApprovalViewAdmin):
+    group_name = DOCTOR
+
+
 class ApprovePatientViewAdmin(APIView):
     permission_classes = [IsAdmin]
 
@@ -153,9 +250,11 @@ class ApprovePatientViewAdmin(APIView):
             doctor_detail = self.get_object(pk)
             serializer = PatientAccountSerializerAdmin(doctor_detail)
             return Response({'patients': serializer.data}, status=status.HTTP_200_OK)
-        all_patient = User.objects.filter(groups=2, status=False)
-        serializer = PatientAccountSerializerAdmin(all_patient, many=True)
-        return Response({'patients': serializer.data}, status=status.HTTP_200_OK)
+        all_patient = User.objects.filter(groups__name=PATIENT, status=False).select_related('patient')
+        paginator = AccountCursorPagination(results_key='patients')
+        page = paginator.paginate_queryset(all_patient, request, view=self)
+        serializer = PatientAccountSerializerAdmin(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def put(self, request, pk):
         saved_user = self.get_object(pk)
@@ -173,6 +272,10 @@ class ApprovePatientViewAdmin(APIView):
                         status=status.HTTP_204_NO_CONTENT)
 
 
+class PatientBulkApprovalViewAdmin(BulkApprovalViewAdmin):
+    group_name = PATIENT
+
+
 class AppointmentViewAdmin(APIView):
     permission_classes = [IsAdmin]
 
@@ -236,8 +339,10 @@ class ApproveAppointmentViewAdmin(APIView):
             serializer = AppointmentSerializerAdmin(appointment_detail)
             return Response({'appointments': serializer.data}, status=status.HTTP_200_OK)
         all_appointment = Appointment.objects.filter(status=False)
-        serializer = AppointmentSerializerAdmin(all_appointment, many=True)
-        return Response({'appointments': serializer.data}, status=status.HTTP_200_OK)
+        paginator = PendingAppointmentPagination(results_key='appointments')
+        page = paginator.paginate_queryset(all_appointment, request, view=self)
+        serializer = AppointmentSerializerAdmin(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def put(self, request, pk):
             saved_appointment= self.get_object(pk)
@@ -255,6 +360,26 @@ class ApproveAppointmentViewAdmin(APIView):
                         status=status.HTTP_204_NO_CONTENT)
 
 
+class AppointmentBulkApprovalViewAdmin(APIView):
+    """
+    Approves or rejects many pending appointments in one request.
+
+    request body: {"action": "approve" | "reject", "ids": [1, 2, ...]}
+              or: {"action": "approve" | "reject", "appointment_date": "YYYY-MM-DD", "doctor": 7}
+    """
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        serializer = AppointmentBulkApprovalSerializerAdmin(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        result = bulk_approve_appointments(data['action'], ids=data.get('ids'),
+                                           appointment_date=data.get('appointment_date'),
+                                           doctor_id=data.get('doctor'))
+        return Response(result, status=status.HTTP_200_OK)
+
+
 class PatientRegistrationViewAdmin(APIView):
     permission_classes = [IsAdmin]
 
@@ -280,7 +405,7 @@ class PatientAccountViewAdmin(APIView):
 
     def get_object(self, pk):
         try:
-            return User.objects.get(pk=pk)
+            return User.objects.select_related('patient').get(pk=pk)
         except User.DoesNotExist:
             raise Http404
 
@@ -289,9 +414,11 @@ class PatientAccountViewAdmin(APIView):
             patient_detail = self.get_object(pk)
             serializer = PatientAccountSerializerAdmin(patient_detail)
             return Response({'patients': serializer.data}, status=status.HTTP_200_OK)
-        all_patient = User.objects.filter(groups=2, status=True)
-        serializer = PatientAccountSerializerAdmin(all_patient, many=True)
-        return Response({'patients': serializer.data}, status=status.HTTP_200_OK)
+        all_patient = User.objects.filter(groups__name=PATIENT, status=True).select_related('patient')
+        paginator = AccountCursorPagination(results_key='patients')
+        page = paginator.paginate_queryset(all_patient, request, view=self)
+        serializer = PatientAccountSerializerAdmin(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def put(self, request, pk):
         saved_user = self.get_object(pk)
@@ -318,15 +445,15 @@ class PatientHistoryViewAdmin(APIView):
         user_patient = get_object_or_404(User, pk=pk).patient
         if hid:
             try:
-                history = PatientHistory.objects.get(id=hid)
+                history = PatientHistory.objects.select_related('costs').get(id=hid)
             except PatientHistory.DoesNotExist:
                 raise Http404
-            if history.Patient == user_patient:
+            if history.patient_id == user_patient.pk:
                 serializer = PatientHistorySerializerAdmin(history)
                 return Response({'patient_history': serializer.data}, status=status.HTTP_200_OK)
-            return Response({"message: This history id `{}` does not belong to the user".format(hid)},
+            return Response({"message": "This history id `{}` does not belong to the user".format(hid)},
                             status=status.HTTP_404_NOT_FOUND)
-        patient_historys = user_patient.patienthistory_set.all()
+        patient_historys = user_patient.patienthistory_set.select_related('costs')
         serializer = PatientHistorySerializerAdmin(patient_historys, many=True)
         return Response({'patient_history': serializer.data}, status=status.HTTP_200_OK)
 
@@ -336,14 +463,14 @@ class PatientHistoryViewAdmin(APIView):
             history = PatientHistory.objects.get(id=hid)
         except PatientHistory.DoesNotExist:
             raise Http404
-        if history.Patient == user_patient:
+        if history.patient_id == user_patient.pk:
             serializer = PatientHistorySerializerAdmin(instance=history, data=request.data.get('patient_history'),
                                                        partial=True)
             if serializer.is_valid():
                 serializer.save()
                 return Response({'patient_history': serializer.data}, status=status.HTTP_200_OK)
             return Response({'patient_history': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({"message: This history id `{}` does not belong to the user".format(hid)},
+        return Response({"message": "This history id `{}` does not belong to the user".format(hid)},
                         status=status.HTTP_404_NOT_FOUND)
 
     def delete(self, request, pk, hid):
@@ -352,9 +479,180 @@ class PatientHistoryViewAdmin(APIView):
             history = PatientHistory.objects.get(id=hid)
         except PatientHistory.DoesNotExist:
             raise Http404
-        if history.Patient == user_patient:
+        if history.patient_id == user_patient.pk:
             history.delete()
             return Response({"message": "History with id `{}` has been deleted.".format(hid)},
                             status=status.HTTP_204_NO_CONTENT)
-        return Response({"message: This history id `{}` does not belong to the user".format(hid)},
+        return Response({"message": "This history id `{}` does not belong to the user".format(hid)},
                         status=status.HTTP_404_NOT_FOUND)
+
+
+class ImportViewAdmin(APIView):
+    """
+    Imports a CSV/XLSX upload (multipart field `file`) of patients or patient histories.
+    Large migrations are better run with `manage.py import_patients`, which reads the file in the same chunks.
+    """
+    permission_classes = [IsAdmin]
+
+    def post(self, request, kind):
+        if kind not in IMPORTERS:
+            raise Http404
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'message': "Please upload the file in the `file` field"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            file_format = detect_format(upload.name)
+        except ValueError as error:
+            return Response({'message': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        result = import_file(kind, upload, file_format)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class HistoryExportViewAdmin(APIView):
+    """
+    Streams all patient histories with their costs as CSV (default) or XLSX.
+
+    query params: file_type=csv|xlsx, start=YYYY-MM-DD, end=YYYY-MM-DD, department=<code>
+    An XLSX file is built in full before it is sent, so it is limited to one sheet (`XLSX_SHEET_ROWS`);
+    larger exports are streamed as CSV or written by `manage.py export_histories`.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in exporters.FORMATS:
+            return Response({'message': "file_type must be one of: {}".format(', '.join(exporters.FORMATS))},
+                            status=status.HTTP_400_BAD_REQUEST)
+        dates = {}
+        for param in ('start', 'end'):
+            value = request.query_params.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                dates[param] = None
+            if value and dates[param] is None:
+                return Response({'message': "`{}` must be a date formatted as YYYY-MM-DD".format(param)},
+                                status=status.HTTP_400_BAD_REQUEST)
+        if dates['start'] and dates['end'] and dates['end'] < dates['start']:
+            return Response({'message': "`end` must not be before `start`"}, status=status.HTTP_400_BAD_REQUEST)
+        department = request.query_params.get('department') or None
+        if department is not None and department not in dict(PatientHistory.department_choices):
+            return Response({'message': "department must be one of: {}".format(
+                ', '.join(dict(PatientHistory.department_choices)))}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = exporters.export_queryset(dates['start'], dates['end'], department)
+        rows = exporters.export_rows(queryset)
+        if file_type == 'csv':
+            response = StreamingHttpResponse(exporters.iter_csv(rows), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="patient_histories.csv"'
+            return response
+        if queryset.count() > exporters.XLSX_SHEET_ROWS:
+            return Response({'message': "XLSX exports are limited to {} histories, narrow the dates or department, "
+                                        "or use file_type=csv".format(exporters.XLSX_SHEET_ROWS)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return FileResponse(exporters.xlsx_file(rows), as_attachment=True, filename='patient_histories.xlsx')
+
+
+class HistorySearchViewAdmin(HistorySearchView):
+    """Full-text search over the symptoms of all patient histories."""
+    permission_classes = [IsAdmin]
+
+
+class RevenueViewAdmin(APIView):
+    """
+    Revenue from patient costs per department, doctor, day or month, for the histories admitted
+    between `start` and `end` (YYYY-MM-DD, both optional and inclusive).
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request, grouping):
+        if grouping not in billing.GROUPINGS:
+            raise Http404
+        dates = {}
+        for param in ('start', 'end'):
+            value = request.query_params.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                dates[param] = None
+            if value and dates[param] is None:
+                return Response({'message': "`{}` must be a date formatted as YYYY-MM-DD".format(param)},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        rows = billing.revenue_by(grouping, dates['start'], dates['end'])
+        if grouping == billing.DOCTOR:
+            rows = [{'doctor': row['doctor'], 'doctor_name': "{} {}".format(row['first_name'], row['last_name']),
+                     'revenue': row['revenue'], 'bills': row['bills']} for row in rows]
+        return Response(dict(billing.total_revenue(dates['start'], dates['end']), start=dates['start'],
+                             end=dates['end'], group_by=grouping, rows=list(rows)),
+                        status=status.HTTP_200_OK)
+
+
+class DailyStatsViewAdmin(APIView):
+    """
+    Admissions, releases, average length of stay (days) and appointments per department per day,
+    read from the daily rollups. `start`/`end` (YYYY-MM-DD) default to the last 30 days and span at
+    most 366 days; `department=<code>` narrows the rows to one department.
+    """
+    permission_classes = [IsAdmin]
+    max_days = 366
+
+    def get(self, request):
+        try:
+            end = parse_date(request.query_params.get('end', '')) or timezone.localdate()
+            start = parse_date(request.query_params.get('start', '')) or end - timedelta(days=29)
+        except ValueError:
+            return Response({'message': "start and end must be dates formatted as YYYY-MM-DD"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not start <= end < start + timedelta(days=self.max_days):
+            return Response({'message': "end must be on or after start and at most {} days later".format(
+                self.max_days - 1)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = DailyDepartmentStats.objects.filter(date__range=(start, end))
+        department = request.query_params.get('department')
+        if department:
+            stats = stats.filter(department=department)
+        totals = stats.aggregate(admissions=Sum('admissions'), releases=Sum('releases'),
+                                 stay_days=Sum('stay_days'), appointments=Sum('appointments'))
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': {
+                'admissions': totals['admissions'] or 0,
+                'releases': totals['releases'] or 0,
+                'average_stay': totals['stay_days'] / totals['releases'] if totals['releases'] else None,
+                'appointments': totals['appointments'] or 0,
+            },
+            'days': [
+                {'date': row.date, 'department': row.department, 'admissions': row.admissions,
+                 'releases': row.releases, 'average_stay': row.average_stay, 'appointments': row.appointments}
+                for row in stats
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class AnalyticsViewAdmin(APIView):
+    """
+    Bed occupancy per day, length-of-stay percentiles or 30-day readmission rates per department
+    between `start` and `end` (YYYY-MM-DD, the last 30 days by default, at most 366 days).
+    `department=<code>` limits the figures to one department.
+    """
+    permission_classes = [IsAdmin]
+    max_days = 366
+
+    def get(self, request, metric):
+        if metric not in analytics.METRICS:
+            raise Http404
+        try:
+            end = parse_date(request.query_params.get('end', '')) or timezone.localdate()
+            start = parse_date(request.query_params.get('start', '')) or end - timedelta(days=29)
+        except ValueError:
+            return Response({'message': "start and end must be dates formatted as YYYY-MM-DD"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not start <= end < start + timedelta(days=self.max_days):
+            return Response({'message': "end must be on or after start and at most {} days later".format(
+                self.max_days - 1)}, status=status.HTTP_400_BAD_REQUEST)
+        departments = analytics.report(metric, start, end, request.query_params.get('department'))
+        return Response({'start': start, 'end': end, 'metric': metric, 'departments': departments},
+                        status=status.HTTP_200_OK)
@@ -0,0 +1,102 @@
+"""
+Counts and oldest-pending timestamps of the approval queues, kept in the cache.
+
+The dashboard polls these every few seconds, so they are not recounted on
+every read: signals adjust the cached count as rows enter or leave a queue,
+and the oldest timestamp is dropped (and recomputed from the index on the
+next read) only when the oldest pending row leaves. Entries also expire
+after `APPROVAL_QUEUE_CACHE_TIMEOUT` seconds, which bounds any drift.
+
+For accounts `oldest` is when the oldest pending one registered
+(`date_joined`). Appointments do not record when they were requested, so
+for them `oldest` is the earliest date and time among the pending
+appointments, i.e. the most urgent one, not how long it has been waiting.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+
+from account.models import User
+from account.roles import DOCTOR, PATIENT
+from patient.models import Appointment
+
+
+DOCTORS = 'doctors'
+PATIENTS = 'patients'
+APPOINTMENTS = 'appointments'
+QUEUES = (DOCTORS, PATIENTS, APPOINTMENTS)
+
+ACCOUNT_QUEUES = {DOCTOR: DOCTORS, PATIENT: PATIENTS}
+
+COUNT_KEY = 'approval:{}:count'
+OLDEST_KEY = 'approval:{}:oldest'
+
+
+def _timeout():
+    return getattr(settings, 'APPROVAL_QUEUE_CACHE_TIMEOUT', 5 * 60)
+
+
+def pending(queue):
+    """Queryset of the rows waiting in `queue`."""
+    if queue == APPOINTMENTS:
+        return Appointment.objects.filter(status=False)
+    role = DOCTOR if queue == DOCTORS else PATIENT
+    return User.objects.filter(groups__name=role, status=False)
+
+
+def appointment_timestamp(appointment_date, appointment_time):
+    return datetime.datetime.combine(appointment_date, appointment_time)
+
+
+def _oldest(queue):
+    if queue == APPOINTMENTS:
+        first = pending(queue).order_by('appointment_date', 'appointment_time').values_list(
+            'appointment_date', 'appointment_time').first()
+        return appointment_timestamp(*first) if first else None
+    return pending(queue).aggregate(oldest=Min('date_joined'))['oldest']
+
+
+def queue_stats(queue):
+    """`{'count': ..., 'oldest': ...}` for `queue`; `oldest` is None when the queue is empty."""
+    count = cache.get(COUNT_KEY.format(queue))
+    if count is None:
+        count = pending(queue).count()
+        cache.set(COUNT_KEY.format(queue), count, _timeout())
+    # Wrapped in a dict so that an empty queue (None) is told apart from a cache miss.
+    oldest = cache.get(OLDEST_KEY.format(queue))
+    if oldest is None:
+        oldest = {'oldest': _oldest(queue) if count else None}
+        cache.set(OLDEST_KEY.format(queue), oldest, _timeout())
+    return {'count': count, 'oldest': oldest['oldest']}
+
+
+def entered(queue, timestamps):
+    """Rows with the given timestamps started waiting in `queue`."""
+    if not timestamps:
+        return
+    try:
+        cache.incr(COUNT_KEY.format(queue), len(timestamps))
+    except ValueError:
+        pass  # not cached, counted on the next read
+    oldest = cache.get(OLDEST_KEY.format(queue))
+    if oldest is not None and (oldest['oldest'] is None or min(timestamps) < oldest['oldest']):
+        cache.set(OLDEST_KEY.format(queue), {'oldest': min(timestamps)}, _timeout())
+
+
+def left(queue, timestamps):
+    """Rows with the given timestamps were approved, rejected or removed from `queue`."""
+    if not timestamps:
+        return
+    try:
+        cache.decr(COUNT_KEY.format(queue), len(timestamps))
+    except ValueError:
+        pass
+    oldest = cache.get(OLDEST_KEY.format(queue))
+    if oldest is not None and oldest['oldest'] is not None and min(timestamps) <= oldest['oldest']:
+        cache.delete(OLDEST_KEY.format(queue))
+
+
+def reset(queue):
+    cache.delete_many([COUNT_KEY.format(queue), OLDEST_KEY.format(queue)])
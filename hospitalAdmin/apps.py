@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class HospitaladminConfig(AppConfig):
     name = 'hospitalAdmin'
+
+    def ready(self):
+        from . import signals  # noqa: F401
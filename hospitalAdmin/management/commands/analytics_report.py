@@ -0,0 +1,29 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from hospitalAdmin.analytics import METRICS, report
+
+
+class Command(BaseCommand):
+    help = "Prints occupancy, length-of-stay or readmission figures per department as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('metric', choices=METRICS)
+        parser.add_argument('--start', help="First day of the report (YYYY-MM-DD), defaults to 30 days ago.")
+        parser.add_argument('--end', help="Last day of the report (YYYY-MM-DD), defaults to today.")
+        parser.add_argument('--department')
+
+    def handle(self, *args, **options):
+        try:
+            end = parse_date(options['end'] or '') or timezone.localdate()
+            start = parse_date(options['start'] or '') or end - datetime.timedelta(days=29)
+        except ValueError:
+            raise CommandError("--start and --end must be dates formatted as YYYY-MM-DD")
+        if end < start:
+            raise CommandError("--end must not be before --start")
+        result = report(options['metric'], start, end, options['department'])
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,141 @@
+import datetime
+import math
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from account.models import User
+from doctor.models import Doctor
+from hospitalAdmin import analytics
+from patient.models import Patient, PatientHistory
+
+
+def _percentile(values, percentile):
+    """Linear interpolation between the closest ranks, as numpy.percentile does by default."""
+    position = (len(values) - 1) * percentile / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def naive_report(start, end, days=analytics.READMISSION_DAYS):
+    """The same figures as hospitalAdmin.analytics, from a Python loop over model instances."""
+    occupied = defaultdict(Counter)
+    lengths = defaultdict(list)
+    stays_by_patient = defaultdict(list)
+    histories = PatientHistory.objects.filter(
+        Q(release_date__isnull=True) | Q(release_date__gte=start),
+        admit_date__lte=end + datetime.timedelta(days=days))
+    for history in histories:
+        stays_by_patient[history.patient_id].append(history)
+        day = max(history.admit_date, start)
+        last = min(history.release_date or end + datetime.timedelta(days=1), end + datetime.timedelta(days=1))
+        while day < last:
+            occupied[history.department][day] += 1
+            day += datetime.timedelta(days=1)
+        if history.release_date and start <= history.release_date <= end:
+            lengths[history.department].append((history.release_date - history.admit_date).days)
+
+    readmitted = Counter()
+    for stays in stays_by_patient.values():
+        stays.sort(key=lambda history: history.admit_date)
+        for stay, following in zip(stays, stays[1:]):
+            if stay.release_date and start <= stay.release_date <= end \
+                    and 0 <= (following.admit_date - stay.release_date).days <= days:
+                readmitted[stay.department] += 1
+
+    total_days = (end - start).days + 1
+    occupancy = {
+        department: {'peak': max(counts.values(), default=0), 'mean': sum(counts.values()) / total_days}
+        for department, counts in occupied.items()
+    }
+    length_of_stay = {}
+    for department, values in lengths.items():
+        values.sort()
+        length_of_stay[department] = dict({'releases': len(values), 'mean': sum(values) / len(values)},
+                                          **{'p{}'.format(percentile): _percentile(values, percentile)
+                                             for percentile in analytics.PERCENTILES})
+    readmissions = {department: readmitted[department] for department in lengths}
+    return occupancy, length_of_stay, readmissions
+
+
+class Command(BaseCommand):
+    help = ("Compares the vectorized analytics with a naive ORM loop on synthetic admissions. "
+            "The data is inserted in a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admissions', type=int, default=1000000)
+        parser.add_argument('--patients', type=int, default=None, help="Defaults to a fifth of the admissions.")
+        parser.add_argument('--years', type=int, default=2, help="Admissions are spread over this many years.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skip-naive', action='store_true')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        admissions = options['admissions']
+        patient_count = options['patients'] or max(1, admissions // 5)
+        end = datetime.date.today()
+        first_day = end - datetime.timedelta(days=365 * options['years'])
+        start = end - datetime.timedelta(days=364)
+        departments = [code for code, name in Doctor.department_choices]
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            doctor = Doctor.objects.create(user=User.objects.create(username='bench-analytics-doctor'),
+                                           address='Bench', mobile='0')
+            users = User.objects.bulk_create([User(username='bench-analytics-{}'.format(number))
+                                              for number in range(patient_count)], batch_size=5000)
+            patients = Patient.objects.bulk_create([Patient(user=user, age=30, address='Bench', mobile='0')
+                                                    for user in users], batch_size=5000)
+            patient_ids = np.array([patient.pk for patient in patients])
+
+            admit_offsets = rng.integers(0, (end - first_day).days + 1, admissions)
+            stay_lengths = rng.geometric(0.2, admissions)
+            not_released = rng.random(admissions) < 0.05
+            rows = (
+                (first_day + datetime.timedelta(days=int(offset)),
+                 None if open_stay else first_day + datetime.timedelta(days=int(offset + length)),
+                 departments[department], 'Bench', int(patient_id), doctor.pk)
+                for offset, length, open_stay, department, patient_id in zip(
+                    admit_offsets, stay_lengths, not_released,
+                    rng.integers(0, len(departments), admissions), rng.choice(patient_ids, admissions))
+            )
+            # Raw inserts: bulk_create would overwrite the auto_now_add admit_date and the rollup
+            # signals are not wanted for throwaway data.
+            table = PatientHistory._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO {} (admit_date, release_date, department, symptomps, patient_id, '
+                    'assigned_doctor_id) VALUES (%s, %s, %s, %s, %s, %s)'.format(connection.ops.quote_name(table)),
+                    rows)
+            self.stdout.write("Inserted {} admissions for {} patients in {:.1f} s".format(
+                admissions, patient_count, time.perf_counter() - started))
+
+            started = time.perf_counter()
+            stays = analytics.Stays.load(start, end)
+            loaded = time.perf_counter()
+            occupancy = analytics.occupancy(stays)
+            length_of_stay = analytics.length_of_stay(stays)
+            readmissions = analytics.readmissions(stays)
+            computed = time.perf_counter()
+            self.stdout.write("vectorized: {} stays loaded in {:.2f} s, all metrics computed in {:.2f} s".format(
+                len(stays), loaded - started, computed - loaded))
+
+            if not options['skip_naive']:
+                started = time.perf_counter()
+                naive_occupancy, naive_length_of_stay, naive_readmissions = naive_report(start, end)
+                self.stdout.write("naive ORM loop: {:.2f} s".format(time.perf_counter() - started))
+                for department, figures in occupancy.items():
+                    assert figures['peak'] == naive_occupancy[department]['peak'], department
+                    assert math.isclose(figures['mean'], naive_occupancy[department]['mean']), department
+                for department, figures in length_of_stay.items():
+                    for key, value in figures.items():
+                        assert math.isclose(value, naive_length_of_stay[department][key]), (department, key)
+                for department, figures in readmissions.items():
+                    assert figures['readmissions'] == naive_readmissions[department], department
+                self.stdout.write("Both implementations agree")
+            transaction.set_rollback(True)
@@ -0,0 +1,129 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+
+from account.models import User
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from patient.api.serializers import PatientTokenObtainPairSerializer
+
+
+ENDPOINTS = (
+    # (role serializer, username pattern, synchronous path, async path)
+    (PatientTokenObtainPairSerializer, '{}-patient-', '/api/Patient/profile/', '/api/Patient/async/profile/'),
+    (PatientTokenObtainPairSerializer, '{}-patient-', '/api/Patient/history/', '/api/Patient/async/history/'),
+    (PatientTokenObtainPairSerializer, '{}-patient-', '/api/Patient/appointment/',
+     '/api/Patient/async/appointment/'),
+    (DoctorTokenObtainPairSerializer, '{}-doctor-', '/api/doctor/profile/', '/api/doctor/async/profile/'),
+    (DoctorTokenObtainPairSerializer, '{}-doctor-', '/api/doctor/appointments/', '/api/doctor/async/appointments/'),
+)
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[max(0, -(-len(values) * percentile // 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Compares the throughput of the synchronous read views behind a WSGI-style pool of worker threads "
+            "with their async variants on one ASGI event loop, for several numbers of concurrent connections, "
+            "on data created by seed_hospital. Requests are sent in-process through Django's handlers.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per run.")
+        parser.add_argument('--connections', default='1,10,50', help="Comma-separated concurrent connections.")
+        parser.add_argument('--threads', type=int, default=8,
+                            help="WSGI worker threads, e.g. gunicorn --workers x --threads.")
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help="Milliseconds added to every query, to model a database across the network.")
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--prefix', default='seed', help="Username prefix given to seed_hospital.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        scenarios = []
+        for serializer, pattern, sync_path, async_path in ENDPOINTS:
+            users = User.objects.filter(username__startswith=pattern.format(options['prefix']),
+                                        status=True).order_by('username')[:options['users']]
+            scenarios += [(str(serializer.get_token(user).access_token), sync_path, async_path) for user in users]
+        if not scenarios:
+            raise CommandError("No seeded data with prefix {!r}, run seed_hospital first".format(options['prefix']))
+        plan = [rng.choice(scenarios) for _ in range(options['requests'])]
+
+        latency = options['db_latency'] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_delay(connection, **kwargs):
+            # Outermost, since execute_wrapper() pops the last wrapper when a request's metrics are recorded.
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.insert(0, delay)
+
+        if latency:
+            connection_created.connect(add_delay)
+            for connection in connections.all():
+                add_delay(connection)
+        self.stdout.write("{:>11} {:>14} {:>10} {:>14} {:>10}".format(
+            'connections', 'WSGI req/s', 'p95 ms', 'ASGI req/s', 'p95 ms'))
+        try:
+            # Measure the views, not the response cache in front of them.
+            with override_settings(ALLOWED_HOSTS=['testserver'], RESPONSE_CACHE_TIMEOUT=0):
+                for concurrency in (int(value) for value in options['connections'].split(',')):
+                    wsgi = self.run_wsgi(plan, concurrency, options['threads'])
+                    asgi = asyncio.run(self.run_asgi(plan, concurrency))
+                    self.stdout.write("{:>11} {:>14.0f} {:>10.1f} {:>14.0f} {:>10.1f}".format(
+                        concurrency, *wsgi, *asgi))
+        finally:
+            connection_created.disconnect(add_delay)
+
+    @staticmethod
+    def _split(plan, concurrency):
+        return [plan[number::concurrency] for number in range(concurrency)]
+
+    def run_wsgi(self, plan, concurrency, threads):
+        """Each connection sends its requests in turn; at most `threads` are handled at once."""
+        workers = threading.BoundedSemaphore(threads)
+        latencies = []
+
+        def connection(requests):
+            client = Client()
+            for token, path, _ in requests:
+                started = time.perf_counter()
+                with workers:
+                    client.get(path, HTTP_AUTHORIZATION='Bearer {}'.format(token))
+                latencies.append(time.perf_counter() - started)
+            connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(connection, self._split(plan, concurrency)))
+        elapsed = time.perf_counter() - started
+        return len(plan) / elapsed, _percentile(latencies, 95) * 1000
+
+    async def run_asgi(self, plan, concurrency):
+        latencies = []
+
+        async def connection(requests):
+            client = AsyncClient()
+            for token, _, path in requests:
+                started = time.perf_counter()
+                # Like ASGIHandler, which the test client skips: each request's ORM calls get their own thread.
+                async with ThreadSensitiveContext():
+                    await client.get(path, headers={'Authorization': 'Bearer {}'.format(token)})
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(requests) for requests in self._split(plan, concurrency)))
+        elapsed = time.perf_counter() - started
+        return len(plan) / elapsed, _percentile(latencies, 95) * 1000
@@ -0,0 +1,55 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+from doctor.models import Doctor
+from hospitalAdmin.seeding import SYMPTOMS
+from patient import search
+from patient.models import PatientHistory
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[max(0, -(-len(values) * percentile // 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Times symptom searches (see patient.search) of one and two words, with and without department, date "
+            "and doctor filters, over the histories in the database, e.g. those created by seed_hospital.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=50, help="Searches per kind of query.")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        histories = PatientHistory.objects.count()
+        doctors = list(Doctor.objects.values_list('pk', flat=True)[:100])
+        if not histories or not doctors:
+            raise CommandError("No patient histories to search, run seed_hospital first")
+        words = sorted({word for symptom in SYMPTOMS for word in search.terms(symptom) if len(word) > 3})
+        departments = [code for code, name in PatientHistory.department_choices]
+        today = datetime.date.today()
+        kinds = {
+            'one word': lambda: {'query': rng.choice(words)},
+            'two words': lambda: {'query': ' '.join(rng.sample(words, 2))},
+            'department': lambda: {'query': rng.choice(words), 'department': rng.choice(departments)},
+            'last 30 days': lambda: {'query': rng.choice(words), 'start': today - datetime.timedelta(days=30)},
+            'doctor': lambda: {'query': rng.choice(words), 'doctor': rng.choice(doctors)},
+        }
+        connection = connections[router.db_for_read(PatientHistory)]
+        self.stdout.write("{} histories, {} index".format(histories, connection.vendor))
+        self.stdout.write("{:>14} {:>8} {:>8} {:>8} {:>8}".format('query', 'p50 ms', 'p95 ms', 'max ms', 'results'))
+        for kind, arguments in kinds.items():
+            timings, found = [], 0
+            for _ in range(options['queries']):
+                started = time.perf_counter()
+                found += len(search.search(limit=options['limit'], **arguments()))
+                timings.append(time.perf_counter() - started)
+            self.stdout.write("{:>14} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f}".format(
+                kind, _percentile(timings, 50) * 1000, _percentile(timings, 95) * 1000, max(timings) * 1000,
+                found / options['queries']))
@@ -0,0 +1,137 @@
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from doctor.models import Doctor
+from doctor.scheduling import to_time
+from patient.models import PatientHistory, Appointment
+
+
+PROFILES = (
+    # (label, ENGINE, OPTIONS, journal mode of the copy)
+    ('stock', 'django.db.backends.sqlite3', {}, 'DELETE'),
+    ('production', 'main.sqlite_backend', {'timeout': 20}, 'WAL'),
+)
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[max(0, -(-len(values) * percentile // 100) - 1)] if values else 0
+
+
+class Command(BaseCommand):
+    help = ("Runs concurrent appointment-feed readers and booking writers against two copies of the SQLite "
+            "database, one with Django's stock sqlite3 backend and one with main.sqlite_backend, and prints reads "
+            "and writes per second and the writes that failed with 'database is locked'.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError("The default database is not SQLite")
+        source.ensure_connection()
+        directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+        self.stdout.write("{:>10} {:>9} {:>11} {:>9} {:>8} {:>9}".format(
+            'profile', 'reads/s', 'p95 read ms', 'writes/s', 'locked', 'rejected'))
+        try:
+            for label, engine, engine_options, journal_mode in PROFILES:
+                alias = 'bench-{}'.format(label)
+                name = os.path.join(directory, '{}.sqlite3'.format(label))
+                # The backup API copies committed pages, including those still in the write-ahead log.
+                with sqlite3.connect(name) as copy:
+                    source.connection.backup(copy)
+                    copy.execute('PRAGMA journal_mode = {}'.format(journal_mode))
+                connections.settings[alias] = {**source.settings_dict, 'ENGINE': engine, 'NAME': name,
+                                               'OPTIONS': engine_options}
+                try:
+                    result = self.run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+                self.stdout.write("{:>10} {:>9.0f} {:>11.1f} {:>9.0f} {:>8} {:>9}".format(label, *result))
+        finally:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    def run(self, alias, options):
+        doctors = list(Doctor.objects.using(alias).values_list('pk', 'slot_minutes')[:100])
+        histories = list(PatientHistory.objects.using(alias).values_list('pk', flat=True)[:100])
+        if not doctors or not histories:
+            raise CommandError("No doctors or patient histories to book for, run seed_hospital first")
+        today = datetime.date.today()
+        deadline = time.perf_counter() + options['seconds']
+        read_latencies, counts, lock = [], {'writes': 0, 'locked': 0, 'rejected': 0}, threading.Lock()
+
+        def reader(rng):
+            latencies = []
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                doctor_id, _ = rng.choice(doctors)
+                list(Appointment.objects.using(alias).filter(
+                    doctor_id=doctor_id, status=True, appointment_date__gte=today,
+                    appointment_date__lt=today + datetime.timedelta(days=7)).order_by(
+                    'appointment_date', 'appointment_time'))
+                latencies.append(time.perf_counter() - started)
+            with lock:
+                read_latencies.extend(latencies)
+
+        def writer(rng):
+            result = {'writes': 0, 'locked': 0, 'rejected': 0}
+            while time.perf_counter() < deadline:
+                # The booking transaction of reserve_slot(): read the doctor's overlapping appointments, then insert.
+                doctor_id, slot_minutes = rng.choice(doctors)
+                day = today + datetime.timedelta(days=rng.randrange(365, 730))
+                start = rng.randrange(9 * 60, 17 * 60 - slot_minutes, 5)
+                try:
+                    with transaction.atomic(using=alias):
+                        if Appointment.objects.using(alias).filter(
+                                doctor_id=doctor_id, appointment_date=day,
+                                appointment_time__gt=to_time(max(0, start - slot_minutes)),
+                                appointment_time__lt=to_time(start + slot_minutes)).exists():
+                            result['rejected'] += 1
+                            continue
+                        # bulk_create() sends no signals, whose receivers would query the default database.
+                        Appointment.objects.using(alias).bulk_create([Appointment(
+                            doctor_id=doctor_id, patient_history_id=rng.choice(histories), appointment_date=day,
+                            appointment_time=to_time(start))])
+                    result['writes'] += 1
+                except OperationalError as error:
+                    if 'locked' not in str(error):
+                        raise
+                    result['locked'] += 1
+            with lock:
+                for key, value in result.items():
+                    counts[key] += value
+
+        def worker(target, seed):
+            try:
+                target(random.Random(seed))
+            finally:
+                connections[alias].close()
+
+        rng = random.Random(options['seed'])
+        threads = [threading.Thread(target=worker, args=(reader, rng.random()))
+                   for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=(writer, rng.random()))
+                    for _ in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return (len(read_latencies) / elapsed, _percentile(read_latencies, 95) * 1000, counts['writes'] / elapsed,
+                counts['locked'], counts['rejected'])
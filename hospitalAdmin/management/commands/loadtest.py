@@ -0,0 +1,152 @@
+import random
+import statistics
+import time
+from collections import defaultdict
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from account.models import User
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from doctor.models import Doctor
+from hospitalAdmin.api.serializers import AdminTokenObtainPairSerializer
+from patient.api.serializers import PatientTokenObtainPairSerializer
+from patient.models import Patient
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(values, percentile):
+    """Nearest-rank percentile of sorted `values`."""
+    return values[max(0, -(-len(values) * percentile // 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Replays a reproducible mix of read requests against the API, as the seeded doctors, patients and "
+            "admin (see seed_hospital), and reports p50/p95/p99 latency and queries per request per endpoint. "
+            "Requests run in-process through the full middleware stack unless --base-url is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100, help="Requests sent first and left out of the report.")
+        parser.add_argument('--users', type=int, default=50, help="Seeded doctors and patients to send requests as.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix given to seed_hospital.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, the same seed replays the same requests.")
+        parser.add_argument('--base-url', help="Send the requests over HTTP to a running server instead, e.g. "
+                                               "http://localhost:8000. Queries are not counted then.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        scenarios = self.scenarios(rng, options['prefix'], options['users'])
+        # Rows come back in primary-key order, so the same seed picks the same users and requests.
+        plan = [rng.choice(scenarios) for _ in range(options['warmup'] + options['requests'])]
+
+        latencies = defaultdict(list)
+        queries = defaultdict(list)
+        errors = defaultdict(int)
+        send = self.remote(options['base_url']) if options['base_url'] else self.in_process()
+        started = time.perf_counter()
+        for number, (name, token, path) in enumerate(plan):
+            if number == options['warmup']:
+                started = time.perf_counter()
+            status, elapsed, query_count = send(path, token)
+            if number < options['warmup']:
+                continue
+            latencies[name].append(elapsed)
+            if query_count is not None:
+                queries[name].append(query_count)
+            if status >= 400:
+                errors[name] += 1
+        wall = time.perf_counter() - started
+
+        self.stdout.write("{:<32} {:>6} {:>8} {:>8} {:>8} {:>8} {:>8} {:>6}".format(
+            'endpoint', 'count', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'max q', 'errors'))
+        for name in sorted(latencies):
+            values = sorted(latencies[name])
+            self.stdout.write("{:<32} {:>6} {} {:>8} {:>8} {:>6}".format(
+                name, len(values),
+                ' '.join('{:>8.1f}'.format(_percentile(values, percentile) * 1000) for percentile in PERCENTILES),
+                '{:.1f}'.format(statistics.mean(queries[name])) if queries[name] else '-',
+                max(queries[name]) if queries[name] else '-', errors[name]))
+        everything = sorted(value for values in latencies.values() for value in values)
+        self.stdout.write("{} requests in {:.1f} s ({:.0f} req/s); overall p50 {:.1f} ms, p95 {:.1f} ms, "
+                          "p99 {:.1f} ms".format(len(everything), wall, len(everything) / wall,
+                                                 *(_percentile(everything, percentile) * 1000
+                                                   for percentile in PERCENTILES)))
+
+    def scenarios(self, rng, prefix, users):
+        """`(endpoint name, access token, path)` for every endpoint and sampled user."""
+        admin = User.objects.filter(username='{}-admin'.format(prefix)).first()
+        doctors = list(Doctor.objects.filter(user__username__startswith='{}-doctor-'.format(prefix))
+                       .select_related('user').order_by('pk')[:users])
+        patients = list(Patient.objects.filter(user__username__startswith='{}-patient-'.format(prefix))
+                        .select_related('user').order_by('pk')[:users])
+        if admin is None or not doctors or not patients:
+            raise CommandError("No seeded data with prefix {!r}, run seed_hospital first".format(prefix))
+
+        def token(serializer, user):
+            return str(serializer.get_token(user).access_token)
+
+        admin_token = token(AdminTokenObtainPairSerializer, admin)
+        scenarios = []
+        for doctor in doctors:
+            doctor_token = token(DoctorTokenObtainPairSerializer, doctor.user)
+            scenarios += [
+                ('doctor appointments', doctor_token, '/api/doctor/appointments/'),
+                ('doctor profile', doctor_token, '/api/doctor/profile/'),
+                ('doctor slots', doctor_token, '/api/doctor/{}/slots/'.format(rng.choice(doctors).pk)),
+                ('department slots', doctor_token, '/api/doctor/department/{}/slots/'.format(doctor.department)),
+            ]
+        for patient in patients:
+            patient_token = token(PatientTokenObtainPairSerializer, patient.user)
+            scenarios += [
+                ('patient history', patient_token, '/api/Patient/history/'),
+                ('patient profile', patient_token, '/api/Patient/profile/'),
+                ('patient appointments', patient_token, '/api/Patient/appointment/'),
+                ('admin patient history', admin_token, '/api/admin/Patient/{}/history/'.format(patient.user_id)),
+            ]
+        scenarios += [
+            ('admin patients', admin_token, '/api/admin/patients/'),
+            ('admin doctors', admin_token, '/api/admin/doctors/'),
+            ('admin pending appointments', admin_token, '/api/admin/approve/appointments/'),
+            ('admin approval queue', admin_token, '/api/admin/approve/queue/'),
+            ('admin revenue', admin_token, '/api/admin/revenue/department/'),
+            ('admin daily stats', admin_token, '/api/admin/dashboard/daily/'),
+        ] * max(1, len(doctors) // 4)
+        return scenarios
+
+    def in_process(self):
+        client = Client()
+        counter = {'queries': 0}
+
+        def count(execute, sql, params, many, context):
+            counter['queries'] += 1
+            return execute(sql, params, many, context)
+
+        def send(path, token):
+            counter['queries'] = 0
+            with override_settings(ALLOWED_HOSTS=['testserver']), connection.execute_wrapper(count):
+                started = time.perf_counter()
+                response = client.get(path, HTTP_AUTHORIZATION='Bearer {}'.format(token))
+                elapsed = time.perf_counter() - started
+            return response.status_code, elapsed, counter['queries']
+        return send
+
+    def remote(self, base_url):
+        base_url = base_url.rstrip('/')
+
+        def send(path, token):
+            request = Request(base_url + path, headers={'Authorization': 'Bearer {}'.format(token)})
+            started = time.perf_counter()
+            try:
+                with urlopen(request) as response:
+                    response.read()
+                    status = response.status
+            except HTTPError as error:
+                status = error.code
+            return status, time.perf_counter() - started, None
+        return send
@@ -0,0 +1,58 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from hospitalAdmin.rollups import rebuild
+from patient.models import Appointment, PatientHistory
+
+
+class Command(BaseCommand):
+    help = ("Recomputes the daily department stats from patient histories and appointments. Meant to run nightly; "
+            "by default it reconciles the last 7 days and the next 60 (appointments are booked ahead).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Last day to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--all', action='store_true', help="Rebuild every day that has any data.")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Days rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['all']:
+            bounds = [
+                *PatientHistory.objects.aggregate(Min('admit_date'), Max('admit_date'), Max('release_date')).values(),
+                *Appointment.objects.aggregate(Min('appointment_date'), Max('appointment_date')).values(),
+            ]
+            bounds = [bound for bound in bounds if bound is not None]
+            if not bounds:
+                self.stdout.write("Nothing to rebuild")
+                return
+            start, end = min(bounds), max(bounds)
+        else:
+            start = self._date(options['start'], 'start') or today - datetime.timedelta(days=7)
+            end = self._date(options['end'], 'end') or today + datetime.timedelta(days=60)
+        if end < start:
+            raise CommandError("--end must not be before --start")
+
+        rows = 0
+        chunk = datetime.timedelta(days=options['chunk_days'])
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + chunk - datetime.timedelta(days=1), end)
+            rows += rebuild(chunk_start, chunk_end)
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS("Rebuilt {} daily stats rows from {} to {}".format(rows, start, end)))
+
+    def _date(self, value, name):
+        if value is None:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError("--{} must be a date formatted as YYYY-MM-DD".format(name))
+        return day
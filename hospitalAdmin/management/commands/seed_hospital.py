@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hospitalAdmin.seeding import BATCH_SIZE, PASSWORD, rows_per_patient, seed
+
+
+class Command(BaseCommand):
+    help = ("Fills the database with synthetic doctors, patients, histories, costs and appointments for load "
+            "testing. Scale with --patients, or --rows for an approximate total row count (10k to 10M).")
+
+    def add_arguments(self, parser):
+        scale = parser.add_mutually_exclusive_group()
+        scale.add_argument('--patients', type=int)
+        scale.add_argument('--rows', type=int, help="Approximate number of rows to create in total.")
+        parser.add_argument('--doctors', type=int, help="Defaults to one per 50 patients, at least 10.")
+        parser.add_argument('--histories-per-patient', type=float, default=3)
+        parser.add_argument('--appointments-per-history', type=float, default=2)
+        parser.add_argument('--prefix', default='seed', help="Username prefix; use a new one to seed again.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Patients inserted per transaction.")
+
+    def handle(self, *args, **options):
+        patients = options['patients']
+        if patients is None:
+            rows = options['rows'] or 10000
+            patients = int(rows / rows_per_patient(options['histories_per_patient'],
+                                                   options['appointments_per_history']))
+        if patients < 1:
+            raise CommandError("Nothing to seed")
+
+        started = time.perf_counter()
+
+        def progress(result):
+            self.stdout.write("{:>9} / {} patients, {} rows, {:.0f} rows/s".format(
+                result.patients, patients, result.rows, result.rows / (time.perf_counter() - started)))
+
+        result = seed(patients=patients, doctors=options['doctors'],
+                      histories_per_patient=options['histories_per_patient'],
+                      appointments_per_history=options['appointments_per_history'], prefix=options['prefix'],
+                      seed=options['seed'], batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded {} doctors, {} patients, {} histories, {} costs and {} appointments ({} rows) in {:.1f} s. "
+            "Log in as {} (or any {}-doctor-N / {}-patient-N) with password {!r}.".format(
+                len(result.doctors), result.patients, result.histories, result.costs, result.appointments,
+                result.rows, time.perf_counter() - started, result.admin.username, options['prefix'],
+                options['prefix'], PASSWORD)))
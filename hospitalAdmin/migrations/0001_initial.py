@@ -0,0 +1,34 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDepartmentStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('department', models.CharField(choices=[('CL', 'Cardiologist'), ('DL', 'Dermatologists'), ('EMC', 'Emergency Medicine Specialists'), ('IL', 'Immunologists'), ('AL', 'Anesthesiologists'), ('CRS', 'Colon and Rectal Surgeons')], max_length=3)),
+                ('admissions', models.IntegerField(default=0)),
+                ('releases', models.IntegerField(default=0)),
+                ('stay_days', models.IntegerField(default=0)),
+                ('appointments', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily department stats',
+                'ordering': ['date', 'department'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailydepartmentstats',
+            constraint=models.UniqueConstraint(fields=('date', 'department'), name='daily_stats_date_department_unique'),
+        ),
+    ]
@@ -1,3 +1,33 @@
 from django.db import models
 
-# Create your models here.
+from doctor.models import Doctor
+
+
+class DailyDepartmentStats(models.Model):
+    """
+    Per-department, per-day rollup of admissions, releases and appointments for the
+    admin dashboard. Maintained by hospitalAdmin.rollups; `manage.py rebuild_daily_stats`
+    recomputes it from the source tables. Counters are plain integers so that a stray
+    decrement before the first rebuild cannot fail the save that triggered it.
+    """
+    date = models.DateField()
+    department = models.CharField(max_length=3, choices=Doctor.department_choices)
+    admissions = models.IntegerField(default=0)
+    releases = models.IntegerField(default=0)
+    # Summed length of stay, in days, of the patients released that day.
+    stay_days = models.IntegerField(default=0)
+    appointments = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily department stats"
+        ordering = ['date', 'department']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'department'], name='daily_stats_date_department_unique'),
+        ]
+
+    @property
+    def average_stay(self):
+        return self.stay_days / self.releases if self.releases else None
+
+    def __str__(self):
+        return "{} {}".format(self.date, self.department)
@@ -0,0 +1,139 @@
+"""
+Daily per-department rollups of admissions, releases and appointments.
+
+Every PatientHistory contributes one admission on its admit date and, once
+released, one release (and its length of stay) on its release date; every
+Appointment counts on its appointment date, under its history's department.
+Saves and deletes apply the difference between the old and new contribution
+to `DailyDepartmentStats` with `UPDATE ... SET x = x + n`, inside the same
+transaction as the change itself. `rebuild()` recomputes a date range from
+the source tables; the `rebuild_daily_stats` command runs it nightly to
+reconcile anything written around the signals (raw SQL, `QuerySet.update()`).
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+
+from patient.models import Appointment, PatientHistory
+
+from .models import DailyDepartmentStats
+
+
+COUNTERS = ('admissions', 'releases', 'stay_days', 'appointments')
+
+
+def _deltas():
+    return defaultdict(Counter)
+
+
+def _add_history(deltas, admit_date, release_date, department, sign):
+    if admit_date is None or department is None:
+        return
+    deltas[admit_date, department]['admissions'] += sign
+    if release_date is not None:
+        deltas[release_date, department]['releases'] += sign
+        deltas[release_date, department]['stay_days'] += sign * (release_date - admit_date).days
+
+
+def apply(deltas):
+    """Adds `{(date, department): Counter(counter=change)}` to the rollup rows, creating missing rows."""
+    for (day, department), change in deltas.items():
+        change = {counter: value for counter, value in change.items() if value}
+        if not change:
+            continue
+        increments = {counter: F(counter) + value for counter, value in change.items()}
+        rows = DailyDepartmentStats.objects.filter(date=day, department=department)
+        if rows.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                DailyDepartmentStats.objects.create(date=day, department=department, **change)
+        except IntegrityError:
+            # Created concurrently.
+            rows.update(**increments)
+
+
+def history_saved(history, created):
+    old = (history.loaded_value('admit_date'), history.loaded_value('release_date'),
+           history.loaded_value('department'))
+    new = (history.admit_date, history.release_date, history.department)
+    if not created and old == new:
+        return
+    deltas = _deltas()
+    if not created:
+        _add_history(deltas, *old, sign=-1)
+    _add_history(deltas, *new, sign=1)
+    if not created and old[2] is not None and old[2] != history.department:
+        # The history's appointments move to the new department too.
+        appointments = (Appointment.objects.filter(patient_history=history).values('appointment_date')
+                        .annotate(count=Count('id')).values_list('appointment_date', 'count'))
+        for day, count in appointments:
+            deltas[day, old[2]]['appointments'] -= count
+            deltas[day, history.department]['appointments'] += count
+    apply(deltas)
+
+
+def history_deleted(history):
+    deltas = _deltas()
+    _add_history(deltas, history.admit_date, history.release_date, history.department, sign=-1)
+    apply(deltas)
+
+
+def histories_added(histories):
+    """Records histories inserted with `bulk_create`, which sends no signals."""
+    deltas = _deltas()
+    for history in histories:
+        _add_history(deltas, history.admit_date, history.release_date, history.department, sign=1)
+    apply(deltas)
+
+
+def appointment_saved(appointment, created):
+    old = (appointment.loaded_value('appointment_date'), appointment.loaded_value('patient_history_id'))
+    new = (appointment.appointment_date, appointment.patient_history_id)
+    if not created and old == new:
+        return
+    departments = dict(PatientHistory.objects.filter(pk__in={old[1], new[1]} - {None})
+                       .values_list('pk', 'department'))
+    deltas = _deltas()
+    if not created and old[0] is not None and old[1] in departments:
+        deltas[old[0], departments[old[1]]]['appointments'] -= 1
+    deltas[new[0], departments[new[1]]]['appointments'] += 1
+    apply(deltas)
+
+
+def appointment_deleted(appointment):
+    department = (PatientHistory.objects.filter(pk=appointment.patient_history_id)
+                  .values_list('department', flat=True).first())
+    if department is not None:
+        apply({(appointment.appointment_date, department): Counter(appointments=-1)})
+
+
+def rebuild(start, end):
+    """Recomputes the rollup rows of the days `start..end` (inclusive) from the source tables."""
+    totals = _deltas()
+    admissions = (PatientHistory.objects.filter(admit_date__range=(start, end))
+                  .values('admit_date', 'department').annotate(count=Count('id'))
+                  .values_list('admit_date', 'department', 'count'))
+    for day, department, count in admissions:
+        totals[day, department]['admissions'] = count
+    stay = ExpressionWrapper(F('release_date') - F('admit_date'), output_field=DurationField())
+    releases = (PatientHistory.objects.filter(release_date__range=(start, end))
+                .values('release_date', 'department').annotate(count=Count('id'), stay=Sum(stay))
+                .values_list('release_date', 'department', 'count', 'stay'))
+    for day, department, count, stay in releases:
+        totals[day, department]['releases'] = count
+        totals[day, department]['stay_days'] = stay.days if stay else 0
+    appointments = (Appointment.objects.filter(appointment_date__range=(start, end))
+                    .values('appointment_date', 'patient_history__department').annotate(count=Count('id'))
+                    .values_list('appointment_date', 'patient_history__department', 'count'))
+    for day, department, count in appointments:
+        totals[day, department]['appointments'] = count
+
+    with transaction.atomic():
+        DailyDepartmentStats.objects.filter(date__range=(start, end)).delete()
+        DailyDepartmentStats.objects.bulk_create([
+            DailyDepartmentStats(date=day, department=department, **counters)
+            for (day, department), counters in sorted(totals.items())
+        ])
+    return len(totals)
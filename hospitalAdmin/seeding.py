@@ -0,0 +1,203 @@
+"""
+Synthetic hospital data for load tests and query-count tests.
+
+`seed()` creates approved doctors (with working hours), patients, their
+histories, costs and appointments with bulk inserts, one transaction per
+batch of patients, so memory stays flat from thousands to millions of rows.
+The data is reproducible for a given `seed`. Every seeded account shares
+`PASSWORD`, hashed once.
+
+Bulk inserts send no signals, so each batch of histories is added to the
+search index as it is inserted, and once the rows are in the rest of the
+derived state is refreshed in one go: daily rollups are rebuilt for the
+seeded dates and the approval queues and department availability are reset.
+"""
+import datetime
+import random
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import User
+from account.roles import ADMIN, DOCTOR, PATIENT
+from doctor.models import Doctor, WorkingHours
+from doctor.scheduling import departments_changed
+from patient import search
+from patient.models import Patient, PatientHistory, PatientCost, Appointment
+
+from . import approval_queue, rollups
+
+
+PASSWORD = 'seed-password'
+BATCH_SIZE = 2000
+HISTORY_DAYS = 730
+# Appointments are booked on the days following an admission, so recent ones fall in the future.
+APPOINTMENT_DAYS = 14
+SLOTS_PER_DAY = (17 - 9) * 2
+SYMPTOMS = ('fever', 'cough', 'chest pain', 'shortness of breath', 'headache', 'dizziness', 'nausea', 'vomiting',
+            'abdominal pain', 'back pain', 'joint pain', 'skin rash', 'itching', 'swelling', 'fatigue', 'palpitations',
+            'sore throat', 'blurred vision', 'numbness', 'insomnia', 'high blood pressure', 'allergic reaction',
+            'bleeding', 'weight loss', 'loss of appetite', 'wheezing', 'fainting', 'burns', 'fracture', 'anxiety')
+
+
+def rows_per_patient(histories_per_patient=3, appointments_per_history=2, released=0.9):
+    """Rows created per patient: user, profile, group membership, then histories with costs and appointments."""
+    return 3 + histories_per_patient * (1 + released + appointments_per_history)
+
+
+@dataclass
+class SeedResult:
+    doctors: list = field(default_factory=list)
+    patients: int = 0
+    histories: int = 0
+    costs: int = 0
+    appointments: int = 0
+    admin: User = None
+
+    @property
+    def rows(self):
+        # Doctors come with a profile, a group membership and five working-hours rows.
+        return 8 * len(self.doctors) + 3 * self.patients + self.histories + self.costs + self.appointments
+
+
+def _membership(users, group):
+    membership = User.groups.through
+    membership.objects.bulk_create([membership(user_id=user.pk, group_id=group.pk) for user in users],
+                                   batch_size=BATCH_SIZE)
+
+
+def _users(prefix, start, count, password):
+    return User.objects.bulk_create([
+        User(username='{}-{}'.format(prefix, number), first_name=prefix.capitalize(), last_name=str(number),
+             password=password, status=True)
+        for number in range(start, start + count)
+    ], batch_size=BATCH_SIZE)
+
+
+def seed(patients=1000, doctors=None, histories_per_patient=3, appointments_per_history=2, released=0.9,
+         prefix='seed', seed=0, batch_size=BATCH_SIZE, progress=None):
+    """
+    Creates `doctors` (default one per 50 patients, at least 10) and `patients`, each patient with
+    about `histories_per_patient` histories spread over the past two years; `released` of them are
+    released and billed, and each has about `appointments_per_history` appointments, the most recent
+    ones falling into the coming two weeks. Returns a `SeedResult`.
+
+    `progress`, if given, is called with the result after every batch of patients.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=HISTORY_DAYS)
+    password = make_password(PASSWORD)
+    departments = [code for code, name in Doctor.department_choices]
+    groups = {role: Group.objects.get_or_create(name=role)[0] for role in (ADMIN, DOCTOR, PATIENT)}
+    result = SeedResult()
+
+    with transaction.atomic():
+        admin = User.objects.filter(username='{}-admin'.format(prefix)).first()
+        if admin is None:
+            admin = User.objects.create(username='{}-admin'.format(prefix), first_name='Admin', password=password,
+                                        status=True)
+            admin.groups.add(groups[ADMIN])
+        result.admin = admin
+
+        doctor_count = doctors if doctors is not None else max(10, patients // 50)
+        doctor_users = _users('{}-doctor'.format(prefix), 0, doctor_count, password)
+        result.doctors = Doctor.objects.bulk_create([
+            Doctor(user=user, department=departments[number % len(departments)], address='Dhaka',
+                   mobile='0170000{:04d}'.format(number % 10000))
+            for number, user in enumerate(doctor_users)
+        ], batch_size=batch_size)
+        _membership(doctor_users, groups[DOCTOR])
+        WorkingHours.objects.bulk_create([
+            WorkingHours(doctor=doctor, weekday=weekday, start_time=datetime.time(9), end_time=datetime.time(17))
+            for doctor in result.doctors for weekday in range(5)
+        ], batch_size=batch_size)
+
+    # Half-hour slots taken per doctor per day, so that seeded appointments never overlap.
+    total_days = HISTORY_DAYS + APPOINTMENT_DAYS + 1
+    doctor_index = {doctor.pk: number for number, doctor in enumerate(result.doctors)}
+    taken = bytearray(len(result.doctors) * total_days)
+    last_day = today
+
+    for start in range(0, patients, batch_size):
+        count = min(batch_size, patients - start)
+        with transaction.atomic():
+            users = _users('{}-patient'.format(prefix), start, count, password)
+            profiles = Patient.objects.bulk_create([
+                Patient(user=user, age=rng.randint(1, 90), address='Dhaka', mobile='0180000{:04d}'.format(
+                    number % 10000))
+                for number, user in enumerate(users, start)
+            ], batch_size=batch_size)
+            _membership(users, groups[PATIENT])
+
+            histories = []
+            for profile in profiles:
+                for _ in range(max(1, round(rng.gauss(histories_per_patient, 1)))):
+                    doctor = rng.choice(result.doctors)
+                    admit_date = first_day + datetime.timedelta(days=rng.randrange(HISTORY_DAYS + 1))
+                    release_date = None
+                    if rng.random() < released:
+                        release_date = min(admit_date + datetime.timedelta(days=rng.randint(1, 21)), today)
+                    histories.append(PatientHistory(
+                        patient=profile, assigned_doctor=doctor, department=doctor.department,
+                        admit_date=admit_date, release_date=release_date,
+                        symptomps=', '.join(rng.sample(SYMPTOMS, rng.randint(1, 4))).capitalize()))
+            admit_dates = [history.admit_date for history in histories]
+            PatientHistory.objects.bulk_create(histories, batch_size=batch_size)
+            # admit_date is auto_now_add, which bulk_create overwrites with today.
+            for history, admit_date in zip(histories, admit_dates):
+                history.admit_date = admit_date
+            PatientHistory.objects.bulk_update(histories, ['admit_date'], batch_size=batch_size)
+            search.index(histories)
+
+            costs = [
+                PatientCost(patient_details=history, room_charge=rng.randint(0, 50) * 100,
+                            medicine_cost=rng.randint(0, 100) * 10, doctor_fee=rng.choice((500, 800, 1000)),
+                            other_charge=rng.randint(0, 20) * 50)
+                for history in histories if history.release_date
+            ]
+            PatientCost.objects.bulk_create(costs, batch_size=batch_size)
+
+            appointments = []
+            for history in histories:
+                for _ in range(max(0, round(rng.gauss(appointments_per_history, 1)))):
+                    offset = (history.admit_date - first_day).days + rng.randrange(APPOINTMENT_DAYS)
+                    row = doctor_index[history.assigned_doctor_id] * total_days
+                    while offset < total_days and taken[row + offset] == SLOTS_PER_DAY:
+                        offset += 1
+                    if offset == total_days:
+                        continue
+                    slot = taken[row + offset]
+                    taken[row + offset] += 1
+                    day = first_day + datetime.timedelta(days=offset)
+                    last_day = max(last_day, day)
+                    minutes = 9 * 60 + slot * 30
+                    appointments.append(Appointment(
+                        patient_history=history, doctor_id=history.assigned_doctor_id, appointment_date=day,
+                        appointment_time=datetime.time(minutes // 60, minutes % 60),
+                        status=rng.random() < (0.95 if day <= today else 0.5)))
+            Appointment.objects.bulk_create(appointments, batch_size=batch_size)
+
+        result.patients += count
+        result.histories += len(histories)
+        result.costs += len(costs)
+        result.appointments += len(appointments)
+        if progress:
+            progress(result)
+
+    _refresh_derived_state(first_day, last_day)
+    return result
+
+
+def _refresh_derived_state(first_day, last_day):
+    chunk = datetime.timedelta(days=31)
+    day = first_day
+    while day <= last_day:
+        rollups.rebuild(day, min(day + chunk, last_day))
+        day += chunk + datetime.timedelta(days=1)
+    for queue in approval_queue.QUEUES:
+        approval_queue.reset(queue)
+    departments_changed(code for code, name in Doctor.department_choices)
@@ -0,0 +1,105 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from account.models import User
+from account.roles import get_user_roles
+from patient.models import Appointment, PatientHistory
+from patient import signals as patient_signals
+
+from . import approval_queue, rollups
+from .approval_queue import ACCOUNT_QUEUES, APPOINTMENTS, appointment_timestamp
+
+
+def _on_commit(change, queue, timestamps):
+    transaction.on_commit(lambda: change(queue, timestamps))
+
+
+def _account_queues(user):
+    return [ACCOUNT_QUEUES[role] for role in get_user_roles(user) if role in ACCOUNT_QUEUES]
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    rollups.appointment_saved(instance, created)
+    timestamp = appointment_timestamp(instance.appointment_date, instance.appointment_time)
+    if created:
+        if not instance.status:
+            _on_commit(approval_queue.entered, APPOINTMENTS, [timestamp])
+        return
+    was_approved = instance.loaded_value('status')
+    if was_approved is None:
+        transaction.on_commit(lambda: approval_queue.reset(APPOINTMENTS))
+        return
+    if not was_approved:
+        _on_commit(approval_queue.left, APPOINTMENTS, [appointment_timestamp(
+            instance.loaded_value('appointment_date'), instance.loaded_value('appointment_time'))])
+    if not instance.status:
+        _on_commit(approval_queue.entered, APPOINTMENTS, [timestamp])
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    rollups.appointment_deleted(instance)
+    if not instance.status:
+        _on_commit(approval_queue.left, APPOINTMENTS,
+                   [appointment_timestamp(instance.appointment_date, instance.appointment_time)])
+
+
+@receiver(post_save, sender=PatientHistory)
+def history_saved(sender, instance, created, **kwargs):
+    rollups.history_saved(instance, created)
+
+
+@receiver(post_delete, sender=PatientHistory)
+def history_deleted(sender, instance, **kwargs):
+    rollups.history_deleted(instance)
+
+
+@receiver(patient_signals.histories_imported, sender=PatientHistory)
+def histories_imported(sender, histories, **kwargs):
+    rollups.histories_added(histories)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # New users join a role group, and so a queue, through m2m_changed.
+    if created or instance.status == instance.loaded_value('status', instance.status):
+        return
+    change = approval_queue.left if instance.status else approval_queue.entered
+    for queue in _account_queues(instance):
+        _on_commit(change, queue, [instance.date_joined])
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    if not instance.status:
+        for queue in _account_queues(instance):
+            _on_commit(approval_queue.left, queue, [instance.date_joined])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_clear', 'post_clear'):
+        for queue in ACCOUNT_QUEUES.values():
+            transaction.on_commit(lambda queue=queue: approval_queue.reset(queue))
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    change = approval_queue.entered if action == 'post_add' else approval_queue.left
+    if reverse:
+        # group.user_set.add(...), as the registration endpoints do.
+        if instance.name in ACCOUNT_QUEUES:
+            timestamps = list(User.objects.filter(pk__in=pk_set, status=False).values_list('date_joined', flat=True))
+            _on_commit(change, ACCOUNT_QUEUES[instance.name], timestamps)
+    elif not instance.status:
+        for name in Group.objects.filter(pk__in=pk_set, name__in=ACCOUNT_QUEUES).values_list('name', flat=True):
+            _on_commit(change, ACCOUNT_QUEUES[name], [instance.date_joined])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    for queue in ACCOUNT_QUEUES.values():
+        transaction.on_commit(lambda queue=queue: approval_queue.reset(queue))
@@ -1,3 +1,482 @@
+import datetime
+import io
+import uuid
+from itertools import count
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from account.models import User
+from hospitalAdmin import analytics, approval_queue
+from hospitalAdmin.api import urls
+from hospitalAdmin.models import DailyDepartmentStats
+from hospitalAdmin.api.serializers import AdminTokenObtainPairSerializer
+from hospitalAdmin.management.commands.bench_analytics import naive_report
+from hospitalAdmin.seeding import PASSWORD, seed
+from main.query_counts import Dataset, QueryScalingTests, Request
+from doctor.models import Doctor, WorkingHours
+from patient import exporters
+from patient.importers import import_file
+from patient.models import Appointment, Patient, PatientCost, PatientHistory
+
+
+class AdminQueryCountTests(QueryScalingTests, TestCase):
+    urlconf = urls
+    prefix = 'api/admin/'
+
+    def requests(self, data):
+        token = data.admin_token
+        usernames = count()
+        patient = data.patient.user_id
+
+        def account(role, profile):
+            return {'user_data': {'username': 'new-{}-{}'.format(role, next(usernames)), 'first_name': 'New',
+                                  'last_name': role.capitalize(), 'password': 'new-password',
+                                  'password2': 'new-password'},
+                    'profile_data': profile}
+
+        doctor_profile = {'department': 'CL', 'address': 'Dhaka', 'mobile': '01700000000'}
+        patient_profile = {'age': 30, 'address': 'Dhaka', 'mobile': '01800000000'}
+
+        def patients_file():
+            rows = ['new-import-{},New,Import,new-password,30,Dhaka,01800000000'.format(next(usernames))
+                    for _ in range(2)]
+            content = '\n'.join(['username,first_name,last_name,password,age,address,mobile'] + rows)
+            return {'file': SimpleUploadedFile('patients.csv', content.encode(), content_type='text/csv')}
+
+        credentials = {'username': data.admin.username, 'password': PASSWORD}
+        return {
+            'login': Request('post', '/api/admin/login/', data=credentials),
+            'token': Request('post', '/api/admin/token/', data=credentials),
+            'token refresh': Request('post', '/api/admin/token/refresh/', data={
+                'refresh': data.refresh(AdminTokenObtainPairSerializer, data.admin)}),
+            'approval queue': Request('get', '/api/admin/approve/queue/', token),
+            'pending doctors': Request('get', '/api/admin/approve/doctors/', token),
+            'pending doctor': Request('get', '/api/admin/approve/doctor/{}/'.format(data.pending_doctor.pk), token),
+            'pending patients': Request('get', '/api/admin/approve/patients/', token),
+            'pending patient': Request('get', '/api/admin/approve/Patient/{}/'.format(data.pending_patient.pk),
+                                       token),
+            'pending appointments': Request('get', '/api/admin/approve/appointments/', token),
+            'pending appointment': Request('get', '/api/admin/approve/appointment/{}'.format(
+                data.pending_appointment.pk), token),
+            'doctors': Request('get', '/api/admin/doctors/', token),
+            'doctor': Request('get', '/api/admin/doctor/{}/'.format(data.doctor.user_id), token),
+            'patients': Request('get', '/api/admin/patients/', token),
+            'patient': Request('get', '/api/admin/Patient/{}/'.format(patient), token),
+            'patient histories': Request('get', '/api/admin/Patient/{}/history/'.format(patient), token),
+            'patient history': Request('get', '/api/admin/Patient/{}/history/{}/'.format(patient, data.history.pk),
+                                       token),
+            'appointments': Request('get', '/api/admin/appointments/', token),
+            'appointment': Request('get', '/api/admin/appointment/{}/'.format(data.appointment.pk), token),
+            'history export': Request('get', '/api/admin/export/histories/', token),
+            'history xlsx export': Request('get', '/api/admin/export/histories/', token, data={'file_type': 'xlsx'}),
+            'history search': Request('get', '/api/admin/histories/search/', token,
+                                      data={'q': 'pain', 'department': 'CL'}),
+            'revenue by department': Request('get', '/api/admin/revenue/department/', token),
+            'revenue by doctor': Request('get', '/api/admin/revenue/doctor/', token),
+            'daily stats': Request('get', '/api/admin/dashboard/daily/', token),
+            'occupancy': Request('get', '/api/admin/analytics/occupancy/', token),
+            'doctor registration': Request('post', '/api/admin/doctor/registration/', token,
+                                           data=lambda: account('doctor', doctor_profile)),
+            'doctor bulk registration': Request('post', '/api/admin/doctor/registration/bulk/', token, data=lambda: {
+                'accounts': [account('doctor', doctor_profile) for _ in range(2)]}),
+            'patient registration': Request('post', '/api/admin/Patient/registration/', token,
+                                            data=lambda: account('patient', patient_profile)),
+            'patient bulk registration': Request('post', '/api/admin/Patient/registration/bulk/', token, data=lambda: {
+                'accounts': [account('patient', patient_profile) for _ in range(2)]}),
+            'patient import': Request('post', '/api/admin/import/patients/', token, data=patients_file,
+                                      content_type=None),
+            'doctor bulk approval': Request('post', '/api/admin/approve/doctors/bulk/', token, data={
+                'action': 'approve', 'ids': [str(data.pending_doctor.pk)]}),
+            'patient bulk approval': Request('post', '/api/admin/approve/patients/bulk/', token, data={
+                'action': 'approve', 'ids': [str(data.pending_patient.pk)]}),
+            'appointment bulk approval': Request('post', '/api/admin/approve/appointments/bulk/', token, data={
+                'action': 'approve', 'ids': [data.pending_appointment.pk]}),
+        }
+
+
+class HistoryExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = seed(patients=4, doctors=2, histories_per_patient=2).admin
+
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(AdminTokenObtainPairSerializer, self.admin))}
+
+    def test_xlsx_continues_on_new_sheets(self):
+        from openpyxl import load_workbook
+
+        fileobj = io.BytesIO()
+        exporters.write_xlsx(exporters.export_rows(exporters.export_queryset()), fileobj, sheet_rows=3)
+        workbook = load_workbook(fileobj, read_only=True)
+        sheets = [list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets]
+        self.assertEqual(workbook.sheetnames[:2], ['histories', 'histories 2'])
+        self.assertTrue(all(sheet[0] == exporters.COLUMNS and len(sheet) <= 4 for sheet in sheets))
+        self.assertEqual(sum(len(sheet) - 1 for sheet in sheets), PatientHistory.objects.count())
+
+    def test_invalid_arguments_are_rejected(self):
+        for params in ({'department': 'XX'}, {'start': '2026-03-10', 'end': '2026-03-01'}, {'start': '2026-02-30'},
+                       {'file_type': 'pdf'}):
+            response = self.client.get('/api/admin/export/histories/', params, **self.headers)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('message', response.json())
+        response = self.client.get('/api/admin/export/histories/', {'department': 'CL', 'start': '2026-03-01',
+                                                                    'end': '2026-03-01'}, **self.headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_xlsx_larger_than_a_sheet_is_rejected(self):
+        with mock.patch.object(exporters, 'XLSX_SHEET_ROWS', PatientHistory.objects.count() - 1):
+            response = self.client.get('/api/admin/export/histories/', {'file_type': 'xlsx'}, **self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file_type=csv', response.json()['message'])
+
+    def test_command_validates_its_arguments(self):
+        for arguments in (['--start', '2024-13-01'], ['--end', 'yesterday'],
+                          ['--start', '2024-02-01', '--end', '2024-01-01'], ['--department', 'XX']):
+            with self.subTest(arguments=arguments), self.assertRaises(CommandError):
+                call_command('export_histories', 'unused.csv', *arguments)
+
+
+class AppointmentAdminTests(TestCase):
+    """Seeded doctors work 9:00-17:00 on weekdays, in 30 minute slots."""
+
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=2, doctors=1, histories_per_patient=1)
+        cls.admin = result.admin
+        cls.doctor = result.doctors[0]
+        cls.history = PatientHistory.objects.first()
+        # A Monday past the seeded appointments.
+        day = timezone.localdate() + datetime.timedelta(days=30)
+        cls.monday = day - datetime.timedelta(days=day.weekday())
+
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(AdminTokenObtainPairSerializer, self.admin))}
+
+    def appointment(self, time):
+        return {'appointments': {'appointment_date': self.monday.isoformat(), 'appointment_time': time,
+                                 'status': True, 'patient_history': self.history.pk, 'doctor': self.doctor.pk}}
+
+    def create(self, time):
+        return self.client.post('/api/admin/appointments/', self.appointment(time), content_type='application/json',
+                                **self.headers)
+
+    def update(self, pk, time):
+        return self.client.put('/api/admin/appointment/{}/'.format(pk), self.appointment(time),
+                               content_type='application/json', **self.headers)
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.create('10:00').status_code, 201)
+        response = self.create('10:20')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('overlapping', response.json()['appointment_time'])
+        self.assertEqual(self.create('03:00').status_code, 400)
+
+    def test_update(self):
+        first = self.create('10:00').json()['appointments']['id']
+        second = self.create('11:00').json()['appointments']['id']
+        # Its own slot does not conflict with itself.
+        self.assertEqual(self.update(first, '10:00').status_code, 200)
+        self.assertEqual(self.update(first, '10:15').status_code, 200)
+        response = self.update(second, '10:30')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('overlapping', response.json()['appointment_time'])
+        self.assertEqual(self.update(second, '17:00').status_code, 400)
+        self.assertEqual(Appointment.objects.get(pk=second).appointment_time, datetime.time(11))
+
+    def approve(self, appointment):
+        return self.client.put('/api/admin/approve/appointment/{}'.format(appointment.pk),
+                               {'appointments': {'status': True}}, content_type='application/json', **self.headers)
+
+    def test_approval_keeps_the_booked_slot(self):
+        appointment = Appointment.objects.create(appointment_date=self.monday, appointment_time=datetime.time(10),
+                                                 status=False, patient_history=self.history, doctor=self.doctor)
+        # The hours changed since it was booked.
+        WorkingHours.objects.filter(doctor=self.doctor).update(start_time=datetime.time(12))
+        self.assertEqual(self.approve(appointment).status_code, 200)
+        self.assertTrue(Appointment.objects.get(pk=appointment.pk).status)
+
+    def test_doctor_without_working_hours(self):
+        self.doctor.working_hours.all().delete()
+        appointment = Appointment.objects.create(appointment_date=self.monday, appointment_time=datetime.time(10),
+                                                 status=False, patient_history=self.history, doctor=self.doctor)
+        self.assertEqual(self.approve(appointment).status_code, 200)
+        self.assertTrue(Appointment.objects.get(pk=appointment.pk).status)
+        self.assertEqual(self.create('03:00').status_code, 201)
+        self.assertEqual(self.create('03:15').status_code, 400)
+
+
+class BulkApprovalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=6, doctors=4, histories_per_patient=1)
+        cls.admin = result.admin
+        cls.doctors = [doctor.user for doctor in result.doctors]
+        cls.patients = list(User.objects.filter(patient__isnull=False).order_by('username'))
+        User.objects.filter(pk__in=[user.pk for user in cls.doctors[2:] + cls.patients[3:]]).update(status=False)
+        cls.appointments = list(Appointment.objects.order_by('pk'))
+        Appointment.objects.filter(pk__in=[appointment.pk for appointment in cls.appointments[::2]]).update(
+            status=False)
+
+    def setUp(self):
+        # The queue counts cached by seed() predate the updates above.
+        cache.clear()
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(AdminTokenObtainPairSerializer, self.admin))}
+
+    def post(self, path, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/admin/approve/{}/bulk/'.format(path), data,
+                                        content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def assertQueue(self, queue, count):
+        """The cached count, kept up to date by the bulk actions, agrees with a recount."""
+        self.assertEqual(self.client.get('/api/admin/approve/queue/', **self.headers).json()[queue]['count'], count)
+        self.assertEqual(approval_queue.pending(queue).count(), count)
+
+    def test_approve_accounts(self):
+        self.assertQueue(approval_queue.DOCTORS, 2)
+        unknown = str(uuid.uuid4())
+        ids = [str(user.pk) for user in self.doctors[1:]] + [unknown, str(self.patients[-1].pk)]
+        result = self.post('doctors', {'action': 'approve', 'ids': ids})
+        # An approved doctor, an unknown id and a patient cannot be approved as doctors.
+        self.assertEqual(result, {'action': 'approve', 'succeeded': 2,
+                                  'failed': [str(self.doctors[1].pk), unknown, str(self.patients[-1].pk)]})
+        self.assertTrue(all(User.objects.filter(pk__in=[user.pk for user in self.doctors]).values_list(
+            'status', flat=True)))
+        self.assertQueue(approval_queue.DOCTORS, 0)
+        self.assertQueue(approval_queue.PATIENTS, 3)
+
+    def test_reject_accounts(self):
+        self.assertQueue(approval_queue.PATIENTS, 3)
+        result = self.post('patients', {'action': 'reject', 'ids': [str(user.pk) for user in self.patients[2:4]]})
+        self.assertEqual(result, {'action': 'reject', 'succeeded': 1, 'failed': [str(self.patients[2].pk)]})
+        self.assertFalse(User.objects.filter(pk=self.patients[3].pk).exists())
+        self.assertTrue(User.objects.filter(pk=self.patients[2].pk).exists())
+        self.assertQueue(approval_queue.PATIENTS, 2)
+
+    def test_approve_appointments_of_a_day(self):
+        pending = self.appointments[0]
+        day = Appointment.objects.filter(appointment_date=pending.appointment_date, doctor=pending.doctor,
+                                         status=False)
+        count = day.count()
+        before = approval_queue.pending(approval_queue.APPOINTMENTS).count()
+        self.assertQueue(approval_queue.APPOINTMENTS, before)
+        result = self.post('appointments', {'action': 'approve', 'appointment_date': str(pending.appointment_date),
+                                             'doctor': pending.doctor_id})
+        self.assertEqual(result, {'action': 'approve', 'succeeded': count, 'failed': []})
+        self.assertFalse(day.exists())
+        self.assertQueue(approval_queue.APPOINTMENTS, before - count)
+
+    def test_reject_appointments(self):
+        before = approval_queue.pending(approval_queue.APPOINTMENTS).count()
+        self.assertQueue(approval_queue.APPOINTMENTS, before)
+        ids = [appointment.pk for appointment in self.appointments[:4]] + [0]
+        result = self.post('appointments', {'action': 'reject', 'ids': ids})
+        self.assertEqual(result, {'action': 'reject', 'succeeded': 2,
+                                  'failed': [self.appointments[1].pk, self.appointments[3].pk, 0]})
+        self.assertEqual(Appointment.objects.filter(pk__in=ids).count(), 2)
+        self.assertQueue(approval_queue.APPOINTMENTS, before - 2)
+
+    def test_invalid_requests(self):
+        for path, data in (('doctors', {'action': 'approve', 'ids': []}),
+                           ('doctors', {'action': 'promote', 'ids': [str(self.doctors[2].pk)]}),
+                           ('appointments', {'action': 'approve'}),
+                           ('appointments', {'action': 'approve', 'ids': [1], 'appointment_date': '2024-01-01'}),
+                           ('appointments', {'action': 'approve', 'ids': [1], 'doctor': 1})):
+            with self.subTest(path=path, data=data):
+                response = self.client.post('/api/admin/approve/{}/bulk/'.format(path), data,
+                                            content_type='application/json', **self.headers)
+                self.assertEqual(response.status_code, 400)
+
+
+class DailyStatsRollupTests(TestCase):
+    """The rollups kept up to date by saves, deletes and imports match a rebuild from the source tables."""
+
+    def rollups(self):
+        return sorted((row.date, row.department, row.admissions, row.releases, row.stay_days, row.appointments)
+                      for row in DailyDepartmentStats.objects.all()
+                      if (row.admissions, row.releases, row.stay_days, row.appointments) != (0, 0, 0, 0))
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        day = datetime.date(2030, 1, 7)
+        doctor = Doctor.objects.create(user=User.objects.create(username='doctor'), address='Dhaka', mobile='1')
+        patient = Patient.objects.create(user=User.objects.create(username='patient'), age=30, address='Dhaka',
+                                         mobile='1')
+        # Admissions, releases and moves between departments.
+        first = PatientHistory.objects.create(patient=patient, assigned_doctor=doctor, symptomps='Cough')
+        second = PatientHistory.objects.create(patient=patient, assigned_doctor=doctor, symptomps='Rash',
+                                               department='DL')
+        first.release_date = first.admit_date + datetime.timedelta(days=3)
+        first.save()
+        # Appointments booked, moved to another day and to another history.
+        moved = Appointment.objects.create(patient_history=first, doctor=doctor, appointment_date=day,
+                                           appointment_time=datetime.time(9))
+        Appointment.objects.create(patient_history=first, doctor=doctor, appointment_date=day,
+                                   appointment_time=datetime.time(10))
+        moved.appointment_date = day + datetime.timedelta(days=1)
+        moved.save()
+        moved.patient_history = second
+        moved.save()
+        first.department = 'EMC'
+        first.save()
+        second = PatientHistory.objects.get(pk=second.pk)
+        second.release_date = second.admit_date + datetime.timedelta(days=5)
+        second.save()
+        # Imported histories, inserted with bulk_create().
+        content = ('patient,doctor,admit_date,release_date,department,symptomps\n'
+                   'patient,doctor,2024-01-01,2024-01-04,CL,Fever\n'
+                   'patient,doctor,2024-01-02,,CL,Headache\n')
+        result = import_file('histories', io.BytesIO(content.encode()), 'csv')
+        self.assertEqual((result.created, result.failed), (2, 0))
+        # And deletes.
+        Appointment.objects.filter(pk=moved.pk).delete()
+        PatientHistory.objects.filter(pk=second.pk).delete()
+
+        incremental = self.rollups()
+        self.assertTrue(incremental)
+        call_command('rebuild_daily_stats', '--all', stdout=io.StringIO())
+        self.assertEqual(incremental, self.rollups())
+
+
+class RevenueReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=0, doctors=2, histories_per_patient=0)
+        cls.admin = result.admin
+        cls.first, cls.second = sorted(result.doctors, key=lambda doctor: doctor.pk)
+        patient = Patient.objects.create(user=User.objects.create(username='patient'), age=30, address='Dhaka',
+                                         mobile='1')
+        histories = [
+            ('CL', cls.first, datetime.date(2026, 1, 15), (100, 200, 300, 400)),
+            ('CL', cls.second, datetime.date(2026, 1, 20), (10, 20, 30, 40)),
+            ('DL', cls.first, datetime.date(2026, 2, 3), (1, 2, 3, 4)),
+            ('DL', cls.second, datetime.date(2026, 2, 3), None),
+            ('EMC', cls.first, datetime.date(2026, 3, 1), (5000, 0, 0, 0)),
+        ]
+        for department, doctor, admit_date, charges in histories:
+            history = PatientHistory.objects.create(patient=patient, assigned_doctor=doctor, department=department,
+                                                    symptomps='Cough')
+            # admit_date is auto_now_add.
+            PatientHistory.objects.filter(pk=history.pk).update(admit_date=admit_date)
+            if charges:
+                PatientCost.objects.create(patient_details=history, room_charge=charges[0],
+                                           medicine_cost=charges[1], doctor_fee=charges[2], other_charge=charges[3])
+
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(AdminTokenObtainPairSerializer, self.admin))}
+
+    def report(self, grouping, **params):
+        response = self.client.get('/api/admin/revenue/{}/'.format(grouping), params, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        return (report['revenue'], report['bills'],
+                [(row[grouping], row['revenue'], row['bills']) for row in report['rows']])
+
+    def test_total_is_the_sum_of_the_charges(self):
+        self.assertEqual(sorted(PatientCost.objects.values_list('total', flat=True)), [10, 100, 1000, 5000])
+
+    def test_groupings(self):
+        self.assertEqual(self.report('department'), (6110, 4, [('CL', 1100, 2), ('DL', 10, 1), ('EMC', 5000, 1)]))
+        self.assertEqual(self.report('doctor'), (6110, 4, [(self.first.pk, 6010, 3), (self.second.pk, 100, 1)]))
+        self.assertEqual(self.report('month'), (6110, 4, [('2026-01-01', 1100, 2), ('2026-02-01', 10, 1),
+                                                          ('2026-03-01', 5000, 1)]))
+
+    def test_date_range(self):
+        self.assertEqual(self.report('day', start='2026-01-20', end='2026-02-28'),
+                         (110, 2, [('2026-01-20', 100, 1), ('2026-02-03', 10, 1)]))
+        self.assertEqual(self.report('department', start='2026-02-03', end='2026-02-03'), (10, 1, [('DL', 10, 1)]))
+        self.assertEqual(self.report('month', start='2026-04-01'), (0, 0, []))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/admin/revenue/week/', **self.headers).status_code, 404)
+        self.assertEqual(self.client.get('/api/admin/revenue/day/', {'start': '2026-13-01'},
+                                         **self.headers).status_code, 400)
+
+
+class AnalyticsTests(TestCase):
+    start = datetime.date(2026, 3, 1)
+    end = datetime.date(2026, 3, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=0, doctors=1, histories_per_patient=0)
+        cls.admin = result.admin
+        patients = [Patient.objects.create(user=User.objects.create(username='patient-{}'.format(number)), age=30,
+                                           address='Dhaka', mobile='1') for number in range(3)]
+        histories = [
+            # Not released yet.
+            (patients[0], 'CL', datetime.date(2026, 2, 25), None),
+            # Released before the range.
+            (patients[0], 'AL', datetime.date(2026, 2, 1), datetime.date(2026, 2, 10)),
+            # Readmitted in another department, after the range.
+            (patients[1], 'CL', datetime.date(2026, 3, 2), datetime.date(2026, 3, 5)),
+            (patients[1], 'DL', datetime.date(2026, 3, 20), datetime.date(2026, 3, 22)),
+            # Released on the first and on the last day of the range.
+            (patients[2], 'EMC', datetime.date(2026, 2, 20), datetime.date(2026, 3, 1)),
+            (patients[2], 'EMC', datetime.date(2026, 3, 8), datetime.date(2026, 3, 10)),
+        ]
+        for patient, department, admit_date, release_date in histories:
+            history = PatientHistory.objects.create(patient=patient, assigned_doctor=result.doctors[0],
+                                                    department=department, release_date=release_date,
+                                                    symptomps='Cough')
+            # admit_date is auto_now_add.
+            PatientHistory.objects.filter(pk=history.pk).update(admit_date=admit_date)
+
+    def assertMatchesNaiveReport(self, start, end):
+        occupancy, length_of_stay, readmissions = naive_report(start, end)
+        self.assertEqual({department: {'peak': figures['peak'], 'mean': figures['mean']}
+                          for department, figures in analytics.report(analytics.OCCUPANCY, start, end).items()
+                          if figures['peak']}, occupancy)
+        self.assertEqual(analytics.report(analytics.LENGTH_OF_STAY, start, end), length_of_stay)
+        self.assertEqual({department: figures['readmissions']
+                          for department, figures in analytics.report(analytics.READMISSIONS, start, end).items()},
+                         readmissions)
+
+    def test_matches_the_naive_report(self):
+        self.assertMatchesNaiveReport(self.start, self.end)
+        self.assertMatchesNaiveReport(datetime.date(2026, 2, 1), datetime.date(2026, 3, 31))
+
+    def test_figures(self):
+        occupancy = analytics.report(analytics.OCCUPANCY, self.start, self.end)
+        self.assertEqual(occupancy['CL']['days'], [1, 2, 2, 2, 1, 1, 1, 1, 1, 1])
+        # Released on the first day, the stay no longer occupies a bed that day.
+        self.assertEqual(occupancy['EMC']['days'], [0] * 7 + [1, 1, 0])
+        self.assertEqual(analytics.report(analytics.LENGTH_OF_STAY, self.start, self.end), {
+            'CL': {'releases': 1, 'mean': 3.0, 'p50': 3.0, 'p90': 3.0, 'p99': 3.0},
+            'EMC': {'releases': 2, 'mean': 5.5, 'p50': 5.5, 'p90': 8.3, 'p99': 8.93},
+        })
+        self.assertEqual(analytics.report(analytics.READMISSIONS, self.start, self.end), {
+            'CL': {'releases': 1, 'readmissions': 1, 'rate': 1.0},
+            'EMC': {'releases': 2, 'readmissions': 1, 'rate': 0.5},
+        })
+        self.assertEqual(analytics.report(analytics.READMISSIONS, self.start, self.end, 'EMC'),
+                         {'EMC': {'releases': 2, 'readmissions': 1, 'rate': 0.5}})
+
+    def test_empty_range(self):
+        start, end = datetime.date(2025, 1, 1), datetime.date(2025, 1, 5)
+        for metric in analytics.METRICS:
+            self.assertEqual(analytics.report(metric, start, end), {})
+        self.assertMatchesNaiveReport(start, end)
 
-# Create your tests here.
+    def test_invalid_requests(self):
+        headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(AdminTokenObtainPairSerializer, self.admin))}
+        self.assertEqual(self.client.get('/api/admin/analytics/occupancy/', {'start': '2026-03-01',
+                                                                            'end': '2026-03-10'},
+                                         **headers).status_code, 200)
+        self.assertEqual(self.client.get('/api/admin/analytics/beds/', **headers).status_code, 404)
+        for params in ({'start': '2026-02-30'}, {'end': '2026-13-01'}, {'start': '2026-03-10', 'end': '2026-03-01'},
+                       {'start': '2025-01-01', 'end': '2026-01-02'}):
+            response = self.client.get('/api/admin/analytics/length-of-stay/', params, **headers)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('message', response.json())
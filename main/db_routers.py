@@ -0,0 +1,138 @@
+"""
+Read/write splitting between the `default` (primary) database and a replica.
+
+Set `DATABASE_REPLICA` to the alias of a second `DATABASES` entry that
+replicates the primary. `ReplicaMiddleware` lets the ORM read from it while
+it handles a safe-method (GET, HEAD, OPTIONS) request; everything else,
+including management commands and signal receivers outside requests, reads
+from the primary, and every write goes to the primary.
+
+Replicas lag behind. A client that sent an unsafe request is pinned to the
+primary for `REPLICA_PIN_SECONDS`, by a cookie and, for API clients that do
+not keep cookies, by its `Authorization` header, so it reads its own writes.
+Users whose cached responses are invalidated (see account.response_cache)
+are pinned as well, so that their next response is not cached from rows the
+replica does not have yet. A client that has just logged in has neither pin
+for its new credentials, so DRF tokens and sessions are always read from the
+primary.
+"""
+import hashlib
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = 'primary_pin'
+CLIENT_PIN_KEY = 'replica:pin:client:{}'
+USER_PIN_KEY = 'replica:pin:user:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Credentials created by a login and checked on the client's very next request.
+PRIMARY_MODELS = ('authtoken.token', 'sessions.session')
+
+_replica_allowed = ContextVar('replica_allowed', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'DATABASE_REPLICA', None)
+
+
+def _pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+@contextmanager
+def use_replica(allowed=True):
+    token = _replica_allowed.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+def use_primary(pinned=True):
+    """Reads from the primary inside the block, if `pinned`."""
+    return use_replica(False) if pinned else nullcontext()
+
+
+def pin_users(user_ids):
+    if replica_alias() is not None:
+        cache.set_many({USER_PIN_KEY.format(user_id): True for user_id in user_ids if user_id is not None},
+                       _pin_seconds())
+
+
+def user_pinned(user_id):
+    return replica_alias() is not None and cache.get(USER_PIN_KEY.format(user_id), False)
+
+
+async def auser_pinned(user_id):
+    return replica_alias() is not None and await cache.aget(USER_PIN_KEY.format(user_id), False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        # Reads inside a transaction must see its writes.
+        if (alias is None or not _replica_allowed.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+                or model._meta.label_lower in PRIMARY_MODELS):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        key = self.client_key(request)
+        pinned = replica_alias() is None or request.method not in SAFE_METHODS or (
+            PIN_COOKIE in request.COOKIES or (key is not None and cache.get(key, False)))
+        with use_replica(not pinned):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            self.pin(response, key)
+        return response
+
+    async def __acall__(self, request):
+        key = self.client_key(request)
+        pinned = replica_alias() is None or request.method not in SAFE_METHODS or (
+            PIN_COOKIE in request.COOKIES or (key is not None and await cache.aget(key, False)))
+        with use_replica(not pinned):
+            response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            self.pin(response, key)
+        return response
+
+    @staticmethod
+    def client_key(request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization:
+            return CLIENT_PIN_KEY.format(hashlib.md5(authorization.encode()).hexdigest())
+        return None
+
+    @staticmethod
+    def pin(response, key):
+        if replica_alias() is None:
+            return
+        seconds = _pin_seconds()
+        response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        if key is not None:
+            cache.set(key, True, seconds)
@@ -0,0 +1,205 @@
+"""
+Per-view request metrics in Prometheus text format.
+
+`MetricsMiddleware` times every request and, through
+`connection.execute_wrapper`, counts the database queries it runs and the
+time spent in them. Responses rendered by DRF (or any template response)
+also report their rendering time, i.e. the JSON serialization of the
+response body. Observations are kept in process-local histograms labelled
+with the URL route, which `metrics_view` exposes for Prometheus to scrape;
+with several workers every process reports its own series.
+
+A sample of requests (`METRICS_SLOW_REQUEST_SAMPLE_RATE`) also records the
+SQL it runs, and is logged with its queries to the `main.metrics` logger
+when it takes longer than `METRICS_SLOW_REQUEST_SECONDS`.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+MAX_TRACED_QUERIES = 200
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self):
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} histogram'.format(self.name)]
+        for label_values, counts, total, count in sorted(series):
+            labels = ','.join('{}="{}"'.format(label, _escape(value))
+                              for label, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append('{}_bucket{{{}{}le="{}"}} {}'.format(
+                    self.name, labels, ',' if labels else '', bound, cumulative))
+            lines.append('{}_sum{{{}}} {}'.format(self.name, labels, total))
+            lines.append('{}_count{{{}}} {}'.format(self.name, labels, count))
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_LATENCY = Histogram('hospital_request_duration_seconds', "Total time to handle a request.",
+                            ('view', 'method', 'status'), LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram('hospital_request_db_queries', "Database queries run per request.",
+                            ('view', 'method'), QUERY_BUCKETS)
+REQUEST_DB_TIME = Histogram('hospital_request_db_duration_seconds', "Time spent in database queries per request.",
+                            ('view', 'method'), LATENCY_BUCKETS)
+REQUEST_SERIALIZATION = Histogram('hospital_request_serialization_duration_seconds',
+                                  "Time spent rendering the response body.", ('view', 'method'), LATENCY_BUCKETS)
+HISTOGRAMS = (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, REQUEST_SERIALIZATION)
+
+
+def exposition():
+    return '\n'.join(histogram.exposition() for histogram in HISTOGRAMS) + '\n'
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+class RequestRecorder:
+    """`execute_wrapper` counting one request's queries and their time, and keeping their SQL if `trace`."""
+
+    def __init__(self, trace=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.trace = [] if trace else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if self.trace is not None and len(self.trace) < MAX_TRACED_QUERIES:
+                self.trace.append((elapsed, sql))
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    # The route keeps the label set small: 'api/doctor/<int:pk>/slots/' rather than one series per id.
+    return match.route if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder, started = self.start(request)
+        with ExitStack() as stack:
+            self.count_queries(stack, recorder)
+            response = self.get_response(request)
+        self.record(request, response, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        recorder, started = self.start(request)
+        # The async ORM runs its queries on the request's sync thread, which has its own connections.
+        stack = ExitStack()
+        await sync_to_async(self.count_queries)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, recorder, started)
+        return response
+
+    @staticmethod
+    def start(request):
+        sample_rate = getattr(settings, 'METRICS_SLOW_REQUEST_SAMPLE_RATE', 0)
+        recorder = RequestRecorder(trace=random.random() < sample_rate)
+        request._metrics = recorder
+        return recorder, time.perf_counter()
+
+    @staticmethod
+    def count_queries(stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    @staticmethod
+    def record(request, response, recorder, started):
+        elapsed = time.perf_counter() - started
+        view, method = _view_label(request), request.method
+        REQUEST_LATENCY.observe(elapsed, view, method, response.status_code)
+        REQUEST_QUERIES.observe(recorder.queries, view, method)
+        REQUEST_DB_TIME.observe(recorder.db_time, view, method)
+        REQUEST_SERIALIZATION.observe(recorder.serialization_time, view, method)
+
+        threshold = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', None)
+        if recorder.trace is not None and threshold is not None and elapsed >= threshold:
+            logger.warning(
+                "Slow request %s %s: %.1f ms, %d queries in %.1f ms, serialization %.1f ms\n%s",
+                method, request.get_full_path(), elapsed * 1000, recorder.queries, recorder.db_time * 1000,
+                recorder.serialization_time * 1000,
+                '\n'.join('  {:8.2f} ms  {}'.format(duration * 1000, sql) for duration, sql in recorder.trace))
+
+    def process_template_response(self, request, response):
+        # Called right before a DRF Response is rendered; the callback runs right after.
+        recorder = getattr(request, '_metrics', None)
+        if recorder is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                recorder.serialization_time += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, served to `METRICS_ALLOWED_IPS` only."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,152 @@
+"""
+Query-count regression tests for the API views.
+
+`QueryScalingTests` seeds a small hospital and one ten times larger (ten
+times the patients, each with ten times the histories) with
+`hospitalAdmin.seeding`, sends the same requests against both and fails if
+any request runs more queries on the larger one, i.e. if a view looks
+something up per row. Test cases mix it into a `TestCase`, list their
+requests in `requests()` and must request every route of their `urlconf`
+that is not listed in `exempt`.
+"""
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve
+
+from account.models import User
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from hospitalAdmin.api.serializers import AdminTokenObtainPairSerializer
+from hospitalAdmin.seeding import seed
+from patient.api.serializers import PatientTokenObtainPairSerializer
+from patient.models import Appointment, Patient
+
+
+class Request:
+    """
+    One API call, JSON unless `content_type` is None (multipart). `data` may be a callable
+    returning fresh data, for requests that create something.
+    """
+
+    def __init__(self, method, path, token=None, data=None, content_type='application/json'):
+        self.method = method
+        self.path = path
+        self.token = token
+        self.data = data
+        self.content_type = content_type
+
+    def send(self, client):
+        data = self.data() if callable(self.data) else self.data
+        headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(self.token)} if self.token else {}
+        if self.method == 'get':
+            response = client.get(self.path, data, **headers)
+        elif self.content_type is None:
+            # Multipart form, e.g. file uploads.
+            response = getattr(client, self.method)(self.path, data, **headers)
+        else:
+            response = getattr(client, self.method)(self.path, data, content_type=self.content_type, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+
+class Dataset:
+    """A seeded hospital and the accounts and rows requests are made about."""
+
+    def __init__(self, result, prefix):
+        self.result = result
+        self.admin = result.admin
+        self.doctor = result.doctors[0]
+        self.patient = Patient.objects.select_related('user').get(user__username='{}-patient-0'.format(prefix))
+        self.history = self.patient.patienthistory_set.order_by('-admit_date').first()
+        # Every third appointment, the second half of the doctors and of the other patients are waiting
+        # for approval.
+        appointments = list(Appointment.objects.order_by('pk').values_list('pk', flat=True))
+        Appointment.objects.filter(pk__in=appointments[::3]).update(status=False)
+        self.pending_appointment = Appointment.objects.get(pk=appointments[0])
+        self.appointment = Appointment.objects.get(pk=appointments[1])
+        pending_doctors = [doctor.user_id for doctor in result.doctors[len(result.doctors) // 2:]]
+        pending_patients = list(User.objects.filter(username__startswith='{}-patient-'.format(prefix))
+                                .exclude(pk=self.patient.user_id).order_by('username')
+                                .values_list('pk', flat=True)[result.patients // 2:])
+        User.objects.filter(pk__in=pending_doctors + pending_patients).update(status=False)
+        self.pending_doctor = User.objects.get(pk=pending_doctors[0])
+        self.pending_patient = User.objects.get(pk=pending_patients[0])
+
+    @staticmethod
+    def access(serializer, user):
+        return str(serializer.get_token(user).access_token)
+
+    @staticmethod
+    def refresh(serializer, user):
+        return str(serializer.get_token(user))
+
+    @property
+    def admin_token(self):
+        return self.access(AdminTokenObtainPairSerializer, self.admin)
+
+    @property
+    def doctor_token(self):
+        return self.access(DoctorTokenObtainPairSerializer, self.doctor.user)
+
+    @property
+    def patient_token(self):
+        return self.access(PatientTokenObtainPairSerializer, self.patient.user)
+
+
+class QueryScalingTests:
+    urlconf = None
+    prefix = ''
+    exempt = {}
+    patients = 4
+    histories_per_patient = 2
+
+    def setUp(self):
+        super().setUp()
+        # Seeded accounts and logins hash the password; the default hasher is slow on purpose. Cached
+        # responses would hide the queries of the views themselves, a zero timeout stores none.
+        test_settings = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                                          RESPONSE_CACHE_TIMEOUT=0)
+        test_settings.enable()
+        self.addCleanup(test_settings.disable)
+
+    def requests(self, data):
+        """`{name: Request}` to send as the users of `data`, a `Dataset`."""
+        raise NotImplementedError
+
+    def seed(self, scale):
+        prefix = 'x{}'.format(scale)
+        result = seed(patients=self.patients * scale, doctors=self.patients * scale // 2,
+                      histories_per_patient=self.histories_per_patient * scale, prefix=prefix)
+        return Dataset(result, prefix)
+
+    def query_counts(self, scale):
+        """Seeds a hospital `scale` times the base size, sends every request twice and counts the second."""
+        counts = {}
+        with transaction.atomic():
+            data = self.seed(scale)
+            for name, request in self.requests(data).items():
+                # The first request fills the caches (roles, approval queues, department availability).
+                request.send(self.client)
+                with CaptureQueriesContext(connection) as queries:
+                    response = request.send(self.client)
+                self.assertLess(response.status_code, 400,
+                                "{}: {}".format(name, getattr(response, 'content', b'')[:500]))
+                counts[name] = [query['sql'] for query in queries]
+            transaction.set_rollback(True)
+        return counts
+
+    def test_every_route_is_requested(self):
+        with transaction.atomic():
+            requested = {resolve(request.path).route for request in self.requests(self.seed(1)).values()}
+            transaction.set_rollback(True)
+        routes = {self.prefix + str(pattern.pattern) for pattern in self.urlconf.urlpatterns
+                  if isinstance(pattern, URLPattern)}
+        self.assertEqual(routes - requested - set(self.exempt), set(), "Routes without a query-count check")
+
+    def test_query_count_does_not_grow_with_data(self):
+        small, large = self.query_counts(1), self.query_counts(10)
+        for name, queries in small.items():
+            with self.subTest(name):
+                self.assertEqual(len(large[name]), len(queries), "{} queries with 10x the data:\n{}".format(
+                    name, '\n'.join(large[name])))
@@ -52,6 +52,9 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        # `Bearer <jwt>` from the */token/ endpoints: roles and status are read from the token claims,
+        # so neither authentication nor the role permissions touch the database.
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
@@ -86,6 +89,9 @@ SIMPLE_JWT = {
 
 
 MIDDLEWARE = [
+    # First, so that its timings and query counts cover the whole stack.
+    'main.metrics.MetricsMiddleware',
+    'main.db_routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -135,11 +141,55 @@ WSGI_APPLICATION = 'main.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 with WAL, tuned PRAGMAs and serialized write transactions (see
+        # main/sqlite_backend/base.py). `timeout` is how many seconds a write waits for the database.
+        'ENGINE': 'main.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'timeout': 20,
+        },
+    },
+    # A read replica of `default`, used when DATABASE_REPLICA names it. For a local try-out, copy db.sqlite3.
+    # 'replica': {
+    #     'ENGINE': 'main.sqlite_backend',
+    #     'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+}
+
+# Safe-method requests read from DATABASE_REPLICA, if set; a client that writes reads from the primary for the next
+# REPLICA_PIN_SECONDS (see main.db_routers).
+DATABASE_ROUTERS = ['main.db_routers.ReplicaRouter']
+DATABASE_REPLICA = None
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# Process-local by default; point this at a shared backend (memcached/redis) when running several workers
+# so that cached role lookups are invalidated everywhere at once.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Seconds a user's group names are cached for permission checks (see account.roles).
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+# Seconds the approval queue counts are cached for between signal updates (see hospitalAdmin.approval_queue).
+APPROVAL_QUEUE_CACHE_TIMEOUT = 5 * 60
+
+# Seconds polled patient/doctor responses and their ETags are cached for (see account.response_cache).
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+
+
+# Request metrics (see main.metrics): addresses allowed to scrape /metrics/, and the share of requests whose SQL is
+# recorded so that they can be logged if they take longer than METRICS_SLOW_REQUEST_SECONDS.
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+METRICS_SLOW_REQUEST_SECONDS = 0.5
+METRICS_SLOW_REQUEST_SAMPLE_RATE = 0.1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -160,6 +210,11 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Worker processes used to hash passwords by `manage.py import_patients` (see account.hashing).
+# None means one per CPU core, 1 hashes serially.
+PASSWORD_HASHING_WORKERS = None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
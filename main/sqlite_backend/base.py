@@ -0,0 +1,97 @@
+"""
+SQLite backend for production: `django.db.backends.sqlite3` tuned for many readers and a few writers.
+
+Every new connection switches the database to write-ahead logging, so that
+readers never wait for the writer and the writer never waits for readers,
+and applies `PRAGMAS` (merged with `SQLITE_PRAGMAS`), with a busy timeout
+equal to the `timeout` option (5 seconds by default).
+
+SQLite allows one writer at a time. A transaction started with a plain
+`BEGIN` that has read and then tries to write fails at once with "database
+is locked" if another one wrote meanwhile, whatever the busy timeout; this is
+what concurrent bookings ran into (`reserve_slot()` reads, then the
+appointment is inserted). Transactions here start with `BEGIN IMMEDIATE`,
+which takes the write lock up front, and first queue on a lock shared by the
+threads of the process, so that they take turns in order instead of polling
+SQLite's busy handler. Writes outside `transaction.atomic()` are single
+statements and only wait for the busy timeout. Keep read-only work out of
+`atomic()` blocks, which are now serialized.
+"""
+import threading
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable once checkpointed; with WAL a power loss can lose the last commits but not corrupt the database.
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    # Negative: in KiB, per connection.
+    'cache_size': -20000,
+}
+
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+
+def write_lock(name):
+    """The lock write transactions on database file `name` queue on in this process."""
+    with _write_locks_lock:
+        return _write_locks.setdefault(name, threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    holds_write_lock = False
+    busy_timeout = 5
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.busy_timeout = params.get('timeout', 5)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {}),
+                   'busy_timeout': int(self.busy_timeout * 1000)}
+        for name, value in pragmas.items():
+            connection.execute('PRAGMA {} = {}'.format(name, value))
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        lock = write_lock(self.settings_dict['NAME'])
+        if not lock.acquire(timeout=self.busy_timeout):
+            raise OperationalError("database is locked: no write transaction finished within {} seconds".format(
+                self.busy_timeout))
+        self.holds_write_lock = True
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except BaseException:
+            self.release_write_lock()
+            raise
+
+    def release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            write_lock(self.settings_dict['NAME']).release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self.release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self.release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self.release_write_lock()
@@ -0,0 +1,136 @@
+import os
+import re
+import sqlite3
+import tempfile
+
+from django.db import OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from hospitalAdmin.api.serializers import AdminTokenObtainPairSerializer
+from hospitalAdmin.seeding import seed
+from main import metrics
+from main.sqlite_backend.base import DatabaseWrapper, write_lock
+from main.query_counts import Dataset
+
+
+class MetricsTests(TestCase):
+    route = 'api/admin/approve/doctor/<uuid:pk>/'
+
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=0, doctors=1, histories_per_patient=0)
+        cls.admin = result.admin
+        cls.doctor = result.doctors[0]
+
+    def setUp(self):
+        metrics.reset()
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(AdminTokenObtainPairSerializer, self.admin))}
+
+    def get_doctor(self):
+        return self.client.get('/api/admin/approve/doctor/{}/'.format(self.doctor.user_id), **self.headers)
+
+    def series(self, output, name):
+        """`{le: count}` of the buckets of `name` for the GET requests to `route`, plus its `_count`."""
+        labels = 'view="{}",method="GET"'.format(self.route)
+        buckets = {le: int(value) for le, value in re.findall(
+            r'^{}_bucket\{{{}(?:,status="200")?,le="([^"]+)"\}} (\d+)$'.format(name, re.escape(labels)), output,
+            re.MULTILINE)}
+        count = re.search(r'^{}_count\{{{}(?:,status="200")?\}} (\d+)$'.format(name, re.escape(labels)), output,
+                          re.MULTILINE)
+        return buckets, int(count.group(1))
+
+    @override_settings(METRICS_SLOW_REQUEST_SAMPLE_RATE=0)
+    def test_exposition(self):
+        queries = []
+        # Not CaptureQueriesContext: the request_started signal empties its log.
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            self.assertEqual(self.get_doctor().status_code, 200)
+        self.assertTrue(queries)
+        self.assertEqual(self.get_doctor().status_code, 200)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        output = response.content.decode()
+
+        buckets, count = self.series(output, 'hospital_request_db_queries')
+        self.assertEqual(count, 2)
+        self.assertIn('hospital_request_db_queries_sum{{view="{}",method="GET"}} {}'.format(
+            self.route, 2 * len(queries)), output)
+        # Cumulative: every bucket at or above the query count holds both requests, the ones below none.
+        self.assertEqual(list(buckets), [str(bound) for bound in metrics.QUERY_BUCKETS] + ['+Inf'])
+        self.assertEqual(buckets, {le: 2 if le == '+Inf' or len(queries) <= int(le) else 0 for le in buckets})
+
+        buckets, count = self.series(output, 'hospital_request_duration_seconds')
+        self.assertEqual(count, 2)
+        self.assertEqual(buckets['+Inf'], 2)
+        self.assertEqual(list(buckets.values()), sorted(buckets.values()))
+
+    def test_forbidden_address(self):
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='10.1.2.3').status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0, METRICS_SLOW_REQUEST_SAMPLE_RATE=1)
+    def test_slow_requests_log_their_sql(self):
+        with self.assertLogs('main.metrics', 'WARNING') as logs:
+            self.get_doctor()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Slow request GET /api/admin/approve/doctor/', logs.output[0])
+        self.assertIn('FROM "account_user"', logs.output[0])
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0, METRICS_SLOW_REQUEST_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_logged(self):
+        with self.assertNoLogs('main.metrics', 'WARNING'):
+            self.get_doctor()
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    alias = 'sqlite_backend_test'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, 'test.sqlite3')
+        connections[self.alias] = DatabaseWrapper(
+            dict(connection.settings_dict, ENGINE='main.sqlite_backend', NAME=self.name, OPTIONS={'timeout': 0.2}),
+            self.alias)
+        self.addCleanup(connections.__delitem__, self.alias)
+        self.addCleanup(connections[self.alias].close)
+        self.execute('CREATE TABLE booking (slot integer)')
+
+    def execute(self, sql):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def test_pragmas(self):
+        self.assertEqual(self.execute('PRAGMA journal_mode'), [('wal',)])
+        self.assertEqual(self.execute('PRAGMA busy_timeout'), [(200,)])
+        self.assertEqual(self.execute('PRAGMA synchronous'), [(1,)])
+
+    def test_write_lock_is_released_after_commit(self):
+        with transaction.atomic(using=self.alias):
+            self.assertTrue(write_lock(self.name).locked())
+            self.execute('INSERT INTO booking VALUES (1)')
+        self.assertFalse(write_lock(self.name).locked())
+        self.assertEqual(self.execute('SELECT slot FROM booking'), [(1,)])
+
+    def test_write_lock_is_released_after_rollback(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic(using=self.alias):
+                self.execute('INSERT INTO booking VALUES (1)')
+                raise ValueError
+        self.assertFalse(write_lock(self.name).locked())
+        self.assertEqual(self.execute('SELECT slot FROM booking'), [])
+
+    def test_write_lock_is_released_when_begin_fails(self):
+        # Another process holds SQLite's write lock for longer than the busy timeout.
+        other = sqlite3.connect(self.name, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(using=self.alias):
+                pass
+        self.assertFalse(write_lock(self.name).locked())
+        other.execute('ROLLBACK')
+        with transaction.atomic(using=self.alias):
+            self.execute('INSERT INTO booking VALUES (1)')
+        self.assertFalse(write_lock(self.name).locked())
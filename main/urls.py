@@ -15,6 +15,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .metrics import metrics_view
 from .yasg import urlpatterns as doc_urls
 
 
@@ -23,6 +24,7 @@ urlpatterns = [
     path('api/doctor/', include('doctor.api.urls')),
     path('api/Patient/', include('patient.api.urls')),
     path('api/admin/', include('hospitalAdmin.api.urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 urlpatterns += doc_urls
@@ -0,0 +1,56 @@
+"""
+Async variants of the patient read endpoints, for ASGI deployments (see account.async_views).
+
+The patient row is never looked up on its own: the queries filter on the
+user id from the token instead. Django's async ORM runs every query of a
+request in the same thread, one after the other, so a view's queries are
+awaited in turn.
+"""
+from django.db.models import Subquery
+
+from account.async_views import RoleAsyncView, json_response
+from account.response_cache import cached_response
+from account.roles import PATIENT
+
+from patient.models import Patient, PatientHistory, Appointment
+
+from .serializers import (PatientRegistrationSerializer,
+                          PatientProfileSerializer,
+                          PatientHistorySerializer,
+                          AppointmentSerializerPatient)
+
+
+class AsyncPatientProfileView(RoleAsyncView):
+    role = PATIENT
+
+    @cached_response
+    async def get(self, request):
+        profile = await Patient.objects.select_related('user').aget(user_id=request.user.pk)
+        return json_response({
+            'user_data': PatientRegistrationSerializer(profile.user).data,
+            'profile_data': PatientProfileSerializer(profile).data
+        })
+
+
+class AsyncPatientHistoryView(RoleAsyncView):
+    role = PATIENT
+
+    @cached_response
+    async def get(self, request):
+        histories = PatientHistory.objects.filter(patient__user_id=request.user.pk).select_related(
+            'assigned_doctor__user', 'costs').prefetch_related('patient_appointments')
+        return json_response(PatientHistorySerializer(await _list(histories), many=True).data)
+
+
+class AsyncAppointmentViewPatient(RoleAsyncView):
+    role = PATIENT
+
+    async def get(self, request):
+        latest_history = PatientHistory.objects.filter(patient__user_id=request.user.pk).order_by(
+            '-admit_date').values('pk')[:1]
+        appointments = Appointment.objects.filter(status=True, patient_history=Subquery(latest_history))
+        return json_response(AppointmentSerializerPatient(await _list(appointments), many=True).data)
+
+
+async def _list(queryset):
+    return [row async for row in queryset]
@@ -0,0 +1,62 @@
+from django.utils.dateparse import parse_date
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from patient import search
+from patient.models import PatientHistory
+
+from .serializers import HistorySearchResultSerializer
+
+
+class HistorySearchView(APIView):
+    """
+    Patient histories whose symptoms contain every word of `q`, best match first (see patient.search);
+    matches older than the ranked window follow, newest first, with a null `rank`.
+
+    query params: q, department=<code>, start=YYYY-MM-DD, end=YYYY-MM-DD (admit date, inclusive),
+    limit (default 20, at most 100), offset. `next_offset` is the offset of the next page, if any.
+    Subclasses set the permissions and may restrict the histories to one doctor's.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def get_doctor(self, request):
+        """The id of the doctor whose histories `request` may search, or None for all of them."""
+        return None
+
+    def get(self, request):
+        params = request.query_params
+        if not search.terms(params.get('q', '')):
+            return Response({'message': "`q` must contain at least one word"}, status=status.HTTP_400_BAD_REQUEST)
+        department = params.get('department') or None
+        if department is not None and department not in dict(PatientHistory.department_choices):
+            return Response({'message': "department must be one of: {}".format(
+                ', '.join(dict(PatientHistory.department_choices)))}, status=status.HTTP_400_BAD_REQUEST)
+        dates = {}
+        for param in ('start', 'end'):
+            value = params.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                dates[param] = None
+            if value and dates[param] is None:
+                return Response({'message': "`{}` must be a date formatted as YYYY-MM-DD".format(param)},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(params.get('limit', self.default_limit))
+            offset = int(params.get('offset', 0))
+        except ValueError:
+            limit = offset = -1
+        if not 0 < limit <= self.max_limit or offset < 0:
+            return Response({'message': "limit must be between 1 and {} and offset at least 0".format(
+                self.max_limit)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One more than asked for tells whether there is a next page.
+        histories = search.search(params['q'], department, dates['start'], dates['end'], self.get_doctor(request),
+                                  limit + 1, offset)
+        return Response({
+            'next_offset': offset + limit if len(histories) > limit else None,
+            'results': HistorySearchResultSerializer(histories[:limit], many=True).data,
+        }, status=status.HTTP_200_OK)
@@ -1,12 +1,18 @@
+from django.db import transaction
+
 from rest_framework import serializers
 
+from account.roles import PATIENT
+from account.tokens import RoleTokenObtainPairSerializer, RoleTokenRefreshSerializer
+
 from account.models import User
 
-from patient.models import Patient, Appointment
+from patient.models import Patient, PatientHistory, Appointment
 
 from django.contrib.auth.models import Group
 
 from doctor.models import Doctor
+from doctor.scheduling import SlotUnavailable, reserve_slot
 
 
 class PatientRegistrationSerializer(serializers.Serializer):
@@ -93,13 +99,19 @@ class AppointmentSerializerPatient(serializers.Serializer):
     doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all(), required=False)
 
     def create(self, validated_data):
-        new_appointment = Appointment.objects.create(
-            appointment_date=validated_data['appointment_date'],
-            appointment_time=validated_data['appointment_time'],
-            status=False,
-            patient_history=validated_data['patient_history'],
-            doctor=validated_data['doctor']
-        )
+        with transaction.atomic():
+            try:
+                reserve_slot(validated_data['doctor'], validated_data['appointment_date'],
+                             validated_data['appointment_time'])
+            except SlotUnavailable as error:
+                raise serializers.ValidationError({'appointment_time': str(error)})
+            new_appointment = Appointment.objects.create(
+                appointment_date=validated_data['appointment_date'],
+                appointment_time=validated_data['appointment_time'],
+                status=False,
+                patient_history=validated_data['patient_history'],
+                doctor=validated_data['doctor']
+            )
         return new_appointment
 
 
@@ -123,3 +135,58 @@ class PatientHistorySerializer(serializers.Serializer):
     assigned_doctor = serializers.StringRelatedField(label='Assigned Doctor:')
     patient_appointments = AppointmentSerializerPatient(label="Appointments", many=True)
     costs = PatientCostSerializer()
+
+
+class HistorySearchResultSerializer(serializers.Serializer):
+    """Expects histories from `patient.search.search()`, which joins their patient and doctor and adds a rank."""
+    id = serializers.IntegerField(read_only=True)
+    patient = serializers.CharField(label="Patient:", source='patient.user_id', read_only=True)
+    patient_name = serializers.CharField(label="Patient Name:", source='patient.get_name', read_only=True)
+    admit_date = serializers.DateField(label="Admit Date:", read_only=True)
+    release_date = serializers.DateField(label="Release Date:", read_only=True)
+    department = serializers.CharField(label='Department: ', read_only=True)
+    assigned_doctor = serializers.StringRelatedField(label='Assigned Doctor:')
+    symptomps = serializers.CharField(label="Symptomps:", read_only=True)
+    rank = serializers.FloatField(label="Rank:", read_only=True, allow_null=True)
+
+
+class PatientImportSerializer(PatientProfileSerializer):
+    username = serializers.CharField(label='Username:', max_length=150)
+    first_name = serializers.CharField(label='First name:', max_length=150)
+    last_name = serializers.CharField(label='Last name:', max_length=150, required=False)
+    password = serializers.CharField(label='Password:', min_length=8, required=False)
+
+    def validate_password(self, password):
+        if password.isdigit():
+            raise serializers.ValidationError('Your password should contain letters!')
+        return password
+
+
+class PatientHistoryImportSerializer(serializers.Serializer):
+    patient = serializers.CharField(label="Patient username:")
+    doctor = serializers.CharField(label="Assigned doctor username:")
+    admit_date = serializers.DateField(label="Admit Date:")
+    release_date = serializers.DateField(label="Release Date:", required=False)
+    department = serializers.ChoiceField(label='Department: ', choices=PatientHistory.department_choices)
+    symptomps = serializers.CharField(label="Symptomps:")
+    room_charge = serializers.IntegerField(label="Room Charge:", min_value=0, required=False)
+    medicine_cost = serializers.IntegerField(label="Medicine Cost:", min_value=0, required=False)
+    doctor_fee = serializers.IntegerField(label="Doctor Fee:", min_value=0, required=False)
+    other_charge = serializers.IntegerField(label="Other Charge:", min_value=0, required=False)
+
+    cost_fields = ('room_charge', 'medicine_cost', 'doctor_fee', 'other_charge')
+
+    def validate(self, data):
+        given = [field for field in self.cost_fields if field in data]
+        if given and len(given) != len(self.cost_fields):
+            raise serializers.ValidationError('Either all of {} or none of them must be given'.format(
+                ', '.join(self.cost_fields)))
+        return data
+
+
+class PatientTokenObtainPairSerializer(RoleTokenObtainPairSerializer):
+    role = PATIENT
+
+
+class PatientTokenRefreshSerializer(RoleTokenRefreshSerializer):
+    role = PATIENT
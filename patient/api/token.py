@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView,
+    TokenRefreshView,
+)
+
+from .serializers import PatientTokenObtainPairSerializer, PatientTokenRefreshSerializer
+
+
+class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = PatientTokenObtainPairSerializer
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = PatientTokenRefreshSerializer
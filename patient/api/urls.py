@@ -4,6 +4,8 @@ from .views import (RegistrationView,
                     PatientHistoryView,
                     AppointmentViewPatient)
 from django.urls import path
+from .async_views import AsyncPatientProfileView, AsyncPatientHistoryView, AsyncAppointmentViewPatient
+from .token import CustomTokenObtainPairView, CustomTokenRefreshView
 
 
 app_name = 'Patient'
@@ -13,5 +15,10 @@ urlpatterns = [
     path('profile/', PatientProfileView.as_view(), name='api_patient_profile'),
     path('history/', PatientHistoryView.as_view(), name='api_patient_history'),
     path('appointment/', AppointmentViewPatient.as_view(), name='api_patient_appointment'),
+    path('async/profile/', AsyncPatientProfileView.as_view(), name='api_patient_profile_async'),
+    path('async/history/', AsyncPatientHistoryView.as_view(), name='api_patient_history_async'),
+    path('async/appointment/', AsyncAppointmentViewPatient.as_view(), name='api_patient_appointment_async'),
+    path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
 
 ]
\ No newline at end of file
@@ -10,12 +10,15 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import BasePermission
 
+from account.response_cache import cached_response
+from account.roles import PATIENT, has_role
+
 from patient.models import Patient, Appointment, PatientHistory
 
 
 class IsPatient(BasePermission):
     def has_permission(self, request, view):
-        return bool(request.user and request.user.groups.filter(name='Patient').exists())
+        return has_role(request.user, PATIENT)
 
 
 class CustomAuthToken(ObtainAuthToken):
@@ -24,7 +27,7 @@ class CustomAuthToken(ObtainAuthToken):
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        account_approval = user.groups.filter(name='Patient').exists()
+        account_approval = has_role(user, PATIENT)
         if not user.status:
             return Response(
                 {
@@ -58,7 +61,7 @@ class RegistrationView(APIView):
         checkprofile = profile_serializer.is_valid()
         if checkregistration and checkprofile:
             patient = registration_serializer.save()
-            profile_serializer.save(user=Patient)
+            profile_serializer.save(user=patient)
             return Response({
                 'user_data': registration_serializer.data,
                 'profile_data': profile_serializer.data
@@ -73,10 +76,11 @@ class RegistrationView(APIView):
 class PatientProfileView(APIView):
     permission_classes = [IsPatient]
 
+    @cached_response
     def get(self, request):
         user = request.user
-        profile = Patient.objects.filter(user=user).get()
-        user_serializer = PatientRegistrationSerializer(user)
+        profile = Patient.objects.select_related('user').filter(user_id=user.pk).get()
+        user_serializer = PatientRegistrationSerializer(profile.user)
         profile_serializer = PatientProfileSerializer(profile)
         return Response({
             'user_data': user_serializer.data,
@@ -86,7 +90,7 @@ class PatientProfileView(APIView):
 
     def put(self, request):
         user = request.user
-        profile = Patient.objects.filter(user=user).get()
+        profile = Patient.objects.filter(user_id=user.pk).get()
         profile_serializer = PatientProfileSerializer(
             instance=profile, data=request.data.get('profile_data'), partial=True)
         if profile_serializer.is_valid():
@@ -102,10 +106,12 @@ class PatientProfileView(APIView):
 class PatientHistoryView(APIView):
     permission_classes = [IsPatient]
 
+    @cached_response
     def get(self, request):
         user = request.user
-        user_patient = Patient.objects.filter(user=user).get()
-        history = PatientHistory.objects.filter(patient=user_patient)
+        user_patient = Patient.objects.filter(user_id=user.pk).get()
+        history = PatientHistory.objects.filter(patient=user_patient).select_related(
+            'assigned_doctor__user', 'costs').prefetch_related('patient_appointments')
         history_serializer = PatientHistorySerializer(history, many=True)
         return Response(history_serializer.data, status=status.HTTP_200_OK)
 
@@ -115,7 +121,7 @@ class AppointmentViewPatient(APIView):
 
     def get(self, request):
         user = request.user
-        user_patient = Patient.objects.filter(user=user).get()
+        user_patient = Patient.objects.filter(user_id=user.pk).get()
         history = PatientHistory.objects.filter(patient=user_patient).latest('admit_date')
         appointment = Appointment.objects.filter(status=True, patient_history=history)
         history_serializer = AppointmentSerializerPatient(appointment, many=True)
@@ -123,7 +129,7 @@ class AppointmentViewPatient(APIView):
     
     def post(self, request):
         user = request.user
-        user_patient = Patient.objects.filter(user=user).get()
+        user_patient = Patient.objects.filter(user_id=user.pk).get()
         history = PatientHistory.objects.filter(patient=user_patient).latest('admit_date')
         serializer = AppointmentSerializerPatient(
             data=request.data)
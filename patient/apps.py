@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PatientConfig(AppConfig):
     name = 'patient'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,55 @@
+"""
+Revenue reports over PatientCost.
+
+Every figure is computed by the database: `PatientCost.total` is a stored
+generated column, so a report is a single `SUM(total) ... GROUP BY` over the
+costs of the histories admitted in the requested range.
+"""
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from patient.models import PatientCost
+
+
+DEPARTMENT = 'department'
+DOCTOR = 'doctor'
+DAY = 'day'
+MONTH = 'month'
+GROUPINGS = (DEPARTMENT, DOCTOR, DAY, MONTH)
+
+
+def costs_in_range(start=None, end=None):
+    """Costs of the histories admitted between `start` and `end` (inclusive, either may be None)."""
+    costs = PatientCost.objects.all()
+    if start:
+        costs = costs.filter(patient_details__admit_date__gte=start)
+    if end:
+        costs = costs.filter(patient_details__admit_date__lte=end)
+    return costs
+
+
+def total_revenue(start=None, end=None):
+    """`{'revenue': ..., 'bills': ...}` over the range."""
+    totals = costs_in_range(start, end).aggregate(revenue=Sum('total'), bills=Count('id'))
+    return {'revenue': totals['revenue'] or 0, 'bills': totals['bills']}
+
+
+def revenue_by(grouping, start=None, end=None):
+    """
+    Revenue and number of bills per department, doctor, day or month, in
+    key order. Rows are dicts with the grouping key plus `revenue` and `bills`.
+    """
+    costs = costs_in_range(start, end)
+    if grouping == DEPARTMENT:
+        keys = {DEPARTMENT: F('patient_details__department')}
+    elif grouping == DOCTOR:
+        keys = {DOCTOR: F('patient_details__assigned_doctor'),
+                'first_name': F('patient_details__assigned_doctor__user__first_name'),
+                'last_name': F('patient_details__assigned_doctor__user__last_name')}
+    elif grouping == DAY:
+        keys = {DAY: F('patient_details__admit_date')}
+    elif grouping == MONTH:
+        keys = {MONTH: TruncMonth('patient_details__admit_date')}
+    else:
+        raise ValueError("Unknown grouping {!r}, expected one of {}".format(grouping, ', '.join(GROUPINGS)))
+    return costs.values(**keys).annotate(revenue=Sum('total'), bills=Count('id')).order_by(grouping)
@@ -0,0 +1,93 @@
+"""
+Streaming export of patient histories joined with their costs.
+
+Rows come from a single `select_related` query consumed with
+`.iterator(chunk_size=...)`, so neither the CSV stream nor the XLSX writer
+(openpyxl write-only mode, spooled to a temporary file) ever hold more than
+one chunk of histories in memory. An XLSX sheet holds at most
+`XLSX_SHEET_ROWS` rows, so larger exports continue on further sheets.
+"""
+import csv
+import tempfile
+
+from patient.models import PatientHistory
+
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'xlsx')
+# Excel's limit of 1,048,576 rows per sheet, less the header row.
+XLSX_SHEET_ROWS = 1048576 - 1
+
+COLUMNS = ('history_id', 'patient_username', 'patient_name', 'doctor_username', 'doctor_name', 'department',
+           'admit_date', 'release_date', 'symptomps', 'room_charge', 'medicine_cost', 'doctor_fee',
+           'other_charge', 'total_cost')
+
+
+def export_queryset(start=None, end=None, department=None):
+    histories = PatientHistory.objects.select_related(
+        'patient__user', 'assigned_doctor__user', 'costs').order_by('pk')
+    if start:
+        histories = histories.filter(admit_date__gte=start)
+    if end:
+        histories = histories.filter(admit_date__lte=end)
+    if department:
+        histories = histories.filter(department=department)
+    return histories
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    for history in queryset.iterator(chunk_size=chunk_size):
+        patient = history.patient.user
+        doctor = history.assigned_doctor.user
+        try:
+            cost = history.costs
+        except PatientHistory.costs.RelatedObjectDoesNotExist:
+            charges = (None, None, None, None, None)
+        else:
+            charges = (cost.room_charge, cost.medicine_cost, cost.doctor_fee, cost.other_charge, cost.total)
+        yield (history.pk, patient.username, patient.first_name + " " + patient.last_name, doctor.username,
+               doctor.first_name + " " + doctor.last_name, history.department, history.admit_date,
+               history.release_date, history.symptomps) + charges
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(rows, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+
+
+def write_xlsx(rows, fileobj, sheet_rows=XLSX_SHEET_ROWS):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    for number, row in enumerate(rows):
+        if number % sheet_rows == 0:
+            sheet = workbook.create_sheet('histories' if not number else 'histories {}'.format(
+                number // sheet_rows + 1))
+            sheet.append(COLUMNS)
+        sheet.append(row)
+    if sheet is None:
+        workbook.create_sheet('histories').append(COLUMNS)
+    workbook.save(fileobj)
+
+
+def xlsx_file(rows):
+    """Writes the rows to a temporary XLSX file and returns it rewound, ready to be streamed."""
+    fileobj = tempfile.TemporaryFile()
+    write_xlsx(rows, fileobj)
+    fileobj.seek(0)
+    return fileobj
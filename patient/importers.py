@@ -0,0 +1,230 @@
+"""
+Chunked CSV/XLSX import of patients and their histories (with costs).
+
+Files are read a chunk at a time (pandas for CSV, openpyxl's read-only mode
+for XLSX), every row is validated with the patient serializers and each
+chunk is written with `bulk_create` in its own transaction, so memory use
+does not grow with the size of the file. Invalid rows are skipped and
+reported by their 1-based data row number.
+
+Patients file columns:  username, first_name, last_name, password, age, address, mobile
+Histories file columns: patient, doctor, admit_date, release_date, department, symptomps,
+                        room_charge, medicine_cost, doctor_fee, other_charge
+where `patient`/`doctor` are usernames and `password`, `last_name`, `release_date`
+and the four cost columns are optional.
+"""
+import datetime
+import os
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from account import response_cache
+from account.hashing import hash_passwords
+from account.models import User
+from account.roles import PATIENT
+from doctor.models import Doctor
+from patient import search
+from patient.signals import histories_imported
+from patient.api.serializers import PatientImportSerializer, PatientHistoryImportSerializer
+from patient.models import Patient, PatientHistory, PatientCost
+
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ('csv', 'xlsx')
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    if extension not in FORMATS:
+        raise ValueError("Unsupported file type `{}`, expected one of: {}".format(extension, ', '.join(FORMATS)))
+    return extension
+
+
+def _clean(value):
+    """Normalises a cell so the serializers see what a JSON client would send."""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _row(header, values):
+    return {column: cell for column, cell in zip(header, map(_clean, values)) if column and cell is not None}
+
+
+def read_csv_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    import pandas as pd
+
+    reader = pd.read_csv(fileobj, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    for frame in reader:
+        header = [str(column).strip() for column in frame.columns]
+        yield [_row(header, values) for values in frame.itertuples(index=False, name=None)]
+
+
+def read_xlsx_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(column).strip() if column is not None else None for column in next(rows, ())]
+        chunk = []
+        for values in rows:
+            chunk.append(_row(header, values))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def read_chunks(fileobj, file_format, chunk_size=CHUNK_SIZE):
+    if file_format == 'csv':
+        return read_csv_chunks(fileobj, chunk_size)
+    return read_xlsx_chunks(fileobj, chunk_size)
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+
+def _validate(serializer_class, rows, first_row, result):
+    valid = []
+    for offset, row in enumerate(rows):
+        serializer = serializer_class(data=row)
+        if serializer.is_valid():
+            valid.append((first_row + offset, serializer.validated_data))
+        else:
+            result.add_error(first_row + offset, serializer.errors)
+    return valid
+
+
+def import_patients_chunk(rows, first_row, result, hash_workers=1):
+    valid = _validate(PatientImportSerializer, rows, first_row, result)
+
+    usernames = {data['username'].lower() for row, data in valid}
+    taken = set(User.objects.annotate(username_lower=Lower('username'))
+                .filter(username_lower__in=usernames).values_list('username_lower', flat=True))
+    accounts = []
+    for row, data in valid:
+        username = data['username'].lower()
+        if username in taken:
+            result.add_error(row, {'username': ['This username already exists']})
+            continue
+        taken.add(username)
+        accounts.append(data)
+    if not accounts:
+        return
+
+    with_password = [data for data in accounts if 'password' in data]
+    hashed = hash_passwords([data['password'] for data in with_password], workers=hash_workers)
+    for data, password in zip(with_password, hashed):
+        data['hashed_password'] = password
+    users = [User(username=data['username'],
+                  first_name=data['first_name'],
+                  last_name=data.get('last_name', ''),
+                  password=data.get('hashed_password') or make_password(None),
+                  status=True)
+             for data in accounts]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        Patient.objects.bulk_create([
+            Patient(user=user, age=data['age'], address=data['address'], mobile=data['mobile'])
+            for user, data in zip(users, accounts)
+        ])
+        group, created = Group.objects.get_or_create(name=PATIENT)
+        membership = User.groups.through
+        membership.objects.bulk_create([membership(user_id=user.pk, group_id=group.pk) for user in users])
+    result.created += len(users)
+
+
+def import_histories_chunk(rows, first_row, result, **options):
+    valid = _validate(PatientHistoryImportSerializer, rows, first_row, result)
+
+    patients = dict(Patient.objects.filter(user__username__in={data['patient'] for row, data in valid})
+                    .values_list('user__username', 'id'))
+    doctors = dict(Doctor.objects.filter(user__username__in={data['doctor'] for row, data in valid})
+                   .values_list('user__username', 'id'))
+    histories = []
+    costs = []
+    for row, data in valid:
+        errors = {}
+        if data['patient'] not in patients:
+            errors['patient'] = ['No patient with username `{}`'.format(data['patient'])]
+        if data['doctor'] not in doctors:
+            errors['doctor'] = ['No doctor with username `{}`'.format(data['doctor'])]
+        if errors:
+            result.add_error(row, errors)
+            continue
+        histories.append(PatientHistory(patient_id=patients[data['patient']],
+                                        assigned_doctor_id=doctors[data['doctor']],
+                                        admit_date=data['admit_date'],
+                                        release_date=data.get('release_date'),
+                                        department=data['department'],
+                                        symptomps=data['symptomps']))
+        costs.append({field: data[field] for field in PatientHistoryImportSerializer.cost_fields if field in data})
+    if not histories:
+        return
+
+    admit_dates = [history.admit_date for history in histories]
+    with transaction.atomic():
+        PatientHistory.objects.bulk_create(histories)
+        # admit_date is auto_now_add, which bulk_create overwrites with today.
+        for history, admit_date in zip(histories, admit_dates):
+            history.admit_date = admit_date
+        PatientHistory.objects.bulk_update(histories, ['admit_date'])
+        PatientCost.objects.bulk_create([PatientCost(patient_details=history, **cost)
+                                         for history, cost in zip(histories, costs) if cost])
+        histories_imported.send(sender=PatientHistory, histories=histories)
+        search.index(histories)
+        response_cache.invalidate_on_commit(Patient.objects.filter(
+            pk__in={history.patient_id for history in histories}).values_list('user_id', flat=True))
+    result.created += len(histories)
+
+
+IMPORTERS = {
+    'patients': import_patients_chunk,
+    'histories': import_histories_chunk,
+}
+
+
+def import_file(kind, fileobj, file_format, chunk_size=CHUNK_SIZE, progress=None, hash_workers=1):
+    """
+    Imports a `patients` or `histories` file and returns an `ImportResult`.
+
+    `progress`, if given, is called with the result after every chunk.
+    `hash_workers` is the size of the process pool hashing passwords (see
+    account.hashing), for imports run outside of a web request.
+    """
+    import_chunk = IMPORTERS[kind]
+    result = ImportResult()
+    first_row = 1
+    for rows in read_chunks(fileobj, file_format, chunk_size):
+        import_chunk(rows, first_row, result, hash_workers=hash_workers)
+        first_row += len(rows)
+        if progress:
+            progress(result)
+    return result
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from patient.exporters import CHUNK_SIZE, FORMATS, export_queryset, export_rows, write_csv, write_xlsx
+from patient.models import PatientHistory
+
+
+class Command(BaseCommand):
+    help = ("Exports patient histories with their costs to a CSV or XLSX file without loading them all in memory. "
+            "XLSX files continue on a new sheet every 1,048,575 histories.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--start', help="Only histories admitted on or after this date (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Only histories admitted on or before this date (YYYY-MM-DD).")
+        parser.add_argument('--department')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        start = self._date(options['start'], 'start')
+        end = self._date(options['end'], 'end')
+        if start and end and end < start:
+            raise CommandError("--end must not be before --start")
+        departments = dict(PatientHistory.department_choices)
+        if options['department'] and options['department'] not in departments:
+            raise CommandError("--department must be one of: {}".format(', '.join(departments)))
+        queryset = export_queryset(start, end, options['department'])
+        rows = export_rows(queryset, options['chunk_size'])
+        if options['format'] == 'csv':
+            with open(options['path'], 'w', newline='') as fileobj:
+                write_csv(rows, fileobj)
+        else:
+            with open(options['path'], 'wb') as fileobj:
+                write_xlsx(rows, fileobj)
+        self.stdout.write(self.style.SUCCESS("Exported patient histories to {}".format(options['path'])))
+
+    def _date(self, value, name):
+        if value is None:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError("--{} must be a date formatted as YYYY-MM-DD".format(name))
+        return day
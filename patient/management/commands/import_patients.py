@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from account.hashing import hash_workers
+from patient.importers import CHUNK_SIZE, FORMATS, IMPORTERS, detect_format, import_file
+
+
+class Command(BaseCommand):
+    help = "Imports patients or patient histories (with costs) from a CSV/XLSX file in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="File format, guessed from the extension by default.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--hash-workers', type=int, default=None,
+                            help="Processes hashing passwords (defaults to PASSWORD_HASHING_WORKERS).")
+
+    def handle(self, *args, **options):
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        def progress(result):
+            self.stdout.write("{} created, {} failed".format(result.created, result.failed))
+
+        with open(options['path'], 'rb') as fileobj:
+            result = import_file(options['kind'], fileobj, file_format, options['chunk_size'], progress=progress,
+                                 hash_workers=options['hash_workers'] or hash_workers())
+
+        for error in result.errors:
+            self.stderr.write("row {}: {}".format(error['row'], error['errors']))
+        if result.failed > len(result.errors):
+            self.stderr.write("... and {} more failed rows".format(result.failed - len(result.errors)))
+        self.stdout.write(self.style.SUCCESS("Imported {} {}".format(result.created, options['kind'])))
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0001_initial'),
+        ('patient', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', True)), fields=['doctor', 'appointment_date', 'appointment_time'], name='appointment_doctor_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', False)), fields=['appointment_date', 'appointment_time'], name='appointment_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patienthistory',
+            index=models.Index(fields=['patient', 'admit_date'], name='history_patient_admit_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0002_working_hours'),
+        ('patient', '0002_appointment_history_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appointment_doctor_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date', 'appointment_time'], name='appointment_doctor_slot_idx'),
+        ),
+    ]
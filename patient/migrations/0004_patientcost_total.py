@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:57
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0002_working_hours'),
+        ('patient', '0003_appointment_slot_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientcost',
+            name='total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('room_charge'), '+', models.F('medicine_cost')), '+', models.F('doctor_fee')), '+', models.F('other_charge')), output_field=models.BigIntegerField(verbose_name='Total')),
+        ),
+        migrations.AddIndex(
+            model_name='patienthistory',
+            index=models.Index(fields=['admit_date'], name='history_admit_idx'),
+        ),
+    ]
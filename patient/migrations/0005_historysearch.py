@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# The full-text index of PatientHistory.symptomps (see patient.search), filled from the existing histories.
+# Other backends get no index and search by substring.
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE patient_historysearch USING fts5(symptomps, facets, tokenize = 'porter unicode61')",
+        "INSERT INTO patient_historysearch (rowid, symptomps, facets)"
+        " SELECT id, symptomps, COALESCE('doctor' || assigned_doctor_id || ' ', '') || 'department' || department"
+        " || strftime(' year%Y month%Y%m day%Y%m%d', admit_date) FROM patient_patienthistory",
+    ],
+    'postgresql': [
+        "CREATE TABLE patient_historysearch ("
+        " history_id integer PRIMARY KEY REFERENCES patient_patienthistory (id) ON DELETE CASCADE"
+        " DEFERRABLE INITIALLY DEFERRED,"
+        " document tsvector NOT NULL)",
+        "INSERT INTO patient_historysearch (history_id, document)"
+        " SELECT id, to_tsvector('english', symptomps) FROM patient_patienthistory",
+        "CREATE INDEX patient_historysearch_document_idx ON patient_historysearch USING GIN (document)",
+    ],
+}
+
+
+def create_index(apps, schema_editor):
+    for statement in CREATE.get(schema_editor.connection.vendor, ()):
+        # No parameters, so that the strftime() format is not taken for placeholders.
+        schema_editor.execute(statement, None)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute("DROP TABLE patient_historysearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0004_patientcost_total'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from account.models import User
+from account.tracking import LoadedValuesMixin
 from doctor.models import Doctor
 
 
@@ -21,7 +22,7 @@ class Patient(models.Model):
         return self.user.username
 
 
-class PatientHistory(models.Model):
+class PatientHistory(LoadedValuesMixin, models.Model):
     Cardiologist = 'CL'
     Dermatologists = 'DL'
     Emergency_Medicine_Specialists = 'EMC'
@@ -44,17 +45,37 @@ class PatientHistory(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     assigned_doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # PatientHistory.objects.filter(patient=...).latest('admit_date')
+            models.Index(fields=['patient', 'admit_date'], name='history_patient_admit_idx'),
+            # Revenue reports: every history admitted in a date range.
+            models.Index(fields=['admit_date'], name='history_admit_idx'),
+        ]
+
     def __str__(self):
         return self.patient.get_name
     
 
-class Appointment(models.Model):
+class Appointment(LoadedValuesMixin, models.Model):
     appointment_date = models.DateField(verbose_name="Appointment date",auto_now=False, auto_now_add=False)
     appointment_time = models.TimeField(verbose_name="Appointement time", auto_now=False, auto_now_add=False)
     status = models.BooleanField(default=False)
     patient_history = models.ForeignKey(PatientHistory, related_name='patient_appointments', on_delete=models.CASCADE)
     doctor = models.ForeignKey(Doctor, related_name='doctor_appointments', null=True, on_delete=models.SET_NULL)
 
+    class Meta:
+        indexes = [
+            # Doctor's feed (filter(doctor=..., status=True) over a date range, ordered by date and time),
+            # double-booking checks and free-slot lookups: every appointment of a doctor on a range of days.
+            # Keeping status out of the key lets one index serve confirmed and pending rows alike.
+            models.Index(fields=['doctor', 'appointment_date', 'appointment_time'],
+                         name='appointment_doctor_slot_idx'),
+            # Approval queue: filter(status=False), oldest first. Only pending rows are indexed.
+            models.Index(fields=['appointment_date', 'appointment_time'], condition=models.Q(status=False),
+                         name='appointment_pending_idx'),
+        ]
+
     @property
     def patient_name(self):
         self.patient_history.patient.get_name
@@ -69,6 +90,13 @@ class PatientCost(models.Model):
     doctor_fee = models.PositiveIntegerField(verbose_name="Doctor Fee", null=False)
     other_charge = models.PositiveIntegerField(verbose_name="Other charges", null=False)
     patient_details = models.OneToOneField(PatientHistory, related_name='costs', on_delete=models.CASCADE)
+    # Stored by the database so that revenue reports can SUM() it instead of adding the charges up in Python.
+    total = models.GeneratedField(
+        expression=models.F('room_charge') + models.F('medicine_cost') + models.F('doctor_fee')
+        + models.F('other_charge'),
+        output_field=models.BigIntegerField(verbose_name="Total"),
+        db_persist=True,
+    )
 
     @property
     def total_cost(self):
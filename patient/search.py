@@ -0,0 +1,213 @@
+"""
+Full-text search over `PatientHistory.symptomps`.
+
+The index is the `patient_historysearch` table created by migration 0005,
+one row per history: an FTS5 table with Porter stemming on SQLite, ranked
+with bm25, and a `tsvector` column with a GIN index on PostgreSQL, ranked
+with `ts_rank_cd`. On other databases `search()` falls back to a substring
+scan, newest histories first and without ranks.
+
+A history matches when its symptoms contain every word of the query (in any
+order and form: "coughing" finds "cough"). Scoring every match of a common
+word takes far longer than finding them, so only the newest `RANK_WINDOW`
+matches that pass the filters are ranked, best first; the older matches
+follow them unranked, newest first. On SQLite the FTS5 row also holds
+`facets`: a token for the history's doctor, one for its department and one
+each for the year, month and day it was admitted, so that these filters are
+intersected inside the index rather than joined. An admit date range is
+matched as the fewest years, months and days covering it, up to
+`MAX_DATE_FACETS`; longer lists are slower than the join.
+
+Receivers in patient.signals index histories as they are saved and drop them
+as they are deleted, in the same transaction; code creating histories with
+`bulk_create()` calls `index()` itself.
+"""
+import calendar
+import datetime
+import re
+
+from django.db import connections, router
+from django.db.models import Max, Min
+
+from .models import PatientHistory
+
+
+MAX_TERMS = 16
+RANK_WINDOW = 2000
+MAX_DATE_FACETS = 100
+WORD = re.compile(r'\w+')
+INDEXED_VENDORS = ('sqlite', 'postgresql')
+
+
+def terms(query):
+    """The words of `query`; punctuation and the search syntax of either backend are dropped."""
+    return WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def facets(doctor_id=None, department=None, admit_date=None):
+    """The facet tokens of a history on SQLite, or those to match for the given filters."""
+    tokens = []
+    if doctor_id is not None:
+        tokens.append('doctor{}'.format(doctor_id))
+    if department is not None:
+        tokens.append('department{}'.format(department))
+    if admit_date is not None:
+        tokens.extend(admit_date.strftime(token) for token in ('year%Y', 'month%Y%m', 'day%Y%m%d'))
+    return tokens
+
+
+def date_facets(start, end):
+    """
+    The fewest year, month and day facet tokens that together cover the admit dates from `start` to `end`, or
+    None if that takes more than `MAX_DATE_FACETS`.
+    """
+    tokens = []
+    day = start
+    while day <= end:
+        if len(tokens) == MAX_DATE_FACETS:
+            return None
+        year_end = day.replace(month=12, day=31)
+        month_end = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+        if day.day == 1 and day.month == 1 and year_end <= end:
+            tokens.append(day.strftime('year%Y'))
+            last = year_end
+        elif day.day == 1 and month_end <= end:
+            tokens.append(day.strftime('month%Y%m'))
+            last = month_end
+        else:
+            tokens.append(day.strftime('day%Y%m%d'))
+            last = day
+        if last == datetime.date.max:
+            break
+        day = last + datetime.timedelta(days=1)
+    return tokens
+
+
+def _connection(using):
+    return connections[using or router.db_for_write(PatientHistory)]
+
+
+def index(histories, using=None):
+    connection = _connection(using)
+    if not histories or connection.vendor not in INDEXED_VENDORS:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # FTS5 tables have no unique constraint to upsert on.
+            cursor.executemany("DELETE FROM patient_historysearch WHERE rowid = %s",
+                               [(history.pk,) for history in histories])
+            cursor.executemany(
+                "INSERT INTO patient_historysearch (rowid, symptomps, facets) VALUES (%s, %s, %s)",
+                [(history.pk, history.symptomps,
+                  ' '.join(facets(history.assigned_doctor_id, history.department, history.admit_date)))
+                 for history in histories])
+        else:
+            cursor.executemany(
+                "INSERT INTO patient_historysearch (history_id, document) VALUES (%s, to_tsvector('english', %s)) "
+                "ON CONFLICT (history_id) DO UPDATE SET document = EXCLUDED.document",
+                [(history.pk, history.symptomps) for history in histories])
+
+
+def unindex(history_ids, using=None):
+    connection = _connection(using)
+    if connection.vendor not in INDEXED_VENDORS:
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'history_id'
+    with connection.cursor() as cursor:
+        cursor.executemany("DELETE FROM patient_historysearch WHERE {} = %s".format(column),
+                           [(pk,) for pk in history_ids])
+
+
+def _sqlite_matches(connection, words, department, start, end, doctor):
+    match = 'symptomps: ({})'.format(' '.join('"{}"'.format(word) for word in words))
+    for token in facets(doctor, department):
+        match += ' AND facets: "{}"'.format(token.replace('"', '""'))
+    dates = date_facets(start, end) if start is not None and end is not None else None
+    if dates:
+        match += ' AND facets: ({})'.format(' OR '.join('"{}"'.format(token) for token in dates))
+    # Quoted, every word is a plain term, and terms are ANDed. bm25 is lower for better matches; facets score 0.
+    score = '-bm25(patient_historysearch, 1.0, 0.0)'
+    if dates is not None or (start is None and end is None):
+        return "FROM patient_historysearch WHERE patient_historysearch MATCH %s", [match], 'rowid', score
+    filters, params = _conditions((('h.admit_date >= %s', connection.ops.adapt_datefield_value(start)),
+                                   ('h.admit_date <= %s', connection.ops.adapt_datefield_value(end))))
+    return ("FROM patient_historysearch s JOIN patient_patienthistory h ON h.id = s.rowid "
+            "WHERE patient_historysearch MATCH %s" + filters), [match] + params, 's.rowid', score
+
+
+def _postgresql_matches(connection, words, department, start, end, doctor):
+    filters, params = _conditions((('h.department = %s', department),
+                                   ('h.admit_date >= %s', connection.ops.adapt_datefield_value(start)),
+                                   ('h.admit_date <= %s', connection.ops.adapt_datefield_value(end)),
+                                   ('h.assigned_doctor_id = %s', doctor)))
+    return ("FROM patient_historysearch s JOIN patient_patienthistory h ON h.id = s.history_id, "
+            "plainto_tsquery('english', %s) query WHERE s.document @@ query" + filters), (
+        [' '.join(words)] + params), 'h.id', 'ts_rank_cd(s.document, query)'
+
+
+def _conditions(conditions):
+    sql, params = '', []
+    for condition, value in conditions:
+        if value is not None:
+            sql += ' AND ' + condition
+            params.append(value)
+    return sql, params
+
+
+def search(query, department=None, start=None, end=None, doctor=None, limit=20, offset=0, using=None):
+    """
+    Returns up to `limit` histories, after skipping `offset`, whose symptoms match `query`, best match first,
+    each with its patient and assigned doctor and a `rank` (higher is better). The newest `RANK_WINDOW` matches
+    are ranked; older ones, and every match without an index, follow newest first with a `rank` of None.
+    `start` and `end` bound the admit date, inclusively; `doctor` is the id of the assigned doctor.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    connection = connections[using or router.db_for_read(PatientHistory)]
+    histories = PatientHistory.objects.using(connection.alias).select_related('patient__user',
+                                                                             'assigned_doctor__user')
+    if connection.vendor not in INDEXED_VENDORS:
+        for word in words:
+            histories = histories.filter(symptomps__icontains=word)
+        histories = histories.filter(**{lookup: value for lookup, value in (
+            ('department', department), ('admit_date__gte', start), ('admit_date__lte', end),
+            ('assigned_doctor_id', doctor)) if value is not None})
+        histories = list(histories.order_by('-pk')[offset:offset + limit])
+        for history in histories:
+            history.rank = None
+        return histories
+
+    if connection.vendor == 'sqlite' and (start is None) != (end is None):
+        # Bounded by the first or last admit date, an open range is matched by date facets too.
+        bound = histories.aggregate(bound=Min('admit_date') if start is None else Max('admit_date'))['bound']
+        if bound is None:
+            return []
+        start, end = start or bound, end or bound
+    if start is not None and end is not None and start > end:
+        return []
+    build = _sqlite_matches if connection.vendor == 'sqlite' else _postgresql_matches
+    matches, params, pk, score = build(connection, words, department, start, end, doctor)
+    # One page of the ranked window and one of the older matches, newest first, of which the page is taken.
+    sql = ("WITH newest AS (SELECT {pk} AS id {matches} ORDER BY {pk} DESC LIMIT %s), "
+           "cutoff AS (SELECT COALESCE(MIN(id), 0) AS id FROM newest) "
+           "SELECT id, score FROM ("
+           "SELECT * FROM (SELECT 0 AS part, {pk} AS id, {score} AS score {matches} "
+           "AND {pk} >= (SELECT id FROM cutoff) ORDER BY score DESC, {pk} DESC LIMIT %s) ranked UNION ALL "
+           "SELECT * FROM (SELECT 1 AS part, {pk} AS id, NULL AS score {matches} "
+           "AND {pk} < (SELECT id FROM cutoff) ORDER BY {pk} DESC LIMIT %s) older"
+           ") results ORDER BY part, score DESC, id DESC LIMIT %s OFFSET %s").format(
+        pk=pk, score=score, matches=matches)
+    page = [offset + limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [RANK_WINDOW] + params + page + params + page + [limit, offset])
+        ranks = dict(cursor.fetchall())
+
+    found = histories.in_bulk(list(ranks))
+    results = []
+    for pk, rank in ranks.items():
+        # Unless it was deleted since.
+        if pk in found:
+            found[pk].rank = rank
+            results.append(found[pk])
+    return results
@@ -0,0 +1,83 @@
+"""
+Invalidates the cached responses (see account.response_cache) of the users a change is shown to, and keeps the
+symptoms search index (see patient.search) in step with the histories.
+
+`histories_imported` is sent, inside the importing transaction, with the histories that patient.importers inserted
+with `bulk_create()`, which sends no `post_save`.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from account.models import User
+from account.response_cache import invalidate_on_commit
+from doctor.models import Doctor
+
+from . import search
+from .models import Appointment, Patient, PatientCost, PatientHistory
+
+
+histories_imported = Signal()
+
+
+def _history_audience(histories):
+    """Users shown the `histories` queryset: their patients, and the doctors of their appointments."""
+    return (list(histories.values_list('patient__user_id', flat=True))
+            + list(Appointment.objects.filter(patient_history__in=histories)
+                   .values_list('doctor__user_id', flat=True).distinct()))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields != frozenset(['last_login']):
+        # Patients' names appear in their doctors' appointment feeds.
+        invalidate_on_commit([instance.pk] + _history_audience(
+            PatientHistory.objects.filter(patient__user_id=instance.pk)))
+
+
+@receiver(post_save, sender=Patient)
+@receiver(pre_delete, sender=Patient)
+def patient_changed(sender, instance, **kwargs):
+    invalidate_on_commit([instance.user_id] + _history_audience(PatientHistory.objects.filter(patient=instance)))
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(pre_delete, sender=Doctor)
+def doctor_changed(sender, instance, **kwargs):
+    # Histories show their assigned doctor's name and department.
+    invalidate_on_commit([instance.user_id] + _history_audience(
+        PatientHistory.objects.filter(assigned_doctor=instance)))
+
+
+@receiver(post_save, sender=PatientHistory)
+@receiver(pre_delete, sender=PatientHistory)
+def history_changed(sender, instance, **kwargs):
+    invalidate_on_commit(_history_audience(PatientHistory.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_save, sender=PatientHistory)
+def history_saved(sender, instance, created, using, **kwargs):
+    # The doctor, the department and the admit date are search filters too.
+    if created or any(instance.loaded_value(attname) != getattr(instance, attname)
+                      for attname in ('symptomps', 'assigned_doctor_id', 'department', 'admit_date')):
+        search.index([instance], using)
+
+
+@receiver(post_delete, sender=PatientHistory)
+def history_deleted(sender, instance, using, **kwargs):
+    search.unindex([instance.pk], using)
+
+
+@receiver(post_save, sender=PatientCost)
+@receiver(pre_delete, sender=PatientCost)
+def cost_changed(sender, instance, **kwargs):
+    invalidate_on_commit(PatientHistory.objects.filter(pk=instance.patient_details_id)
+                         .values_list('patient__user_id', flat=True))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(pre_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    doctors = {instance.doctor_id, instance.loaded_value('doctor_id', instance.doctor_id)}
+    invalidate_on_commit(
+        list(PatientHistory.objects.filter(pk=instance.patient_history_id).values_list('patient__user_id', flat=True))
+        + list(User.objects.filter(doctor__in=doctors - {None}).values_list('pk', flat=True)))
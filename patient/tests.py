@@ -1,3 +1,229 @@
+import datetime
+from itertools import count
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import Group
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from account.models import User
+from account.roles import DOCTOR
+from doctor.api.serializers import DoctorTokenObtainPairSerializer
+from doctor.api.views import DoctorAppointmentView
+from doctor.models import Doctor
+from hospitalAdmin.seeding import PASSWORD, seed
+from main.query_counts import Dataset, QueryScalingTests, Request
+from patient import search
+from patient.api import urls
+from patient.api.serializers import PatientTokenObtainPairSerializer
+from patient.models import Patient, PatientHistory, Appointment
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are asserted against SQLite's EXPLAIN QUERY PLAN output")
+class HotPathQueryPlanTests(TestCase):
+    """The hottest appointment/history queries must be answered from the indexes added for them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor_user = User.objects.create(username='doctor', first_name='Doctor', status=True)
+        cls.doctor = Doctor.objects.create(user=cls.doctor_user, address='Dhaka', mobile='1')
+        cls.patient = Patient.objects.create(user=User.objects.create(username='patient', first_name='Patient'),
+                                             age=30, address='Dhaka', mobile='1')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, "Expected {} in query plan:\n{}".format(index_name, plan))
+
+    def test_doctor_appointment_feed(self):
+        appointments = Appointment.objects.filter(doctor=self.doctor, status=True).order_by('appointment_date',
+                                                                                            'appointment_time')
+        self.assertUsesIndex(appointments, 'appointment_doctor_slot_idx')
+
+    def test_doctor_appointment_feed_view_queryset(self):
+        appointments = DoctorAppointmentView().get_queryset(self.doctor_user).filter(
+            appointment_date__gte='2024-01-01', appointment_date__lt='2024-01-08')
+        self.assertUsesIndex(appointments, 'appointment_doctor_slot_idx')
+
+    def test_pending_appointments(self):
+        appointments = Appointment.objects.filter(status=False).order_by('appointment_date', 'appointment_time')
+        self.assertUsesIndex(appointments, 'appointment_pending_idx')
+
+    def test_latest_patient_history(self):
+        # Same query as PatientHistory.objects.filter(patient=...).latest('admit_date')
+        history = PatientHistory.objects.filter(patient=self.patient).order_by('-admit_date')[:1]
+        self.assertUsesIndex(history, 'history_patient_admit_idx')
+
+
+class PatientQueryCountTests(QueryScalingTests, TestCase):
+    urlconf = urls
+    prefix = 'api/Patient/'
+
+    def requests(self, data):
+        token = data.patient_token
+        usernames = count()
+        slots = count()
+        # A weekday past the seeded appointments, so that every booking gets a free slot.
+        day = timezone.localdate() + datetime.timedelta(days=30)
+        day += datetime.timedelta(days=max(0, 7 - day.weekday()) if day.weekday() >= 5 else 0)
+
+        def registration():
+            return {'user_data': {'username': 'new-patient-{}'.format(next(usernames)), 'first_name': 'New',
+                                  'last_name': 'Patient', 'password': 'new-password', 'password2': 'new-password'},
+                    'profile_data': {'age': 30, 'address': 'Dhaka', 'mobile': '01800000000'}}
+
+        def appointment():
+            minutes = 9 * 60 + next(slots) * 30
+            return {'appointment_date': day.isoformat(), 'doctor': data.doctor.pk,
+                    'appointment_time': '{:02d}:{:02d}'.format(minutes // 60, minutes % 60)}
+
+        credentials = {'username': data.patient.user.username, 'password': PASSWORD}
+        return {
+            'registration': Request('post', '/api/Patient/registration/', data=registration),
+            'login': Request('post', '/api/Patient/login/', data=credentials),
+            'token': Request('post', '/api/Patient/token/', data=credentials),
+            'token refresh': Request('post', '/api/Patient/token/refresh/', data={
+                'refresh': data.refresh(PatientTokenObtainPairSerializer, data.patient.user)}),
+            'profile': Request('get', '/api/Patient/profile/', token),
+            'profile update': Request('put', '/api/Patient/profile/', token,
+                                      data={'profile_data': {'address': 'Chittagong'}}),
+            'history': Request('get', '/api/Patient/history/', token),
+            'appointments': Request('get', '/api/Patient/appointment/', token),
+            'async profile': Request('get', '/api/Patient/async/profile/', token),
+            'async history': Request('get', '/api/Patient/async/history/', token),
+            'async appointments': Request('get', '/api/Patient/async/appointment/', token),
+            'book appointment': Request('post', '/api/Patient/appointment/', token, data=appointment),
+        }
+
+
+class HistorySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = Doctor.objects.create(user=User.objects.create(username='doctor', first_name='Doctor',
+                                                                    status=True), address='Dhaka', mobile='1')
+        cls.other_doctor = Doctor.objects.create(user=User.objects.create(username='other', first_name='Other',
+                                                                          status=True), address='Dhaka', mobile='1')
+        Group.objects.get_or_create(name=DOCTOR)[0].user_set.add(cls.doctor.user)
+        patient = Patient.objects.create(user=User.objects.create(username='patient', first_name='Patient'),
+                                         age=30, address='Dhaka', mobile='1')
+        histories = [
+            ('Chest pain when coughing', cls.doctor, 'CL'),
+            ('Persistent cough and fever', cls.doctor, 'EMC'),
+            ('Skin rash', cls.doctor, 'DL'),
+            ('Chest pain, chest tightness', cls.other_doctor, 'CL'),
+        ]
+        cls.histories = [PatientHistory.objects.create(patient=patient, assigned_doctor=doctor, department=department,
+                                                       symptomps=symptoms)
+                         for symptoms, doctor, department in histories]
+
+    def found(self, query, **filters):
+        return [history.symptomps for history in search.search(query, **filters)]
+
+    def test_every_word_must_match_in_any_form(self):
+        self.assertCountEqual(self.found('coughs'), ['Chest pain when coughing', 'Persistent cough and fever'])
+        self.assertEqual(self.found('chest cough'), ['Chest pain when coughing'])
+        self.assertEqual(self.found('"rash" OR (cough'), [])
+        self.assertEqual(self.found('?!'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.found('chest', doctor=self.doctor.pk), ['Chest pain when coughing'])
+        self.assertEqual(self.found('cough', department='EMC'), ['Persistent cough and fever'])
+        self.assertEqual(self.found('cough', end=timezone.localdate() - datetime.timedelta(days=1)), [])
+
+    def test_admit_dates(self):
+        dates = [datetime.date(2023, 12, 31), datetime.date(2024, 2, 1), datetime.date(2024, 2, 29),
+                 datetime.date(2025, 6, 15)]
+        for history, admit_date in zip(self.histories, dates):
+            history.admit_date = admit_date
+            history.save()
+        self.assertEqual(self.found('chest', start=datetime.date(2024, 1, 1), end=datetime.date(2025, 12, 31)),
+                         ['Chest pain, chest tightness'])
+        self.assertEqual(self.found('cough', start=datetime.date(2024, 2, 1), end=datetime.date(2024, 2, 29)),
+                         ['Persistent cough and fever'])
+        self.assertEqual(self.found('cough', end=datetime.date(2024, 1, 31)), ['Chest pain when coughing'])
+        self.assertEqual(self.found('pain', start=datetime.date(2025, 6, 15)), ['Chest pain, chest tightness'])
+        self.assertEqual(self.found('pain', start=datetime.date(2025, 6, 16)), [])
+        self.assertEqual(search.date_facets(datetime.date(2023, 12, 31), datetime.date(2025, 3, 2)),
+                         ['day20231231', 'year2024', 'month202501', 'month202502', 'day20250301', 'day20250302'])
+        with mock.patch.object(search, 'MAX_DATE_FACETS', 5):
+            # Too many facets for the range: filtered by a join instead.
+            self.assertIsNone(search.date_facets(datetime.date(2023, 12, 31), datetime.date(2025, 3, 2)))
+            self.assertEqual(self.found('chest', start=datetime.date(2024, 1, 1), end=datetime.date(2025, 12, 31)),
+                             ['Chest pain, chest tightness'])
+
+    def test_matches_older_than_the_ranked_window_follow_it(self):
+        newer = [PatientHistory.objects.create(patient=self.histories[0].patient, assigned_doctor=self.doctor,
+                                               department='CL', symptomps='Dry cough')
+                 for _ in range(4)]
+        older = [newer[1].pk, newer[0].pk, self.histories[1].pk, self.histories[0].pk]
+        with mock.patch.object(search, 'RANK_WINDOW', 2):
+            found = search.search('cough', limit=20)
+            self.assertCountEqual([history.pk for history in found[:2]], [newer[3].pk, newer[2].pk])
+            self.assertEqual([history.pk for history in found[2:]], older)
+            self.assertEqual([history.rank for history in found[2:]], [None] * 4)
+            self.assertNotIn(None, [history.rank for history in found[:2]])
+            self.assertEqual([history.pk for history in search.search('cough', limit=2, offset=2)], older[:2])
+            self.assertEqual([history.pk for history in search.search('cough', limit=3, offset=1)],
+                             [found[1].pk] + older[:2])
+            self.assertEqual([history.pk for history in search.search('cough', limit=20, offset=5)], older[3:])
+            self.assertEqual(search.search('cough', limit=20, offset=6), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        history = self.histories[2]
+        history.symptomps = 'Rash and fever'
+        history.save()
+        self.assertCountEqual(self.found('fever'), ['Persistent cough and fever', 'Rash and fever'])
+        history.delete()
+        self.assertEqual(self.found('rash'), [])
+
+    def test_doctors_search_their_own_histories(self):
+        token = DoctorTokenObtainPairSerializer.get_token(self.doctor.user).access_token
+        response = self.client.get('/api/doctor/histories/search/', {'q': 'chest pain'},
+                                    HTTP_AUTHORIZATION='Bearer {}'.format(token))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.histories[0].pk])
+        response = self.client.get('/api/doctor/histories/search/', {'q': ''},
+                                   HTTP_AUTHORIZATION='Bearer {}'.format(token))
+        self.assertEqual(response.status_code, 400)
+
+
+class AppointmentBookingTests(TestCase):
+    """Seeded doctors work 9:00-17:00 on weekdays, in 30 minute slots."""
+
+    @classmethod
+    def setUpTestData(cls):
+        result = seed(patients=2, doctors=1, histories_per_patient=1)
+        cls.doctor = result.doctors[0]
+        cls.patient = Patient.objects.get(user__username='seed-patient-0')
+        # A Monday past the seeded appointments.
+        day = timezone.localdate() + datetime.timedelta(days=30)
+        cls.monday = day - datetime.timedelta(days=day.weekday())
+
+    def setUp(self):
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(
+            Dataset.access(PatientTokenObtainPairSerializer, self.patient.user))}
+
+    def book(self, time, day=None):
+        return self.client.post('/api/Patient/appointment/', {
+            'appointment_date': (day or self.monday).isoformat(), 'appointment_time': time,
+            'doctor': self.doctor.pk}, content_type='application/json', **self.headers)
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book('10:00').status_code, 201)
+        for time in ('10:00', '09:45', '10:15'):
+            with self.subTest(time=time):
+                response = self.book(time)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('overlapping', response.json()['appointment_time'])
+        self.assertEqual(self.book('10:30').status_code, 201)
+        self.assertEqual(self.book('09:30').status_code, 201)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor, appointment_date=self.monday).count(), 3)
 
-# Create your tests here.
+    def test_booking_outside_working_hours_is_rejected(self):
+        saturday = self.monday + datetime.timedelta(days=5)
+        for time, day in (('03:00', None), ('08:45', None), ('16:45', None), ('10:00', saturday)):
+            with self.subTest(time=time, day=day):
+                response = self.book(time, day)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('working hours', response.json()['appointment_time'])
+        self.assertEqual(self.book('16:30').status_code, 201)